@@ -0,0 +1,238 @@
+"""
+Нагрузочный тест HTTP-сервера (valutatrade serve): запросы в секунду
+и задержки p50/p95/p99 для get-rate и buy.
+
+Запуск (из корня репозитория):
+    python -m benchmarks.loadtest --spawn --users 1000 --duration 10
+    python -m benchmarks.loadtest --port 8765 --scenario get-rate
+
+С --spawn данные генерируются во временном каталоге и сервер
+запускается отдельным процессом; без него тест идет к уже запущенному
+серверу, пользователи которого созданы командой generate
+(user<id> / password<id>).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from valutatrade_hub.cli.generate import DatasetGenerator, password_for
+
+from .run import _git_commit, percentile
+
+SCENARIOS = {
+    "get-rate": ("GET", "/rate?from=EUR&to=USD", None),
+    "buy": ("POST", "/buy", {"currency": "EUR", "amount": "0.01"}),
+}
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _request(
+    method: str, path: str, body: Dict | None = None, token: str | None = None
+) -> bytes:
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+    if token:
+        head += f"Authorization: Bearer {token}\r\n"
+    head += f"Content-Length: {len(payload)}\r\n\r\n"
+    return head.encode("latin-1") + payload
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def _login(host: str, port: int, user_id: int) -> str:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(_request("POST", "/login", {
+            "username": f"user{user_id}", "password": password_for(user_id),
+        }))
+        status, body = await _read_response(reader)
+    finally:
+        writer.close()
+    if status != 200:
+        raise RuntimeError(f"login user{user_id}: {status} {body.decode()}")
+    return json.loads(body)["token"]
+
+
+async def _worker(
+    host: str,
+    port: int,
+    request: bytes,
+    pipeline: int,
+    deadline: float,
+    latencies: List[int],
+    statuses: Dict[int, int],
+) -> None:
+    """Держит pipeline запросов в полете на одном соединении до deadline."""
+    reader, writer = await asyncio.open_connection(host, port)
+    sent: deque = deque()
+    try:
+        for _ in range(pipeline):
+            writer.write(request)
+            sent.append(time.perf_counter_ns())
+        await writer.drain()
+
+        while sent:
+            status, _ = await _read_response(reader)
+            now = time.perf_counter_ns()
+            latencies.append(now - sent.popleft())
+            statuses[status] = statuses.get(status, 0) + 1
+            if now < deadline:
+                writer.write(request)
+                sent.append(now)
+                await writer.drain()
+    finally:
+        writer.close()
+
+
+async def run_scenario(
+    host: str,
+    port: int,
+    scenario: str,
+    connections: int,
+    pipeline: int,
+    duration: float,
+    users: int,
+) -> Dict:
+    """Нагрузка одним сценарием; соединение на пользователя (user1..)."""
+    method, path, body = SCENARIOS[scenario]
+    tokens = await asyncio.gather(*(
+        _login(host, port, i % users + 1) for i in range(connections)
+    ))
+
+    latencies: List[int] = []
+    statuses: Dict[int, int] = {}
+    started = time.perf_counter_ns()
+    deadline = started + int(duration * 1e9)
+    await asyncio.gather(*(
+        _worker(
+            host, port, _request(method, path, body, token),
+            pipeline, deadline, latencies, statuses,
+        )
+        for token in tokens
+    ))
+    elapsed = (time.perf_counter_ns() - started) / 1e9
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(n for status, n in statuses.items() if status != 200),
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) / 1e6, 3),
+        "p95_ms": round(percentile(latencies, 0.95) / 1e6, 3),
+        "p99_ms": round(percentile(latencies, 0.99) / 1e6, 3),
+        "max_ms": round(latencies[-1] / 1e6, 3) if latencies else 0.0,
+    }
+
+
+@contextmanager
+def spawn_server(users: int, seed: int) -> Iterator[Tuple[str, int]]:
+    """Сервер на синтетических данных во временном каталоге: (host, port)."""
+    with tempfile.TemporaryDirectory(prefix="valutatrade-load-") as tmp:
+        print(f"Генерация данных: {users} пользователей...", file=sys.stderr)
+        DatasetGenerator(seed).write_json(Path(tmp) / "data", users)
+
+        env = dict(os.environ, PYTHONPATH=str(ROOT))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "valutatrade_hub.main", "serve", "--port", "0"],
+            cwd=tmp, env=env, stdout=subprocess.PIPE, text=True,
+        )
+        try:
+            # "Сервер запущен: http://<host>:<port> ..."
+            line = server.stdout.readline()
+            if not line:
+                raise RuntimeError("Сервер не запустился.")
+            address = line.split("http://")[1].split()[0]
+            host, port = address.rsplit(":", 1)
+            yield host, int(port)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+@contextmanager
+def _target(args: argparse.Namespace) -> Iterator[Tuple[str, int]]:
+    if args.spawn:
+        with spawn_server(args.users, args.seed) as address:
+            yield address
+    else:
+        yield args.host, args.port
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест valutatrade serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--spawn", action="store_true",
+                        help="запустить сервер на сгенерированных данных")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append",
+                        help="сценарий (можно несколько); по умолчанию все")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--pipeline", type=int, default=4,
+                        help="запросов в полете на соединении")
+    parser.add_argument("--duration", type=float, default=10.0, help="секунд")
+    parser.add_argument("--output", help="куда сохранить результаты (JSON)")
+    args = parser.parse_args()
+
+    scenarios = args.scenario or list(SCENARIOS)
+    results = {}
+
+    with _target(args) as (host, port):
+        for name in scenarios:
+            print(f"Сценарий {name}: {args.duration:g} с...", file=sys.stderr)
+            results[name] = asyncio.run(run_scenario(
+                host, port, name, args.connections, args.pipeline,
+                args.duration, args.users,
+            ))
+
+    print(
+        f"{'сценарий':<12}{'запр/с':>10}{'p50, мс':>10}{'p95, мс':>10}"
+        f"{'p99, мс':>10}{'max, мс':>10}{'ошибки':>8}"
+    )
+    for name, r in results.items():
+        print(
+            f"{name:<12}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+            f"{r['p99_ms']:>10}{r['max_ms']:>10}{r['errors']:>8}"
+        )
+
+    if args.output:
+        report = {
+            "timestamp": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "connections": args.connections,
+            "pipeline": args.pipeline,
+            "duration": args.duration,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+
+    return 1 if any(r["errors"] for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Бенчмарк памяти: сколько байт занимает один пользователь после загрузки
+(UserManager + PortfolioManager на JSON-хранилище).
+
+Запуск (из корня репозитория):
+    python -m benchmarks.memory --users 100000 --output memory.json
+    python -m benchmarks.memory --users 100000 --compare memory.json
+    python -m benchmarks.memory --users 100000 --store columnar
+
+С --compare выводятся байты на пользователя до (из файла) и после.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+from valutatrade_hub.cli.backend.json_backend import JsonStorageBackend
+from valutatrade_hub.cli.generate import DatasetGenerator
+from valutatrade_hub.cli.manager.portfolio import PortfolioManager
+from valutatrade_hub.cli.manager.user import UserManager
+
+from .run import _git_commit
+
+
+def measure_load(
+    paths: Dict[str, str], users: int, store: str = "dict"
+) -> Dict[str, float]:
+    """Память, которая остается занятой после загрузки менеджеров."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        backend = JsonStorageBackend(
+            paths["users"], paths["portfolios"], paths["rates"]
+        )
+
+        # Менеджеры держатся в списке, пока идут замеры
+        managers = [UserManager(backend)]
+        gc.collect()
+        after_users = tracemalloc.get_traced_memory()[0]
+
+        managers.append(PortfolioManager(backend, store=store))
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    managers.clear()
+    return {
+        "bytes_per_user": round((current - base) / users, 1),
+        "users_bytes_per_user": round((after_users - base) / users, 1),
+        "portfolios_bytes_per_user": round((current - after_users) / users, 1),
+        "peak_bytes_per_user": round((peak - base) / users, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк памяти ValutaTrade Hub")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--store", choices=("dict", "columnar"), default="dict")
+    parser.add_argument("--output", help="куда сохранить результаты (JSON)")
+    parser.add_argument("--compare", help="файл с базовыми результатами (JSON)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="valutatrade-mem-") as tmp:
+        print(f"Генерация данных: {args.users} пользователей...", file=sys.stderr)
+        paths = DatasetGenerator(args.seed).write_json(Path(tmp), args.users)
+        results = measure_load(paths, args.users, args.store)
+
+    report = {
+        "users": args.users,
+        "seed": args.seed,
+        "store": args.store,
+        "created_at": datetime.now().isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    print(f"{'метрика, байт/польз.':<28}{'до':>12}{'после':>12}")
+    for name, value in results.items():
+        before = baseline.get(name, "-")
+        print(f"{name:<28}{before:>12}{value:>12}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
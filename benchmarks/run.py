@@ -0,0 +1,245 @@
+"""
+Бенчмарки горячих путей: хранилище, сделки, курсы и журнал.
+
+Запуск (из корня репозитория):
+    python -m benchmarks.run --scale small --output bench.json
+    python -m benchmarks.run --scale small --compare bench.json --threshold 0.2
+
+Данные генерируются заново во временном каталоге, сеть не используется.
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from valutatrade_hub.cli.backend.json_backend import JsonStorageBackend
+from valutatrade_hub.cli.generate import BASE_RATES, DatasetGenerator, password_for
+from valutatrade_hub.cli.manager.portfolio import PortfolioManager
+from valutatrade_hub.cli.manager.rate import RateManager
+from valutatrade_hub.cli.manager.user import UserManager
+from valutatrade_hub.parser.binary_history import BinaryRateHistory, convert_journal
+from valutatrade_hub.parser.history import RateHistory
+from valutatrade_hub.parser.journal import RateJournal, journal_entry
+
+SCALES = {
+    "small": {"users": 1_000, "journal": 10_000},
+    "medium": {"users": 100_000, "journal": 1_000_000},
+    "large": {"users": 1_000_000, "journal": 10_000_000},
+}
+
+# Сколько операций измерять в каждом сценарии
+OPS = {
+    "cold_load": 3,
+    "history_load": 1,
+    "history_ohlc": 20,
+    "binary_load": 20,
+    "binary_ohlc": 20,
+    "login": 2_000,
+    "buy": 300,
+    "sell": 300,
+    "format_portfolio": 2_000,
+    "rates_filter": 5_000,
+    "revalue_all": 3,
+    "journal_append": 500,
+}
+
+
+def measure(func: Callable[[int], object], ops: int) -> Dict[str, float]:
+    """Выполняет func(i) ops раз и считает пропускную способность и p50/p99."""
+    latencies: List[int] = []
+    started = time.perf_counter_ns()
+    for i in range(ops):
+        t0 = time.perf_counter_ns()
+        func(i)
+        latencies.append(time.perf_counter_ns() - t0)
+    elapsed = (time.perf_counter_ns() - started) / 1e9
+
+    latencies.sort()
+    return {
+        "ops": ops,
+        "ops_per_sec": round(ops / elapsed, 2) if elapsed else 0.0,
+        "p50_us": round(percentile(latencies, 0.50) / 1000, 2),
+        "p99_us": round(percentile(latencies, 0.99) / 1000, 2),
+    }
+
+
+def percentile(sorted_values: List[int], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_suite(scale: str, seed: int) -> Dict:
+    """Генерирует данные выбранного масштаба и прогоняет все сценарии."""
+    sizes = SCALES[scale]
+    rng = random.Random(seed)
+    results: Dict[str, Dict[str, float]] = {}
+
+    with tempfile.TemporaryDirectory(prefix="valutatrade-bench-") as tmp:
+        print(f"Генерация данных: {sizes['users']} пользователей, "
+              f"{sizes['journal']} записей журнала...", file=sys.stderr)
+        generator = DatasetGenerator(seed)
+        paths = generator.write_json(Path(tmp), sizes["users"])
+        journal = RateJournal(
+            str(Path(tmp) / "exchange_rates"), max_segment_bytes=64 * 1024 * 1024
+        )
+        generator.write_journal(journal, sizes["journal"])
+
+        def load(_):
+            backend = JsonStorageBackend(
+                paths["users"], paths["portfolios"], paths["rates"]
+            )
+            return (
+                UserManager(backend),
+                PortfolioManager(backend),
+                RateManager(backend, ttl=10**9),
+            )
+
+        results["cold_load"] = measure(load, OPS["cold_load"])
+        users, portfolios, rates = load(0)
+        user_ids = [rng.randint(1, sizes["users"]) for _ in range(10_000)]
+
+        results["history_load"] = measure(
+            lambda _: RateHistory(journal), OPS["history_load"]
+        )
+        history = RateHistory(journal)
+        results["history_ohlc"] = measure(
+            lambda _: history.ohlc("BTC_USD", 24 * 60 * 60), OPS["history_ohlc"]
+        )
+
+        binary_dir = str(Path(tmp) / "exchange_rates_bin")
+        convert_journal(journal, BinaryRateHistory(binary_dir))
+        results["binary_load"] = measure(
+            lambda _: BinaryRateHistory(binary_dir).close(), OPS["binary_load"]
+        )
+        binary = BinaryRateHistory(binary_dir)
+        results["binary_ohlc"] = measure(
+            lambda _: binary.ohlc("BTC_USD", 24 * 60 * 60), OPS["binary_ohlc"]
+        )
+
+        def login(i):
+            user_id = user_ids[i % len(user_ids)]
+            users.authenticate(f"user{user_id}", password_for(user_id))
+
+        def trade(method):
+            def run(i):
+                method(user_ids[i % len(user_ids)], rates, "BTC", "0.001", "USD")
+            return run
+
+        def format_portfolio(i):
+            user_id = user_ids[i % len(user_ids)]
+            portfolio = portfolios.get_by_user_id(user_id)
+            portfolio.format_portfolio(f"user{user_id}", rates, "USD")
+
+        # Покупки идут первыми, чтобы продажам хватило средств
+        results["login"] = measure(login, OPS["login"])
+        results["buy"] = measure(trade(portfolios.buy_currency), OPS["buy"])
+        results["sell"] = measure(trade(portfolios.sell_currency), OPS["sell"])
+        results["format_portfolio"] = measure(
+            format_portfolio, OPS["format_portfolio"]
+        )
+        results["rates_filter"] = measure(
+            lambda _: rates.get_rates_filter(None, 3, "USD"), OPS["rates_filter"]
+        )
+
+        # Пакетная оценка всех портфелей по столбцам хранилища
+        results["revalue_all"] = measure(
+            lambda _: sum(1 for _ in portfolios.revalue_all(rates, "USD")),
+            OPS["revalue_all"],
+        )
+
+        batch = [
+            journal_entry(code, "USD", rate, "benchmark")
+            for code, rate in BASE_RATES.items()
+        ]
+        results["journal_append"] = measure(
+            lambda _: journal.append_batch(batch), OPS["journal_append"]
+        )
+
+    return {
+        "scale": scale,
+        "sizes": sizes,
+        "seed": seed,
+        "created_at": datetime.now().isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Сравнивает результаты с базовыми. Регрессия — p50 выше или пропускная
+    способность ниже базовой больше чем на threshold (доля).
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+
+        if result["p50_us"] > base["p50_us"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p50 {base['p50_us']} -> {result['p50_us']} мкс"
+            )
+        if result["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {base['ops_per_sec']} -> {result['ops_per_sec']} оп/с"
+            )
+    return regressions
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки ValutaTrade Hub")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="куда сохранить результаты (JSON)")
+    parser.add_argument("--compare", help="файл с базовыми результатами (JSON)")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = run_suite(args.scale, args.seed)
+
+    print(f"{'сценарий':<18}{'оп/с':>12}{'p50, мкс':>12}{'p99, мкс':>12}")
+    for name, r in report["results"].items():
+        print(f"{name:<18}{r['ops_per_sec']:>12}{r['p50_us']:>12}{r['p99_us']:>12}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"Регрессия: {line}")
+        if regressions:
+            return 1
+        print("Регрессий нет.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Клиенты API против локального http.server: keep-alive пул соединений,
+дисковый кэш ответов (свежий ответ, ETag/304, истечение срока) и отказ
+от некорректных курсов в ответе.
+"""
+
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.core.money import Rate
+from valutatrade_hub.parser.api_clients import ExchangeRateApiClient
+from valutatrade_hub.parser.http_cache import HttpCache
+
+
+class _RatesHandler(BaseHTTPRequestHandler):
+    """Отдает курсы с ETag и Cache-Control; на совпавший If-None-Match — 304."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self) -> None:
+        state = self.server.state
+        if_none_match = self.headers.get("If-None-Match")
+        not_modified = if_none_match == state["etag"]
+        state["requests"].append({
+            "port": self.client_address[1],
+            "if_none_match": if_none_match,
+            "status": 304 if not_modified else 200,
+        })
+
+        body = b"" if not_modified else json.dumps({"rates": state["rates"]}).encode()
+        self.send_response(304 if not_modified else 200)
+        self.send_header("ETag", state["etag"])
+        self.send_header("Cache-Control", f"max-age={state['max_age']}")
+        if not not_modified:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class ApiClientHttpTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _RatesHandler)
+        self.server.state = {
+            "rates": {"EUR": 0.5, "GBP": 0.25},
+            "etag": '"v1"',
+            "max_age": 60,
+            "requests": [],
+        }
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+    @property
+    def requests(self) -> list:
+        return self.server.state["requests"]
+
+    def _client(self, cached: bool = True) -> ExchangeRateApiClient:
+        cache = HttpCache(self.cache_dir.name) if cached else None
+        client = ExchangeRateApiClient("USD", timeout=5, cache=cache)
+        self.addCleanup(client.session.close)
+        host, port = self.server.server_address
+        client.BASE_URL = f"http://{host}:{port}/v6/latest"
+        return client
+
+    def test_pooled_session_reuses_connection(self) -> None:
+        client = self._client(cached=False)
+        for _ in range(3):
+            self.assertEqual(client.fetch_rates()["EUR_USD"], Rate.of(2))
+
+        self.assertEqual(len(self.requests), 3)
+        # Все запросы пришли с одного клиентского порта — одно соединение
+        self.assertEqual(len({r["port"] for r in self.requests}), 1)
+
+    def test_fresh_response_served_from_cache(self) -> None:
+        first = self._client().fetch_rates()
+        # Новый клиент (новый процесс) читает тот же кэш на диске
+        second = self._client().fetch_rates()
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.requests), 1)
+
+    def test_expired_response_revalidated_with_etag(self) -> None:
+        self.server.state["max_age"] = 0
+        client = self._client()
+        client.fetch_rates()
+
+        # Срок истек: условный запрос, сервер отвечает 304 без тела
+        self.server.state["max_age"] = 60
+        self.assertEqual(client.fetch_rates()["GBP_USD"], Rate.of(4))
+        self.assertEqual(
+            [(r["if_none_match"], r["status"]) for r in self.requests],
+            [(None, 200), ('"v1"', 304)],
+        )
+
+        # 304 продлил запись: следующий вызов не идет в сеть
+        client.fetch_rates()
+        self.assertEqual(len(self.requests), 2)
+
+    def test_expired_entry_refetched_when_changed(self) -> None:
+        client = self._client()
+        client.fetch_rates()
+
+        # Запись устарела, а ресурс на сервере сменился
+        url = f"{client.BASE_URL}/USD"
+        entry = client.cache.get(url)
+        client.cache.put(url, entry["body"], {"ETag": entry["etag"], "Expires": "0"})
+        self.assertFalse(client.cache.is_fresh(client.cache.get(url)))
+        self.server.state.update(rates={"EUR": 0.8}, etag='"v2"')
+
+        self.assertEqual(client.fetch_rates(), {"EUR_USD": Rate.of("1.25")})
+        self.assertEqual(self.requests[-1]["if_none_match"], '"v1"')
+        self.assertEqual(self.requests[-1]["status"], 200)
+        self.assertEqual(client.cache.get(url)["etag"], '"v2"')
+
+    def test_invalid_rate_rejected(self) -> None:
+        client = self._client(cached=False)
+        for rate in (0, -1.5, "abc", None, True, [1], "NaN", 1e30):
+            with self.subTest(rate=rate):
+                self.server.state["rates"] = {"EUR": 0.5, "XXX": rate}
+                with self.assertRaisesRegex(ApiRequestError, "XXX"):
+                    client.fetch_rates()
+
+        self.server.state["rates"] = ["EUR", 0.5]
+        with self.assertRaises(ApiRequestError):
+            client.fetch_rates()
+
+
+if __name__ == "__main__":
+    unittest.main()
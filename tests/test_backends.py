@@ -0,0 +1,176 @@
+"""
+Хранилища JSON и SQLite: одинаковые ответы на одинаковые операции
+(пользователи, счетчики, портфели, курсы), импорт данных из JSON в
+SQLite и выбор хранилища по настройкам.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from valutatrade_hub.cli.backend.factory import create_backend
+from valutatrade_hub.cli.backend.json_backend import JsonStorageBackend
+from valutatrade_hub.cli.backend.sqlite_backend import SqliteStorageBackend
+from valutatrade_hub.cli.generate import DatasetGenerator
+from valutatrade_hub.core.money import Rate
+
+
+def _user(user_id: int, username: str) -> dict:
+    return {
+        "user_id": user_id,
+        "username": username,
+        "hashed_password": f"hash{user_id}",
+        "salt": f"salt{user_id}",
+        "registration_date": "2026-01-01T00:00:00",
+    }
+
+
+class _Settings:
+    def __init__(self, **values) -> None:
+        self._values = values
+
+    def get(self, key: str, default=None):
+        return self._values.get(key, default)
+
+
+class BackendParityTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def _backends(self) -> dict:
+        json_dir = self.dir / "json"
+        json_dir.mkdir()
+        for name in ("users", "portfolios"):
+            (json_dir / f"{name}.json").write_text("[]")
+        (json_dir / "rates.json").write_text("{}")
+        sqlite = SqliteStorageBackend(str(self.dir / "valutatrade.db"))
+        self.addCleanup(sqlite.close)
+        return {
+            "json": JsonStorageBackend(
+                str(json_dir / "users.json"),
+                str(json_dir / "portfolios.json"),
+                str(json_dir / "rates.json"),
+            ),
+            "sqlite": sqlite,
+        }
+
+    def _run(self, scenario) -> dict:
+        results = {
+            kind: scenario(backend) for kind, backend in self._backends().items()
+        }
+        self.assertEqual(results["json"], results["sqlite"])
+        return results["json"]
+
+    def test_users_and_counters(self) -> None:
+        def scenario(backend) -> list:
+            for user_id, name in ((1, "alice"), (2, "Bob"), (3, "carol")):
+                backend.save_user(_user(user_id, name))
+            backend.save_user({**_user(2, "Bob"), "salt": "new"})
+            backend.delete_user(3)
+            before = backend.next_user_id()
+            backend.save_counter("user_id", 10)
+            return [
+                [u["username"] for u in sorted(
+                    backend.load_users(), key=lambda u: u["user_id"]
+                )],
+                backend.find_user("BOB", case_insensitive=True)["salt"],
+                backend.find_user("BOB"),
+                backend.find_user_by_id(1)["username"],
+                backend.find_user_by_id(3),
+                before,
+                backend.next_user_id(),
+                backend.load_counter("user_id"),
+                backend.load_counter("missing"),
+            ]
+
+        result = self._run(scenario)
+        self.assertEqual(result[0], ["alice", "Bob"])
+        self.assertEqual(result[5:], [3, 10, 10, 0])
+
+    def test_portfolios(self) -> None:
+        def scenario(backend) -> list:
+            backend.save_portfolio(
+                {"user_id": 1, "wallets": {"USD": "10.00", "BTC": "0.50000000"}}
+            )
+            backend.save_portfolio({"user_id": 2, "wallets": {}})
+            # Изменен только кошелек EUR: остальные сохраняются как были
+            backend.save_portfolio(
+                {"user_id": 1, "wallets": {
+                    "USD": "10.00", "BTC": "0.50000000", "EUR": "1.25",
+                }},
+                changed=["EUR"],
+            )
+            return [
+                backend.find_portfolio(1),
+                backend.find_portfolio(2),
+                backend.find_portfolio(3),
+                sorted(p["user_id"] for p in backend.load_portfolios()),
+            ]
+
+        result = self._run(scenario)
+        self.assertEqual(
+            result[0]["wallets"], {"USD": "10.00", "BTC": "0.50000000", "EUR": "1.25"}
+        )
+
+    def test_rates_round_trip_exact(self) -> None:
+        rates = {
+            "BTC_USD": {"rate": "95000.123456789012345678", "updated_at": "t1"},
+            "RUB_USD": {"rate": "0.0128", "updated_at": "t2"},
+            "source": "test",
+            "last_refresh": "t2",
+        }
+
+        def scenario(backend) -> dict:
+            backend.save_rates(rates)
+            return backend.load_rates()
+
+        self.assertEqual(self._run(scenario), rates)
+
+    def test_import_from_json(self) -> None:
+        paths = DatasetGenerator(seed=5).write_json(self.dir / "data", users=20)
+        source = JsonStorageBackend(
+            paths["users"], paths["portfolios"], paths["rates"]
+        )
+        backend = create_backend(_Settings(
+            storage_backend="sqlite",
+            sqlite_file=str(self.dir / "imported.db"),
+            users_file=paths["users"],
+            portfolios_file=paths["portfolios"],
+            rates_file=paths["rates"],
+        ))
+        self.addCleanup(backend.close)
+
+        self.assertIsInstance(backend, SqliteStorageBackend)
+        self.assertEqual(backend.load_users(), source.load_users())
+        self.assertEqual(
+            sorted(backend.load_portfolios(), key=lambda p: p["user_id"]),
+            source.load_portfolios(),
+        )
+        # В SQLite курс — строка без потерь, в JSON генератор пишет число
+        expected = source.load_rates()
+        loaded = backend.load_rates()
+        self.assertEqual(loaded.keys(), expected.keys())
+        self.assertEqual(
+            Rate.of(loaded["BTC_USD"]["rate"]), Rate.of(expected["BTC_USD"]["rate"])
+        )
+
+        # Повторное открытие не импортирует данные второй раз
+        backend.delete_user(1)
+        import_again = create_backend(_Settings(
+            storage_backend="sqlite",
+            sqlite_file=str(self.dir / "imported.db"),
+            users_file=paths["users"],
+            portfolios_file=paths["portfolios"],
+            rates_file=paths["rates"],
+        ))
+        self.addCleanup(import_again.close)
+        self.assertIsNone(import_again.find_user_by_id(1))
+
+        with self.assertRaises(ValueError):
+            create_backend(_Settings(storage_backend="redis"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Режим batch: поток JSON-строк с результатом каждой команды, подсчет
+фиксаций по --commit-every и запись событий журнала сделок одной
+записью на фиксацию.
+"""
+
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from valutatrade_hub.cli.backend.json_backend import JsonStorageBackend
+from valutatrade_hub.cli.batch import BatchRunner
+from valutatrade_hub.cli.generate import DatasetGenerator
+from valutatrade_hub.cli.interface import CLIInterface
+from valutatrade_hub.cli.ledger import TradeLedger
+from valutatrade_hub.cli.manager.portfolio import PortfolioManager
+from valutatrade_hub.core.money import Money
+from valutatrade_hub.infra.settings import SettingsLoader
+
+SCRIPT = """\
+login --username user1 --password password1
+buy --currency EUR --amount 1
+buy --currency EUR --amount 2
+# комментарии и пустые строки пропускаются
+
+buy --currency XXX --amount 1
+buy --currency BTC --amount 0.5
+show-portfolio
+"""
+
+
+class BatchRunnerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.paths = DatasetGenerator(seed=7).write_json(self.dir, users=3)
+        self.trades = str(self.dir / "trades.jsonl")
+
+        patcher = mock.patch.dict(SettingsLoader()._config, {
+            "users_file": self.paths["users"],
+            "portfolios_file": self.paths["portfolios"],
+            "rates_file": self.paths["rates"],
+            "trades_file": self.trades,
+            "storage_backend": "json",
+            "portfolio_store": "dict",
+            "metrics_textfile": None,
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run(self, script: str, commit_every: int | None = None):
+        cli = CLIInterface()
+        out = io.StringIO()
+        flushed = []
+        flush = TradeLedger.flush
+
+        def counting_flush(ledger: TradeLedger) -> None:
+            if ledger._buffer:
+                flushed.append(len(ledger._buffer))
+            flush(ledger)
+
+        with mock.patch.object(TradeLedger, "flush", counting_flush):
+            stats = BatchRunner(cli, out, commit_every=commit_every).run(
+                io.StringIO(script)
+            )
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        return stats, records, flushed
+
+    def _wallets(self) -> dict:
+        backend = JsonStorageBackend(
+            self.paths["users"], self.paths["portfolios"], self.paths["rates"]
+        )
+        manager = PortfolioManager(backend, ledger=TradeLedger(self.trades))
+        portfolio = manager.get_by_user_id(1)
+        return {code: wallet.balance for code, wallet in portfolio.wallets.items()}
+
+    def test_result_stream(self) -> None:
+        before = self._wallets()
+        stats, records, _ = self._run(SCRIPT)
+
+        self.assertEqual(
+            [(r["line"], r["command"], r["status"]) for r in records[:-1]],
+            [
+                (1, "login", "ok"),
+                (2, "buy", "ok"),
+                (3, "buy", "ok"),
+                (6, "buy", "error"),
+                (7, "buy", "ok"),
+                (8, "show-portfolio", "ok"),
+            ],
+        )
+        self.assertEqual(records[3]["error"], "CurrencyNotFoundError")
+        self.assertIn("EUR", records[1]["output"])
+        self.assertIn("BTC", records[-2]["output"])
+
+        summary = records[-1]["summary"]
+        self.assertEqual(summary, stats)
+        self.assertEqual(
+            {key: summary[key] for key in ("total", "ok", "errors", "commits")},
+            {"total": 6, "ok": 5, "errors": 1, "commits": 1},
+        )
+
+        # Сделки видны новому процессу: снимок плюс журнал
+        after = self._wallets()
+        zero = Money(0, 2)
+        self.assertEqual(after["EUR"] - before.get("EUR", zero), Money.of(3, 2))
+        self.assertEqual(
+            after["BTC"] - before.get("BTC", Money(0, 8)), Money.of("0.5", 8)
+        )
+
+    def test_commit_every_groups_ledger_writes(self) -> None:
+        stats, _, flushed = self._run(SCRIPT, commit_every=3)
+
+        # Строки 1-3 и 6-8: по фиксации на каждые три команды
+        self.assertEqual(stats["commits"], 2)
+        # События журнала дописываются одной записью на фиксацию
+        self.assertEqual(flushed, [2, 1])
+        with open(self.trades, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual([e["seq"] for e in events], [1, 2, 3])
+
+    def test_exit_stops_script(self) -> None:
+        stats, records, flushed = self._run(
+            "login --username user2 --password password2\n"
+            "buy --currency EUR --amount 1\n"
+            "exit\n"
+            "buy --currency EUR --amount 1\n"
+        )
+
+        self.assertEqual([r.get("line") for r in records[:-1]], [1, 2])
+        self.assertEqual(stats["total"], 3)
+        self.assertEqual(stats["commits"], 1)
+        self.assertEqual(flushed, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Бенчмарки: замер задержек и пропускной способности, порог регрессии
+при сравнении с базовым прогоном и полный прогон сценариев на малых
+данных без сети.
+"""
+
+import unittest
+from unittest import mock
+
+from benchmarks import run
+
+
+def _report(**results) -> dict:
+    return {
+        "results": {
+            name: {"ops_per_sec": ops, "p50_us": p50}
+            for name, (ops, p50) in results.items()
+        }
+    }
+
+
+class MeasureTest(unittest.TestCase):
+    def test_measure_counts_every_call(self) -> None:
+        calls = []
+        result = run.measure(calls.append, 50)
+
+        self.assertEqual(calls, list(range(50)))
+        self.assertEqual(result["ops"], 50)
+        self.assertGreater(result["ops_per_sec"], 0)
+        self.assertLessEqual(result["p50_us"], result["p99_us"])
+
+    def test_percentile(self) -> None:
+        values = list(range(1, 101))
+        self.assertEqual(run.percentile(values, 0.5), 51)
+        self.assertEqual(run.percentile(values, 0.99), 100)
+        self.assertEqual(run.percentile(values, 1.0), 100)
+        self.assertEqual(run.percentile([], 0.5), 0.0)
+
+
+class CompareTest(unittest.TestCase):
+    def test_within_threshold(self) -> None:
+        baseline = _report(buy=(1000, 100), sell=(1000, 100))
+        current = _report(buy=(850, 119), sell=(1200, 80))
+        self.assertEqual(run.compare(current, baseline, 0.2), [])
+
+    def test_regressions_reported(self) -> None:
+        baseline = _report(buy=(1000, 100), sell=(1000, 100), login=(10, 1))
+        current = _report(buy=(790, 100), sell=(1000, 121), new=(1, 1000))
+
+        # Сценарии без базового результата не сравниваются
+        self.assertEqual(
+            run.compare(current, baseline, 0.2),
+            ["buy: 1000 -> 790 оп/с", "sell: p50 100 -> 121 мкс"],
+        )
+        self.assertEqual(run.compare(current, {}, 0.2), [])
+
+
+class RunSuiteTest(unittest.TestCase):
+    def test_suite_runs_every_scenario(self) -> None:
+        scales = {"tiny": {"users": 20, "journal": 200}}
+        ops = dict.fromkeys(run.OPS, 2)
+        with mock.patch.dict(run.SCALES, scales), \
+                mock.patch.dict(run.OPS, ops), \
+                mock.patch("sys.stderr"):
+            report = run.run_suite("tiny", seed=1)
+
+        self.assertEqual(report["scale"], "tiny")
+        self.assertEqual(report["sizes"], scales["tiny"])
+        self.assertEqual(list(report["results"]), list(run.OPS))
+        for result in report["results"].values():
+            self.assertEqual(result["ops"], 2)
+
+        # Результат сравним сам с собой: регрессий нет
+        self.assertEqual(run.compare(report, report, 0.0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Бинарная история курсов: перенос журнала и чтение через mmap дают те же
+ответы, что индекс журнала; дозапись видна другому процессу, записи не
+по порядку встают на место, недописанная запись после сбоя не видна.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from valutatrade_hub.core.money import Rate
+from valutatrade_hub.parser.binary_history import (
+    HEADER,
+    BinaryRateHistory,
+    convert_journal,
+)
+from valutatrade_hub.parser.history import RateHistory
+from valutatrade_hub.parser.journal import RateJournal, journal_entry
+
+
+def _entry(pair: str, moment: str, rate: str, meta: dict | None = None) -> dict:
+    from_currency, to_currency = pair.split("_")
+    return journal_entry(
+        from_currency, to_currency, rate, "test", meta,
+        timestamp=datetime.fromisoformat(moment),
+    )
+
+
+ENTRIES = [
+    _entry("BTC_USD", "2026-01-01T00:30:00", "60000.12345678"),
+    _entry("EUR_USD", "2026-01-01T00:45:00", "1.16"),
+    _entry("BTC_USD", "2026-01-01T01:10:00", "60100"),
+    _entry("BTC_USD", "2026-01-01T12:00:00", "60500", {
+        "interval": 3600, "open": "59500", "high": "62000",
+        "low": "58000", "count": 5,
+    }),
+    _entry("BTC_USD", "2026-01-01T23:50:00", "59000.5"),
+    _entry("BTC_USD", "2026-01-02T00:10:00", "61000"),
+]
+
+
+@unittest.skipUnless(hasattr(time, "tzset"), "нужен time.tzset")
+class BinaryRateHistoryTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tz = os.environ.get("TZ")
+        os.environ["TZ"] = "Europe/Moscow"
+        time.tzset()
+        self.addCleanup(self._restore_tz, tz)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.journal = RateJournal(str(self.dir / "journal"))
+        self.journal.append_batch(ENTRIES)
+
+    @staticmethod
+    def _restore_tz(tz: str | None) -> None:
+        if tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = tz
+        time.tzset()
+
+    def _open(self) -> BinaryRateHistory:
+        history = BinaryRateHistory(str(self.dir / "bin"))
+        self.addCleanup(history.close)
+        return history
+
+    def test_round_trip_matches_journal_index(self) -> None:
+        binary = self._open()
+        self.assertEqual(convert_journal(self.journal, binary, chunk_size=2), 6)
+        self.assertEqual(binary.pairs(), ["BTC_USD", "EUR_USD"])
+
+        # Новый экземпляр читает файлы через mmap
+        binary = self._open()
+        index = RateHistory(self.journal)
+        at = datetime(2026, 1, 1, 1, 0)
+        self.assertEqual(binary.rate_at("BTC_USD", at), index.rate_at("BTC_USD", at))
+        self.assertEqual(
+            binary.rate_at("BTC_USD", at)["rate"], Rate.of("60000.12345678")
+        )
+        for pair in ("BTC_USD", "EUR_USD"):
+            self.assertEqual(binary.range(pair), index.range(pair))
+        for interval in (3600, 24 * 3600):
+            self.assertEqual(
+                binary.ohlc("BTC_USD", interval), index.ohlc("BTC_USD", interval)
+            )
+
+        daily = binary.ohlc("BTC_USD", 24 * 3600)
+        self.assertEqual(daily[0]["start"], datetime(2026, 1, 1))
+        self.assertEqual(
+            (daily[0]["high"], daily[0]["low"], daily[0]["count"]),
+            (Rate.of(62000), Rate.of(58000), 8),
+        )
+
+        with self.assertRaises(ValueError):
+            convert_journal(self.journal, binary)
+
+    def test_summary(self) -> None:
+        binary = self._open()
+        convert_journal(self.journal, binary)
+
+        summary = binary.summary(
+            "BTC_USD", end=datetime(2026, 1, 1, 23, 59)
+        )
+        self.assertEqual(summary["count"], 8)
+        self.assertEqual(summary["first"], Rate.of("60000.12345678"))
+        self.assertEqual(summary["last"], Rate.of("59000.5"))
+        self.assertEqual(
+            (summary["min"], summary["max"]), (Rate.of(58000), Rate.of(62000))
+        )
+        # (60000.12345678 + 60100 + 60500 + 59000.5) / 4, половина вверх
+        self.assertEqual(summary["mean"], Rate.of("59900.15586420"))
+        self.assertIsNone(binary.summary("BTC_USD", start=datetime(2027, 1, 1)))
+
+    def test_append_seen_by_other_reader(self) -> None:
+        writer = self._open()
+        reader = self._open()
+        writer.append(ENTRIES[:3])
+        self.assertEqual(reader.refresh(), 3)
+
+        # Запись старше последней: файл пары пересобирается по времени
+        writer.append([ENTRIES[5], _entry("BTC_USD", "2026-01-01T00:00:00", "1")])
+        self.assertEqual(reader.refresh(), 2)
+        self.assertEqual(
+            [str(p["rate"]) for p in reader.range("BTC_USD")],
+            ["1", "60000.12345678", "60100", "61000"],
+        )
+
+    def test_torn_record_ignored(self) -> None:
+        history = self._open()
+        history.append(ENTRIES[:3])
+        path = self.dir / "bin" / "BTC_USD.bin"
+        size = path.stat().st_size
+        self.assertEqual(size, HEADER.size + 2 * 3 * 8)
+
+        # Сбой посреди записи: половина записи в конце файла
+        with open(path, "ab") as f:
+            f.write(b"\x01" * 12)
+        self.assertEqual(len(self._open().range("BTC_USD")), 2)
+
+        # Следующая дозапись отрезает хвост
+        history.append([ENTRIES[4]])
+        self.assertEqual(path.stat().st_size, HEADER.size + 3 * 3 * 8)
+        self.assertEqual(
+            self._open().range("BTC_USD")[-1]["rate"], Rate.of("59000.5")
+        )
+
+    def test_unrepresentable_rate_rejected(self) -> None:
+        history = self._open()
+        with self.assertRaises(ValueError):
+            history.append([_entry("SHIB_USD", "2026-01-01T00:00:00", "0.000000001")])
+
+        (self.dir / "bin" / "BAD_USD.bin").write_bytes(b"\0" * HEADER.size)
+        with self.assertRaises(ValueError):
+            self._open()
+
+
+if __name__ == "__main__":
+    unittest.main()
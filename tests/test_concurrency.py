@@ -0,0 +1,132 @@
+"""
+Сделки из нескольких процессов: чередующиеся покупки и продажи через
+run_synced не должны терять обновления ни в одном из хранилищ.
+"""
+
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from valutatrade_hub.cli.backend.json_backend import JsonStorageBackend
+from valutatrade_hub.cli.backend.sqlite_backend import SqliteStorageBackend
+from valutatrade_hub.cli.ledger import TradeLedger
+from valutatrade_hub.cli.manager.portfolio import PortfolioManager
+from valutatrade_hub.core.money import Money
+
+PROCESSES = 4
+ROUNDS = 15
+SHARED_USER = 100
+BUY, SELL = "3", "1"
+
+
+class _FixedRate:
+    """Курсы без хранилища: сделкам нужен только get_rate."""
+
+    def is_expired(self) -> None:
+        pass
+
+    def get_rate(self, from_currency: str, to_currency: str) -> dict:
+        return {"rate": "1.5"}
+
+
+class _Scenario:
+    """Каталог с данными и способ открыть хранилище из любого процесса."""
+
+    def __init__(self, directory: Path, backend: str, ledger: bool) -> None:
+        self.directory = directory
+        self.backend = backend
+        self.ledger = ledger
+        if backend == "json":
+            for name in ("users", "portfolios"):
+                (directory / f"{name}.json").write_text("[]")
+            (directory / "rates.json").write_text("{}")
+
+    @property
+    def trades_file(self) -> str:
+        return str(self.directory / "trades.jsonl")
+
+    def manager(self) -> PortfolioManager:
+        if self.backend == "json":
+            backend = JsonStorageBackend(
+                str(self.directory / "users.json"),
+                str(self.directory / "portfolios.json"),
+                str(self.directory / "rates.json"),
+            )
+        else:
+            backend = SqliteStorageBackend(str(self.directory / "valutatrade.db"))
+        ledger = TradeLedger(self.trades_file) if self.ledger else None
+        # Частые снимки: StaleDataError на снимке тоже должен отрабатываться
+        return PortfolioManager(backend, ledger=ledger, snapshot_every=5)
+
+
+def _trade(scenario: _Scenario, user_id: int, ready) -> None:
+    manager = scenario.manager()
+    rates = _FixedRate()
+    ready.wait()
+    for _ in range(ROUNDS):
+        for target in (user_id, SHARED_USER):
+            manager.buy_currency(target, rates, "EUR", BUY, "USD")
+            manager.sell_currency(target, rates, "EUR", SELL, "USD")
+    manager.save()
+
+
+class ConcurrentTradesTest(unittest.TestCase):
+    def _run(self, backend: str, ledger: bool) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            scenario = _Scenario(Path(tmp), backend, ledger)
+            users = list(range(1, PROCESSES + 1))
+            manager = scenario.manager()
+            for user_id in (*users, SHARED_USER):
+                manager.create_portfolio(user_id)
+
+            context = multiprocessing.get_context("fork")
+            ready = context.Event()
+            workers = [
+                context.Process(target=_trade, args=(scenario, user_id, ready))
+                for user_id in users
+            ]
+            for worker in workers:
+                worker.start()
+            ready.set()
+            for worker in workers:
+                worker.join(timeout=120)
+                self.assertEqual(worker.exitcode, 0)
+
+            per_user = (int(BUY) - int(SELL)) * ROUNDS
+            expected = {user_id: Money.of(per_user, 2) for user_id in users}
+            expected[SHARED_USER] = Money.of(per_user * PROCESSES, 2)
+
+            # Свежий процесс видит все сделки: снимок плюс хвост журнала
+            fresh = scenario.manager()
+            for user_id, balance in expected.items():
+                wallet = fresh.get_by_user_id(user_id).get_wallet("EUR")
+                self.assertEqual(wallet.balance, balance, f"user {user_id}")
+
+            if ledger:
+                with open(scenario.trades_file, encoding="utf-8") as f:
+                    events = [json.loads(line) for line in f]
+                self.assertEqual(len(events), PROCESSES * ROUNDS * 4)
+                self.assertEqual(
+                    [event["seq"] for event in events],
+                    list(range(1, len(events) + 1)),
+                )
+                self.assertEqual(len({event["op_id"] for event in events}), len(events))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "нужен fork")
+    def test_json(self) -> None:
+        self._run("json", ledger=False)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "нужен fork")
+    def test_json_with_ledger(self) -> None:
+        self._run("json", ledger=True)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "нужен fork")
+    def test_sqlite_with_ledger(self) -> None:
+        self._run("sqlite", ledger=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
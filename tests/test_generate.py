@@ -0,0 +1,114 @@
+"""
+Генератор синтетических данных: одинаковый seed дает одинаковых
+пользователей, портфели и журнал (в том числе в файлах), другой seed —
+другие данные; хранилища json и sqlite получают одно и то же.
+"""
+
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from valutatrade_hub.cli.backend.json_backend import JsonStorageBackend
+from valutatrade_hub.cli.backend.sqlite_backend import SqliteStorageBackend
+from valutatrade_hub.cli.generate import DatasetGenerator, run_generate
+from valutatrade_hub.cli.manager.user import UserManager
+from valutatrade_hub.core.currencies import get_currency
+from valutatrade_hub.parser.journal import RateJournal
+
+
+class DatasetGeneratorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def _generate(self, *args: str) -> int:
+        with contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            return run_generate(list(args))
+
+    def test_same_seed_same_data(self) -> None:
+        first, second = DatasetGenerator(7), DatasetGenerator(7)
+        self.assertEqual(list(first.users(5)), list(second.users(5)))
+        self.assertEqual(list(first.portfolios(20)), list(second.portfolios(20)))
+        self.assertEqual(list(first.journal(50)), list(second.journal(50)))
+
+        # Потоки независимы: портфели не зависят от того, сколько
+        # пользователей сгенерировано до них
+        list(first.users(3))
+        self.assertEqual(list(first.portfolios(20)), list(second.portfolios(20)))
+
+    def test_other_seed_other_data(self) -> None:
+        first, second = DatasetGenerator(7), DatasetGenerator(8)
+        self.assertNotEqual(
+            [u["salt"] for u in first.users(5)], [u["salt"] for u in second.users(5)]
+        )
+        self.assertNotEqual(list(first.portfolios(20)), list(second.portfolios(20)))
+        self.assertNotEqual(
+            [e["rate"] for e in first.journal(50)],
+            [e["rate"] for e in second.journal(50)],
+        )
+
+    def test_balances_in_currency_scale(self) -> None:
+        for portfolio in DatasetGenerator(3).portfolios(50):
+            self.assertTrue(portfolio["wallets"])
+            for code, balance in portfolio["wallets"].items():
+                decimals = len(balance.partition(".")[2])
+                self.assertEqual(decimals, get_currency(code).scale, balance)
+
+    def test_generated_users_can_log_in(self) -> None:
+        paths = DatasetGenerator(3).write_json(self.dir, users=3)
+        backend = JsonStorageBackend(
+            paths["users"], paths["portfolios"], paths["rates"]
+        )
+        user = UserManager(backend).authenticate("user2", "password2")
+        self.assertEqual(user.user_id, 2)
+
+    def test_cli_output_reproducible(self) -> None:
+        for name in ("a", "b"):
+            code = self._generate(
+                "--out", str(self.dir / name), "--users", "10",
+                "--journal", "40", "--seed", "11",
+            )
+            self.assertEqual(code, 0)
+
+        for name in ("users.json", "portfolios.json"):
+            self.assertEqual(
+                (self.dir / "a" / name).read_bytes(),
+                (self.dir / "b" / name).read_bytes(),
+            )
+        journals = [
+            list(RateJournal(str(self.dir / name / "exchange_rates")).iter_entries())
+            for name in ("a", "b")
+        ]
+        self.assertEqual(len(journals[0]), 40)
+        self.assertEqual(journals[0], journals[1])
+
+    def test_sqlite_matches_json(self) -> None:
+        code = self._generate(
+            "--out", str(self.dir), "--users", "10", "--journal", "0",
+            "--seed", "11", "--backend", "sqlite",
+        )
+        self.assertEqual(code, 0)
+        backend = SqliteStorageBackend(str(self.dir / "valutatrade.db"))
+        self.addCleanup(backend.close)
+
+        generator = DatasetGenerator(11)
+        self.assertEqual(backend.load_users(), list(generator.users(10)))
+        self.assertEqual(
+            sorted(backend.load_portfolios(), key=lambda p: p["user_id"]),
+            list(generator.portfolios(10)),
+        )
+
+    def test_bad_arguments(self) -> None:
+        self.assertEqual(self._generate("--users", "10"), 2)
+        self.assertEqual(self._generate("--out", str(self.dir), "--users", "x"), 2)
+        self.assertEqual(
+            self._generate("--out", str(self.dir), "--backend", "redis"), 2
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+История курсов по журналу: котировка на момент времени, выборка по
+диапазону и свечи OHLC (в том числе по свечам сжатого журнала) без
+потери точности курса; свечи выровнены по местному времени.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+from valutatrade_hub.core.money import Rate
+from valutatrade_hub.parser.history import RateHistory, parse_interval
+from valutatrade_hub.parser.journal import RateJournal, journal_entry
+
+
+def _entry(moment: str, rate: str, meta: dict | None = None) -> dict:
+    return journal_entry(
+        "BTC", "USD", rate, "test", meta, timestamp=datetime.fromisoformat(moment)
+    )
+
+
+ENTRIES = [
+    _entry("2026-01-01T00:30:00", "60000.12345678"),
+    _entry("2026-01-01T01:10:00", "60100"),
+    # Свеча сжатого журнала: точка закрытия и open/high/low/count часа
+    _entry("2026-01-01T12:00:00", "60500", {
+        "interval": 3600, "open": "59500", "high": "62000",
+        "low": "58000", "count": 5,
+    }),
+    _entry("2026-01-01T23:50:00", "59000.5"),
+    _entry("2026-01-02T00:10:00", "61000"),
+]
+
+
+@unittest.skipUnless(hasattr(time, "tzset"), "нужен time.tzset")
+class RateHistoryTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # Местное время UTC+3: полночь UTC приходится на 03:00
+        tz = os.environ.get("TZ")
+        os.environ["TZ"] = "Europe/Moscow"
+        time.tzset()
+        self.addCleanup(self._restore_tz, tz)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.journal = RateJournal(tmp.name)
+        self.journal.append_batch(ENTRIES)
+        self.history = RateHistory(self.journal)
+
+    @staticmethod
+    def _restore_tz(tz: str | None) -> None:
+        if tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = tz
+        time.tzset()
+
+    def test_rate_at(self) -> None:
+        point = self.history.rate_at("btc_usd", datetime(2026, 1, 1, 1, 0))
+        self.assertEqual(point["timestamp"], datetime(2026, 1, 1, 0, 30))
+        # Курс хранится целым числом единиц, а не float
+        self.assertEqual(point["rate"], Rate.of("60000.12345678"))
+        self.assertEqual(str(point["rate"]), "60000.12345678")
+        self.assertEqual(point["source"], "test")
+
+        exact = self.history.rate_at("BTC_USD", datetime(2026, 1, 1, 1, 10))
+        self.assertEqual(exact["rate"], Rate.of(60100))
+        self.assertIsNone(self.history.rate_at("BTC_USD", datetime(2025, 12, 31)))
+
+        with self.assertRaises(ValueError):
+            self.history.rate_at("EUR_USD", datetime(2026, 1, 1))
+
+    def test_range_inclusive(self) -> None:
+        points = self.history.range(
+            "BTC_USD", datetime(2026, 1, 1, 1, 10), datetime(2026, 1, 1, 23, 50)
+        )
+        self.assertEqual(
+            [str(p["rate"]) for p in points], ["60100", "60500", "59000.5"]
+        )
+
+    def test_daily_candles_start_at_local_midnight(self) -> None:
+        candles = self.history.ohlc("BTC_USD", parse_interval("1d"))
+
+        self.assertEqual(
+            [c["start"] for c in candles],
+            [datetime(2026, 1, 1), datetime(2026, 1, 2)],
+        )
+        first = candles[0]
+        self.assertEqual(first["open"], Rate.of("60000.12345678"))
+        # high/low и число котировок — с учетом свечи сжатого журнала
+        self.assertEqual(first["high"], Rate.of(62000))
+        self.assertEqual(first["low"], Rate.of(58000))
+        self.assertEqual(first["close"], Rate.of("59000.5"))
+        self.assertEqual(first["count"], 8)
+        self.assertEqual(candles[1]["count"], 1)
+
+    def test_hourly_candles_and_refresh(self) -> None:
+        self.journal.append_batch([_entry("2026-01-02T00:40:00", "61500")])
+        self.assertEqual(self.history.refresh(), 1)
+
+        candles = self.history.ohlc(
+            "BTC_USD", parse_interval("1h"), start=datetime(2026, 1, 1, 12)
+        )
+        self.assertEqual(
+            [(c["start"].hour, c["count"]) for c in candles],
+            [(12, 5), (23, 1), (0, 2)],
+        )
+        # Свеча сжатого журнала открывается своим open
+        self.assertEqual(candles[0]["open"], Rate.of(59500))
+        self.assertEqual(candles[-1]["close"], Rate.of(61500))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Бюджет времени старта: main и командный интерфейс не должны тянуть
+хранилище, менеджеры и модули отдельных команд и должны укладываться
+в IMPORT_BUDGET_MS.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Суммарное время импорта valutatrade_hub.main и cli.interface (их
+# импортирует любая команда, кроме generate) по -X importtime, лучшая
+# из RUNS попыток. Замер на Python 3.12: ~40 мс (main ~25 мс, из них
+# logging.handlers ~9 мс; interface ~15 мс). Запас на медленные машины
+IMPORT_BUDGET_MS = 100
+RUNS = 5
+
+# Импортируются только командами, которым они нужны
+LAZY_MODULES = (
+    "asyncio",
+    "cProfile",
+    "tracemalloc",
+    "mmap",
+    "sqlite3",
+    "requests",
+    "valutatrade_hub.cli.backend.factory",
+    "valutatrade_hub.cli.manager.portfolio",
+    "valutatrade_hub.cli.manager.rate",
+    "valutatrade_hub.cli.manager.user",
+    "valutatrade_hub.core.valuation",
+    "valutatrade_hub.parser.history",
+    "valutatrade_hub.parser.journal",
+    "valutatrade_hub.parser.updater",
+    "valutatrade_hub.parser.binary_history",
+    "valutatrade_hub.parser.compaction",
+    "valutatrade_hub.cli.ledger",
+    "valutatrade_hub.cli.profiler",
+)
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    # Временный каталог: команда не должна создавать data/ и logs/ в репозитории
+    with tempfile.TemporaryDirectory() as cwd:
+        return subprocess.run(
+            [sys.executable, *args],
+            cwd=cwd, env=env, capture_output=True, text=True, check=True,
+        )
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_lazy_modules_not_imported(self) -> None:
+        # Команда help проходит весь путь main -> CLIInterface -> run_once
+        result = _python(
+            "-c",
+            "import sys\n"
+            "from valutatrade_hub.cli.interface import CLIInterface\n"
+            "import valutatrade_hub.main\n"
+            "CLIInterface().run_once(['help'])\n"
+            f"print('LOADED', *[m for m in {LAZY_MODULES!r} if m in sys.modules])",
+        )
+        loaded = result.stdout.strip().splitlines()[-1].split()
+        self.assertEqual(loaded, ["LOADED"])
+
+    def test_import_time_budget(self) -> None:
+        best = None
+        for _ in range(RUNS):
+            result = _python(
+                "-X", "importtime",
+                "-c", "import valutatrade_hub.main, valutatrade_hub.cli.interface",
+            )
+            # "import time: self [us] | cumulative | imported package";
+            # складываются модули верхнего уровня (без отступа) пакета
+            total = 0
+            for line in result.stderr.splitlines():
+                fields = line.split("|")
+                if len(fields) == 3 and fields[2].startswith(" valutatrade_hub"):
+                    total += int(fields[1])
+            if total:
+                best = total if best is None else min(best, total)
+
+        self.assertIsNotNone(best)
+        self.assertLessEqual(
+            best / 1000,
+            IMPORT_BUDGET_MS,
+            f"импорт main и cli.interface: {best / 1000:.1f} мс",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Журнал курсов: дозапись пачками в сегменты JSON lines, закрытие
+сегмента по размеру, инкрементальное чтение хвоста (недописанная строка
+ждет следующего раза) и перенос старого exchange_rates.json.
+"""
+
+import json
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from valutatrade_hub.parser.journal import RateJournal, journal_entry
+
+
+def _entries(count: int, start: int = 0) -> list:
+    return [
+        journal_entry(
+            "BTC", "USD", f"{60000 + i}.5", "test",
+            timestamp=datetime(2026, 1, 1, 0, i),
+        )
+        for i in range(start, start + count)
+    ]
+
+
+class RateJournalTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def test_entry_format(self) -> None:
+        entry = journal_entry(
+            "EUR", "USD", 1.1, "ExchangeRate-API",
+            timestamp=datetime(2026, 1, 1, 12),
+        )
+        self.assertEqual(entry["id"], "EUR_USD_2026-01-01T12:00:00")
+        # Курс — строка с фиксированной точкой, без float
+        self.assertEqual(entry["rate"], "1.1")
+        self.assertEqual(entry["meta"], {})
+
+    def test_append_batch_and_read_back(self) -> None:
+        journal = RateJournal(str(self.dir / "journal"))
+        self.assertEqual(journal.append_batch(_entries(3)), 3)
+        self.assertEqual(journal.append_batch([]), 0)
+        journal.append_batch(_entries(2, start=3))
+
+        self.assertEqual(len(journal.segments()), 1)
+        rates = [entry["rate"] for entry in journal.iter_entries()]
+        self.assertEqual(rates, [f"{60000 + i}.5" for i in range(5)])
+
+    def test_segment_closed_by_size(self) -> None:
+        journal = RateJournal(str(self.dir / "journal"), max_segment_bytes=200)
+        for i in range(0, 6, 2):
+            journal.append_batch(_entries(2, start=i))
+
+        segments = journal.segments()
+        self.assertEqual(len(segments), 3)
+        self.assertEqual(
+            [name.name[:14] for name in segments],
+            ["segment-000001", "segment-000002", "segment-000003"],
+        )
+        # Пачка не делится между сегментами, порядок записей сохраняется
+        self.assertEqual(
+            [len(list(RateJournal.read_segment(s))) for s in segments], [2, 2, 2]
+        )
+        self.assertEqual(
+            [e["timestamp"][-5:-3] for e in journal.iter_entries()],
+            ["00", "01", "02", "03", "04", "05"],
+        )
+
+    def test_read_from_position(self) -> None:
+        journal = RateJournal(str(self.dir / "journal"), max_segment_bytes=200)
+        journal.append_batch(_entries(2))
+        entries, position = journal.read_from(None)
+        self.assertEqual(len(entries), 2)
+
+        # Следующий сегмент и недописанная строка (сбой посреди записи)
+        journal.append_batch(_entries(2, start=2))
+        active = journal.segments()[-1]
+        line = json.dumps(_entries(1, start=4)[0]) + "\n"
+        with open(active, "a", encoding="utf-8") as f:
+            f.write(line[:20])
+
+        entries, position = journal.read_from(position)
+        self.assertEqual([e["timestamp"][-5:-3] for e in entries], ["02", "03"])
+        self.assertEqual(position[0], active.name)
+        self.assertEqual(len(list(journal.iter_entries())), 4)
+
+        with open(active, "a", encoding="utf-8") as f:
+            f.write(line[20:])
+        entries, position = journal.read_from(position)
+        self.assertEqual([e["timestamp"][-5:-3] for e in entries], ["04"])
+        self.assertEqual(journal.read_from(position), ([], position))
+
+    def test_legacy_file_migrated_once(self) -> None:
+        legacy = self.dir / "exchange_rates.json"
+        legacy.write_text(json.dumps(_entries(3)), encoding="utf-8")
+
+        journal = RateJournal(str(self.dir / "journal"), legacy_file=str(legacy))
+        self.assertFalse(legacy.exists())
+        self.assertTrue(legacy.with_name("exchange_rates.json.migrated").exists())
+        self.assertEqual(len(list(journal.iter_entries())), 3)
+
+        # Журнал уже не пуст: повторный перенос ничего не делает
+        legacy.write_text(json.dumps(_entries(1)), encoding="utf-8")
+        self.assertEqual(journal.migrate_legacy(str(legacy)), 0)
+        self.assertTrue(legacy.exists())
+        self.assertEqual(len(list(journal.iter_entries())), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
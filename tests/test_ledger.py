@@ -0,0 +1,216 @@
+"""
+Журнал сделок: восстановление портфелей из снимка и хвоста журнала,
+повтор после сбоя (недописанная строка, устаревший или забежавший
+вперед checkpoint), групповая запись событий и история сделок
+пользователя через индекс.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from valutatrade_hub.cli.backend.json_backend import JsonStorageBackend
+from valutatrade_hub.cli.backend.sqlite_backend import SqliteStorageBackend
+from valutatrade_hub.cli.ledger import TradeLedger
+from valutatrade_hub.cli.manager.portfolio import PortfolioManager
+from valutatrade_hub.core.money import Money
+
+USER = 1
+
+
+class _FixedRate:
+    """Курсы без хранилища: сделкам нужен только get_rate."""
+
+    def is_expired(self) -> None:
+        pass
+
+    def get_rate(self, from_currency: str, to_currency: str) -> dict:
+        return {"rate": "2"}
+
+
+class LedgerRecoveryTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        for name in ("users", "portfolios"):
+            (self.dir / f"{name}.json").write_text("[]")
+        (self.dir / "rates.json").write_text("{}")
+        self.trades = str(self.dir / "trades.jsonl")
+
+    def _backend(self) -> JsonStorageBackend:
+        return JsonStorageBackend(
+            str(self.dir / "users.json"),
+            str(self.dir / "portfolios.json"),
+            str(self.dir / "rates.json"),
+        )
+
+    def _manager(self, snapshot_every: int = 3) -> PortfolioManager:
+        return PortfolioManager(
+            self._backend(),
+            ledger=TradeLedger(self.trades),
+            snapshot_every=snapshot_every,
+        )
+
+    def _buy(self, manager: PortfolioManager, times: int, amount: str = "1") -> None:
+        for _ in range(times):
+            manager.buy_currency(USER, _FixedRate(), "EUR", amount, "USD")
+
+    def _balance(self, manager: PortfolioManager) -> Money:
+        return manager.get_by_user_id(USER).get_wallet("EUR").balance
+
+    def _snapshot(self) -> dict:
+        data = json.loads((self.dir / "portfolios.json").read_text())
+        return next(item for item in data if item["user_id"] == USER)
+
+    def test_snapshot_plus_tail(self) -> None:
+        manager = self._manager()
+        manager.create_portfolio(USER)
+        self._buy(manager, 5)
+
+        # Снимок — на третьем событии, два последних только в журнале
+        snapshot = self._snapshot()
+        self.assertEqual(snapshot["ledger_seq"], 3)
+        self.assertEqual(Money.of(snapshot["wallets"]["EUR"], 2), Money.of(3, 2))
+        checkpoint = TradeLedger(self.trades).checkpoint()
+        self.assertEqual(checkpoint["seq"], 3)
+
+        fresh = self._manager()
+        self.assertEqual(self._balance(fresh), Money.of(5, 2))
+        # Нумерация продолжается после повтора хвоста
+        self._buy(fresh, 1)
+        self.assertEqual(TradeLedger(self.trades).last_seq, 6)
+
+    def test_torn_tail_ignored_and_truncated(self) -> None:
+        manager = self._manager()
+        manager.create_portfolio(USER)
+        self._buy(manager, 4)
+
+        # Сбой посреди записи события
+        with open(self.trades, "ab") as f:
+            f.write(b'{"seq": 5, "op_id": "torn", "user_id": 1, "side": "bu')
+
+        fresh = self._manager()
+        self.assertEqual(self._balance(fresh), Money.of(4, 2))
+        self._buy(fresh, 1, "0.5")
+
+        with open(self.trades, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual([e["seq"] for e in events], [1, 2, 3, 4, 5])
+        self.assertEqual(events[-1]["amount"], "0.50")
+        self.assertEqual(self._balance(self._manager()), Money.of("4.5", 2))
+
+    def test_stale_checkpoint_replays_without_double_apply(self) -> None:
+        manager = self._manager()
+        manager.create_portfolio(USER)
+        self._buy(manager, 3)
+        old_checkpoint = Path(f"{self.trades}.checkpoint").read_text()
+        self._buy(manager, 3)
+
+        # Сбой после снимка, но до записи checkpoint: он остался прежним
+        Path(f"{self.trades}.checkpoint").write_text(old_checkpoint)
+        self.assertEqual(self._snapshot()["ledger_seq"], 6)
+        self.assertEqual(self._balance(self._manager()), Money.of(6, 2))
+
+    def test_checkpoint_past_snapshot_replays_whole_ledger(self) -> None:
+        manager = self._manager()
+        manager.create_portfolio(USER)
+        self._buy(manager, 4)
+
+        ledger = TradeLedger(self.trades)
+        ledger.save_checkpoint()  # seq 4 при снимке с ledger_seq 3
+        self.assertEqual(self._balance(self._manager()), Money.of(4, 2))
+
+    def test_checkpoint_written_after_commit(self) -> None:
+        manager = self._manager(snapshot_every=1000)
+        manager.create_portfolio(USER)
+        self._buy(manager, 2)
+
+        checkpoint_path = Path(f"{self.trades}.checkpoint")
+        backend = manager._backend
+        with backend.transaction():
+            manager.save()
+            # Снимок еще не зафиксирован — checkpoint не сдвигается
+            self.assertFalse(checkpoint_path.exists())
+        self.assertEqual(json.loads(checkpoint_path.read_text())["seq"], 2)
+        # Временных файлов не остается
+        self.assertEqual(
+            sorted(p.name for p in self.dir.iterdir() if p.name.startswith(".")), []
+        )
+
+    def test_checkpoint_dropped_on_rollback(self) -> None:
+        backend = SqliteStorageBackend(str(self.dir / "valutatrade.db"))
+        self.addCleanup(backend.close)
+        ledger = TradeLedger(self.trades)
+        ledger.append(USER, "buy", "EUR", "1.00", "2", "USD")
+
+        with self.assertRaises(RuntimeError):
+            with backend.transaction():
+                backend.after_commit(ledger.save_checkpoint)
+                raise RuntimeError("сбой до фиксации")
+        self.assertEqual(ledger.checkpoint(), {"seq": 0, "offset": 0})
+
+        with backend.transaction():
+            backend.after_commit(ledger.save_checkpoint)
+        self.assertEqual(ledger.checkpoint()["seq"], 1)
+
+    def test_snapshot_flushes_buffered_events(self) -> None:
+        manager = self._manager(snapshot_every=1000)
+        manager.create_portfolio(USER)
+        ledger = manager._ledger
+
+        with ledger.buffered():
+            self._buy(manager, 2)
+            self.assertFalse(os.path.exists(self.trades))
+            # Снимок с ledger_seq 2 не может опередить журнал на диске
+            manager.save()
+            self.assertEqual(len(Path(self.trades).read_text().splitlines()), 2)
+            self._buy(manager, 1)
+        self.assertEqual(self._balance(self._manager()), Money.of(3, 2))
+
+
+class LedgerBufferTest(unittest.TestCase):
+    def test_buffered_appends_written_once(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trades.jsonl")
+            ledger = TradeLedger(path)
+            with ledger.buffered():
+                for _ in range(3):
+                    ledger.append(USER, "buy", "EUR", "1.00", "2", "USD")
+                self.assertFalse(os.path.exists(path))
+                self.assertEqual(ledger.last_seq, 3)
+
+            self.assertEqual(ledger.offset, os.path.getsize(path))
+            reopened = TradeLedger(path)
+            self.assertEqual((reopened.last_seq, reopened.offset), (3, ledger.offset))
+            # После группы запись продолжается как обычно
+            reopened.append(USER, "sell", "EUR", "1.00", "2", "USD")
+            self.assertEqual(reopened.last_seq, 4)
+
+
+class LedgerHistoryTest(unittest.TestCase):
+    def test_history_through_index(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trades.jsonl")
+            ledger = TradeLedger(path)
+            for i in range(1, 7):
+                ledger.append(i % 2 + 1, "buy", "EUR", f"{i}.00", "2", "USD")
+
+            history = ledger.history(2, limit=2)
+            self.assertEqual([e["amount"] for e in history], ["3.00", "5.00"])
+            self.assertEqual(len(ledger.history(1)), 3)
+            self.assertEqual(ledger.history(3), [])
+            self.assertEqual(os.path.getsize(f"{path}.idx"), 6 * 16)
+
+            # Другой процесс дописал события: индекс продолжается с них
+            TradeLedger(path).append(1, "sell", "EUR", "1.00", "2", "USD")
+            history = TradeLedger(path).history(1)
+            self.assertEqual([e["seq"] for e in history], [2, 4, 6, 7])
+            self.assertEqual(history[-1]["side"], "sell")
+            self.assertEqual(os.path.getsize(f"{path}.idx"), 7 * 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+Логирование: запись в файл через ограниченную очередь и фоновый поток,
+политики переполнения drop и block, формат JSON lines и поля операций,
+которые log_action передает через extra.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from valutatrade_hub.core.decorators import log_action
+from valutatrade_hub.infra import logging_config
+from valutatrade_hub.infra.logging_config import (
+    BoundedQueueHandler,
+    JsonLinesFormatter,
+)
+from valutatrade_hub.infra.settings import SettingsLoader
+
+
+def _record(message: str = "BUY", **extra) -> logging.LogRecord:
+    return logging.makeLogRecord({
+        "name": "test", "levelno": logging.INFO, "levelname": "INFO",
+        "msg": message, **extra,
+    })
+
+
+class _User:
+    username = "alice"
+
+
+class BoundedQueueHandlerTest(unittest.TestCase):
+    def test_drop_when_full(self) -> None:
+        log_queue: queue.Queue = queue.Queue(maxsize=2)
+        handler = BoundedQueueHandler(log_queue, "drop")
+        for i in range(5):
+            handler.handle(_record(f"m{i}"))
+
+        self.assertEqual(handler.dropped, 3)
+        self.assertEqual(
+            [log_queue.get_nowait().getMessage() for _ in range(2)], ["m0", "m1"]
+        )
+
+    def test_block_waits_for_space(self) -> None:
+        log_queue: queue.Queue = queue.Queue(maxsize=1)
+        handler = BoundedQueueHandler(log_queue, "block")
+        handler.handle(_record("first"))
+
+        writer = threading.Thread(target=handler.handle, args=(_record("second"),))
+        writer.start()
+        writer.join(timeout=0.1)
+        self.assertTrue(writer.is_alive())
+
+        self.assertEqual(log_queue.get().getMessage(), "first")
+        writer.join(timeout=2)
+        self.assertFalse(writer.is_alive())
+        self.assertEqual(log_queue.get_nowait().getMessage(), "second")
+        self.assertEqual(handler.dropped, 0)
+
+    def test_unknown_policy(self) -> None:
+        with self.assertRaises(ValueError):
+            BoundedQueueHandler(queue.Queue(), "spill")
+
+
+class JsonLinesFormatterTest(unittest.TestCase):
+    def test_action_fields(self) -> None:
+        line = JsonLinesFormatter().format(_record(
+            "BUY user=%s", args=("alice",), action="BUY", user="alice",
+            amount=0.5, currency=None, duration_ms=1.25,
+        ))
+        data = json.loads(line)
+
+        self.assertEqual(data["message"], "BUY user=alice")
+        self.assertEqual(data["level"], "INFO")
+        self.assertEqual(
+            (data["action"], data["user"], data["amount"], data["duration_ms"]),
+            ("BUY", "alice", 0.5, 1.25),
+        )
+        # Пустые поля не пишутся
+        self.assertNotIn("currency", data)
+        self.assertNotIn("exc_info", data)
+
+    def test_exception(self) -> None:
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            record = _record(exc_info=sys.exc_info())
+        data = json.loads(JsonLinesFormatter().format(record))
+        self.assertIn("RuntimeError: boom", data["exc_info"])
+
+
+class LogActionTest(unittest.TestCase):
+    def test_arguments_passed_as_extra(self) -> None:
+        @log_action("BUY")
+        def buy(user, currency, amount, base_currency="USD"):
+            return amount * 2
+
+        with self.assertLogs("valutatrade_hub.core.decorators", "INFO") as logs:
+            self.assertEqual(buy(_User(), "BTC", amount=3), 6)
+
+        record = logs.records[0]
+        self.assertEqual(
+            (record.action, record.user, record.currency, record.amount,
+             record.base, record.result),
+            ("BUY", "alice", "BTC", 3, "USD", "OK"),
+        )
+        self.assertGreaterEqual(record.duration_ms, 0)
+        self.assertEqual(
+            record.getMessage(),
+            "BUY user=alice currency=BTC amount=3 base=USD result=OK",
+        )
+
+    def test_error_logged_and_raised(self) -> None:
+        @log_action("SELL")
+        def sell(user_id, currency, amount):
+            raise ValueError("Недостаточно средств")
+
+        with self.assertLogs("valutatrade_hub.core.decorators", "INFO") as logs:
+            with self.assertRaises(ValueError):
+                sell(7, "EUR", 10)
+
+        record = logs.records[0]
+        self.assertEqual(record.levelno, logging.ERROR)
+        self.assertEqual(
+            (record.user, record.result, record.error_type, record.error_message),
+            (7, "ERROR", "ValueError", "Недостаточно средств"),
+        )
+
+
+class SetupLoggingTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.log_file = Path(tmp.name) / "logs" / "actions.log"
+
+        root = logging.getLogger()
+        self.addCleanup(root.setLevel, root.level)
+        self.addCleanup(setattr, root, "handlers", list(root.handlers))
+        self.addCleanup(atexit.unregister, logging_config._shutdown)
+
+        for patcher in (
+            mock.patch.object(logging_config, "LOG_FILE", self.log_file),
+            mock.patch.dict(SettingsLoader()._config, {
+                "log_format": "json", "log_queue_size": 100, "log_overflow": "drop",
+            }),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_records_written_by_listener(self) -> None:
+        listener = logging_config.setup_logging()
+        handler = logging.getLogger().handlers[-1]
+        self.assertIsInstance(handler, BoundedQueueHandler)
+        # Каталог создается при первой записи, а не на старте
+        self.assertFalse(self.log_file.parent.exists())
+
+        logger = logging.getLogger("valutatrade_hub.test")
+        for i in range(3):
+            logger.info("event %s", i, extra={"action": "BUY"})
+        handler.dropped = 2
+        logging_config._shutdown(listener, handler, listener.handlers[0])
+
+        lines = [json.loads(line) for line in self.log_file.read_text().splitlines()]
+        self.assertEqual(
+            [line["message"] for line in lines[:3]], ["event 0", "event 1", "event 2"]
+        )
+        self.assertEqual({line["action"] for line in lines[:3]}, {"BUY"})
+        self.assertEqual(lines[3]["level"], "WARNING")
+        self.assertIn("отброшено записей: 2", lines[3]["message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Реестр метрик: обновления из нескольких потоков не теряются,
+вывод Prometheus согласован с накопленными значениями.
+"""
+
+import sys
+import threading
+import unittest
+
+from valutatrade_hub.infra.metrics import MetricsRegistry
+
+THREADS = 8
+UPDATES = 20_000
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.metrics = MetricsRegistry()
+        enabled = self.metrics.enabled
+        self.metrics.enabled = True
+        self.addCleanup(setattr, self.metrics, "enabled", enabled)
+        # Частые переключения потоков: без блокировки += теряет обновления
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+
+    def _run_threads(self, target) -> None:
+        threads = [threading.Thread(target=target) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _metric(self, name: str):
+        return next(m for n, _, m in self.metrics.items() if n == name)
+
+    def test_concurrent_updates_not_lost(self) -> None:
+        def work() -> None:
+            for _ in range(UPDATES):
+                self.metrics.inc("test_threads_total", route="a")
+                self.metrics.observe("test_threads_seconds", 0.001)
+
+        self._run_threads(work)
+
+        self.assertEqual(self._metric("test_threads_total").value, THREADS * UPDATES)
+        histogram = self._metric("test_threads_seconds")
+        self.assertEqual(histogram.count, THREADS * UPDATES)
+        self.assertEqual(sum(histogram.counts), histogram.count)
+
+    def test_prometheus_output(self) -> None:
+        self.metrics.inc("test_render_total", 2, status="200")
+        self.metrics.set("test_render_gauge", 1.5)
+        with self.metrics.timer("test_render_seconds", route="x"):
+            pass
+
+        text = self.metrics.render_prometheus()
+        self.assertIn("# TYPE test_render_total counter\n", text)
+        self.assertIn('test_render_total{status="200"} 2\n', text)
+        self.assertIn("test_render_gauge 1.5\n", text)
+        self.assertIn('test_render_seconds_bucket{route="x",le="+Inf"} 1\n', text)
+        self.assertIn('test_render_seconds_count{route="x"} 1\n', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Модели со __slots__: у пользователя, кошелька, портфеля и валют нет
+__dict__, поведение не изменилось; кошельки портфеля отдаются живым
+представлением только для чтения, коды валют общие из реестра.
+"""
+
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.memory import measure_load
+from valutatrade_hub.cli.backend.json_backend import JsonStorageBackend
+from valutatrade_hub.cli.generate import DatasetGenerator
+from valutatrade_hub.cli.manager.portfolio import PortfolioManager
+from valutatrade_hub.core.currencies import get_currency
+from valutatrade_hub.core.exceptions import InsufficientFundsError
+from valutatrade_hub.core.models.portfolio import Portfolio
+from valutatrade_hub.core.models.user import User
+from valutatrade_hub.core.models.wallet import Wallet
+from valutatrade_hub.core.money import Money
+from valutatrade_hub.core.utils import hash_password
+
+
+class SlotsTest(unittest.TestCase):
+    def test_no_instance_dict(self) -> None:
+        objects = [
+            User(1, "alice", hash_password("secret", "salt"), "salt", datetime.now()),
+            Wallet("BTC", "0.5"),
+            Portfolio(1),
+            get_currency("USD"),
+            get_currency("BTC"),
+        ]
+        for obj in objects:
+            with self.subTest(type(obj).__name__):
+                self.assertFalse(hasattr(obj, "__dict__"))
+                with self.assertRaises(AttributeError):
+                    obj.extra = 1
+
+    def test_user_behaviour(self) -> None:
+        user = User(1, "alice", hash_password("secret", "salt"), "salt", datetime.now())
+        self.assertTrue(user.check_password("secret"))
+        user.change_password("other")
+        self.assertFalse(user.check_password("secret"))
+        self.assertTrue(user.check_password("other"))
+
+        user.username = "  bob "
+        self.assertEqual(user.get_user_info()["username"], "bob")
+        with self.assertRaises(ValueError):
+            user.username = " "
+
+    def test_wallet_behaviour(self) -> None:
+        wallet = Wallet("USD", "10.50")
+        wallet.deposit("0.25")
+        wallet.withdraw(5)
+        self.assertEqual(wallet.balance, Money.of("5.75", 2))
+        with self.assertRaises(InsufficientFundsError):
+            wallet.withdraw("5.76")
+        self.assertEqual(
+            wallet.get_balance_info(),
+            {"currency_code": "USD", "balance": Money.of("5.75", 2)},
+        )
+
+
+class PortfolioWalletsTest(unittest.TestCase):
+    def test_wallets_view(self) -> None:
+        portfolio = Portfolio(1)
+        wallets = portfolio.wallets
+        portfolio.add_currency("EUR")
+
+        # Представление живое, но изменить его нельзя
+        self.assertEqual(list(wallets), ["EUR"])
+        with self.assertRaises(TypeError):
+            wallets["BTC"] = Wallet("BTC")
+        with self.assertRaises(ValueError):
+            portfolio.add_currency("EUR")
+
+    def test_codes_shared_after_load(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = DatasetGenerator(3).write_json(Path(tmp), users=20)
+            manager = PortfolioManager(JsonStorageBackend(
+                paths["users"], paths["portfolios"], paths["rates"]
+            ))
+            for user_id in range(1, 21):
+                for code, wallet in manager.get_by_user_id(user_id).wallets.items():
+                    self.assertIs(code, get_currency(code).code)
+                    self.assertIs(wallet._currency_code, get_currency(code))
+
+    def test_memory_benchmark(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = DatasetGenerator(3).write_json(Path(tmp), users=200)
+            result = measure_load(paths, 200)
+
+        self.assertGreater(result["users_bytes_per_user"], 0)
+        self.assertGreater(result["portfolios_bytes_per_user"], 0)
+        self.assertAlmostEqual(
+            result["bytes_per_user"],
+            result["users_bytes_per_user"] + result["portfolios_bytes_per_user"],
+            delta=0.2,
+        )
+        self.assertGreaterEqual(result["peak_bytes_per_user"], result["bytes_per_user"])
+
+
+if __name__ == "__main__":
+    unittest.main()
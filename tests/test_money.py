@@ -0,0 +1,117 @@
+"""
+Числа с фиксированной точкой: точная арифметика Money и Rate в целых
+единицах, округление половины от нуля при смене масштаба, разбор строк,
+float и Decimal, вывод.
+"""
+
+import unittest
+from decimal import Decimal
+
+from valutatrade_hub.core.money import Money, Rate, currency_scale, to_units
+from valutatrade_hub.core.utils import format_balance
+
+
+class ToUnitsTest(unittest.TestCase):
+    def test_parsing(self) -> None:
+        self.assertEqual(to_units("123.45", 2), 12345)
+        self.assertEqual(to_units("7", 3), 7000)
+        self.assertEqual(to_units(Decimal("1.5"), 2), 150)
+        self.assertEqual(to_units(3, 2), 300)
+        # float — через repr, как Decimal(str(x))
+        self.assertEqual(to_units(0.1, 2), 10)
+        self.assertEqual(to_units(1e-5, 8), 1000)
+        self.assertEqual(to_units(" 2.5 ", 1), 25)
+
+    def test_rounding_half_away_from_zero(self) -> None:
+        self.assertEqual(to_units("1.005", 2), 101)
+        self.assertEqual(to_units("1.004", 2), 100)
+        self.assertEqual(to_units("-1.005", 2), -101)
+        self.assertEqual(to_units(Money.of("0.125", 3), 2), 13)
+        self.assertEqual(to_units(Money.of("-0.125", 3), 2), -13)
+
+    def test_invalid_values(self) -> None:
+        for value in ("abc", "NaN", "inf", ""):
+            with self.subTest(value=value), \
+                    self.assertRaises((ArithmeticError, ValueError)):
+                to_units(value, 2)
+
+
+class MoneyTest(unittest.TestCase):
+    def test_sum_is_exact(self) -> None:
+        total = sum((Money.of("0.10", 2) for _ in range(10)), Money(0, 2))
+        self.assertEqual(total, Money.of(1, 2))
+        self.assertEqual(str(total), "1.00")
+        self.assertEqual(Money.of(0.1, 2) + Money.of(0.2, 2), Money.of("0.3", 2))
+
+    def test_mixed_scales(self) -> None:
+        result = Money.of("1.25", 2) + Money.of("0.00000001", 8)
+        self.assertEqual(result.scale, 8)
+        self.assertEqual(str(result), "1.25000001")
+        self.assertEqual(Money.of(5, 2) - 2, Money.of(3, 8))
+        self.assertEqual(10 - Money.of("0.01", 2), Money.of("9.99", 2))
+        self.assertEqual(hash(Money.of(1, 2)), hash(Money.of(1, 8)))
+
+    def test_comparison(self) -> None:
+        self.assertLess(Money.of("0.99", 2), 1)
+        self.assertGreater(Money.of("0.00000001", 8), Money(0, 2))
+        self.assertFalse(Money(0, 2))
+        self.assertEqual(-Money.of("1.5", 2), Money.of("-1.5", 2))
+        self.assertEqual(abs(Money.of("-2", 2)), Money.of(2, 2))
+
+    def test_rescale_and_format(self) -> None:
+        value = Money.of("2.675", 3)
+        self.assertEqual(str(value.rescale(2)), "2.68")
+        self.assertEqual(str(Money.of("-2.675", 3).rescale(2)), "-2.68")
+        self.assertEqual(str(value.rescale(5)), "2.67500")
+        self.assertEqual(f"{value:.2f}", "2.68")
+        self.assertEqual(f"{value:.4f}", "2.6750")
+        self.assertEqual(f"{Money.of('-0.05', 2)}", "-0.05")
+        self.assertEqual(repr(Money.of("0.5", 2)), "Money('0.50')")
+
+    def test_convert_rounds_to_target_scale(self) -> None:
+        rate = Rate.of("1.105")
+        # 0.05 * 1.105 = 0.05525 -> 0.06
+        self.assertEqual(Money.of("0.05", 2).convert(rate, 2), Money.of("0.06", 2))
+        self.assertEqual(
+            Money.of("-0.05", 2).convert(rate, 2), Money.of("-0.06", 2)
+        )
+        # Масштаб больше, чем у суммы и курса вместе
+        short = Rate.of("1.5", 1)
+        self.assertEqual(
+            Money.of("0.01", 2).convert(short, 8), Money.of("0.015", 8)
+        )
+
+    def test_currency_scale(self) -> None:
+        self.assertEqual(currency_scale("USD"), 2)
+        self.assertEqual(currency_scale("BTC"), 8)
+        self.assertEqual(currency_scale("XXX"), 8)
+
+
+class RateTest(unittest.TestCase):
+    def test_str_without_trailing_zeros(self) -> None:
+        self.assertEqual(str(Rate.of("1.1000")), "1.1")
+        self.assertEqual(str(Rate.of(60000)), "60000")
+        self.assertEqual(str(Rate.of("0.000000000000000001")), "0.000000000000000001")
+
+    def test_inverse_and_cross(self) -> None:
+        self.assertEqual(Rate.of(4).inverse(), Rate.of("0.25"))
+        # 1 / 3 с 18 знаками, последний округлен
+        self.assertEqual(str(Rate.of(3).inverse()), "0.333333333333333333")
+        self.assertEqual(str(Rate.of("1.5").inverse()), "0.666666666666666667")
+        with self.assertRaises(ZeroDivisionError):
+            Rate.of(0).inverse()
+
+        self.assertEqual(Rate.of("1.1").cross(Rate.of(80)), Rate.of(88))
+        self.assertEqual(Rate.of(2).cross(Rate.of(2).inverse()), Rate.of(1))
+
+
+class FormatBalanceTest(unittest.TestCase):
+    def test_two_places_half_away_from_zero(self) -> None:
+        self.assertEqual(format_balance(Decimal("1.005")), "1.01")
+        self.assertEqual(format_balance(Decimal("-1.005")), "-1.01")
+        self.assertEqual(format_balance("3"), "3.00")
+        self.assertEqual(format_balance(Money.of("0.12345678", 8)), "0.12")
+
+
+if __name__ == "__main__":
+    unittest.main()
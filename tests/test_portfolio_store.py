@@ -0,0 +1,133 @@
+"""
+Хранилища портфелей в памяти: столбцовое (представления Portfolio и
+Wallet над массивами) отвечает так же, как словарь объектов, при
+загрузке не по порядку, замене, удалении, новых кошельках и после
+уплотнения.
+"""
+
+import unittest
+
+from valutatrade_hub.cli.manager.portfolio_store import (
+    ColumnarPortfolioStore,
+    DictPortfolioStore,
+    create_portfolio_store,
+)
+from valutatrade_hub.core.exceptions import InsufficientFundsError
+from valutatrade_hub.core.money import Money
+
+ITEMS = [
+    {"user_id": 1, "wallets": {"USD": "100.00", "BTC": "0.50000000"}},
+    {"user_id": 3, "wallets": {"EUR": "7.25"}},
+    {"user_id": 5, "wallets": {}},
+    # id не по порядку — в _overrides до compact()
+    {"user_id": 2, "wallets": {"RUB": "1000.00", "USD": "1.00"}},
+]
+
+
+def _state(store) -> list:
+    return sorted(store.records(), key=lambda item: item["user_id"])
+
+
+class PortfolioStoreParityTest(unittest.TestCase):
+    def _stores(self) -> dict:
+        return {"dict": DictPortfolioStore(), "columnar": ColumnarPortfolioStore()}
+
+    def _run(self, scenario) -> list:
+        results = {}
+        for kind, store in self._stores().items():
+            scenario(store)
+            results[kind] = (_state(store), len(store))
+        self.assertEqual(results["dict"], results["columnar"])
+        return results["dict"][0]
+
+    def test_load(self) -> None:
+        state = self._run(lambda store: store.load(ITEMS))
+        self.assertEqual([item["user_id"] for item in state], [1, 2, 3, 5])
+        self.assertEqual(state[1]["wallets"], {"RUB": "1000.00", "USD": "1.00"})
+
+    def test_add_replace_remove(self) -> None:
+        def scenario(store) -> None:
+            for item in ITEMS:
+                store.add(item)
+            # Тот же набор валют (на месте) и другой набор (перенос строки)
+            store.add({"user_id": 1, "wallets": {"USD": "90.00", "BTC": "0.6"}})
+            store.add({"user_id": 3, "wallets": {"EUR": "1", "USD": "2"}})
+            store.remove(5)
+            store.remove(2)
+            store.remove(42)
+            store.add({"user_id": 4, "wallets": {"ETH": "0.1"}})
+
+        state = self._run(scenario)
+        self.assertEqual(
+            state,
+            [
+                {"user_id": 1, "wallets": {"USD": "90.00", "BTC": "0.60000000"}},
+                {"user_id": 3, "wallets": {"EUR": "1.00", "USD": "2.00"}},
+                {"user_id": 4, "wallets": {"ETH": "0.10000000"}},
+            ],
+        )
+
+    def test_views_write_through(self) -> None:
+        def scenario(store) -> None:
+            store.load(ITEMS)
+            portfolio = store.get(1)
+            portfolio.get_wallet("USD").withdraw("30.50")
+            portfolio.get_wallet("BTC").deposit("0.25")
+            portfolio.add_currency("EUR")
+            portfolio.get_wallet("EUR").deposit(3)
+            with self.assertRaises(InsufficientFundsError):
+                store.get(2).get_wallet("USD").withdraw(2)
+            with self.assertRaises(ValueError):
+                portfolio.add_currency("USD")
+
+        state = self._run(scenario)
+        self.assertEqual(
+            state[0]["wallets"],
+            {"USD": "69.50", "BTC": "0.75000000", "EUR": "3.00"},
+        )
+
+    def test_compact_keeps_state(self) -> None:
+        store = ColumnarPortfolioStore()
+        store.load(ITEMS)
+        store.get(3).add_currency("BTC")
+        store.remove(1)
+        before = _state(store)
+        self.assertTrue(store._overrides)
+
+        store.compact()
+        self.assertEqual(store._overrides, {})
+        self.assertEqual(_state(store), before)
+        self.assertEqual(list(store._user_ids), [2, 3, 5])
+        # Представление после уплотнения читает новые строки
+        self.assertEqual(store.get(3).get_wallet("EUR").balance, Money.of("7.25", 2))
+        self.assertIsNone(store.get(1))
+
+
+class ColumnarPortfolioStoreTest(unittest.TestCase):
+    def test_balance_out_of_int64(self) -> None:
+        store = ColumnarPortfolioStore()
+        with self.assertRaises(ValueError):
+            store.add({"user_id": 1, "wallets": {"USD": str(2**63)}})
+
+        store.add({"user_id": 1, "wallets": {"USD": "1"}})
+        with self.assertRaises(ValueError):
+            store.get(1).get_wallet("USD").deposit(2**62)
+        self.assertEqual(store.get(1).get_wallet("USD").balance, Money.of(1, 2))
+
+    def test_memory_per_wallet(self) -> None:
+        store = ColumnarPortfolioStore()
+        store.load(
+            {"user_id": i, "wallets": {"USD": "1", "BTC": "1"}} for i in range(100)
+        )
+        # 8 байт id и смещения на строку, 2 + 8 на кошелек
+        self.assertEqual(store.memory_bytes(), 100 * 16 + 8 + 200 * 10)
+
+    def test_unknown_kind(self) -> None:
+        store = create_portfolio_store("columnar")
+        self.assertIsInstance(store, ColumnarPortfolioStore)
+        with self.assertRaises(ValueError):
+            create_portfolio_store("arrow")
+
+
+if __name__ == "__main__":
+    unittest.main()
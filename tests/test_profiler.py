@@ -0,0 +1,79 @@
+"""
+Профилирование команд: профиль cProfile читается pstats, с --memory
+рядом пишется отчет tracemalloc, итог печатается даже при ошибке
+команды, уже запущенный tracemalloc не останавливается.
+"""
+
+import contextlib
+import io
+import pstats
+import tempfile
+import tracemalloc
+import unittest
+from pathlib import Path
+
+from valutatrade_hub.cli.profiler import CommandProfiler
+
+
+def _busy() -> list:
+    return [str(i) * 10 for i in range(20_000)]
+
+
+class CommandProfilerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name) / "profiles"
+
+    def _run(self, profiler: CommandProfiler, command: str, func) -> str:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            with profiler.profile(command):
+                func()
+        return out.getvalue()
+
+    def test_profile_written(self) -> None:
+        output = self._run(CommandProfiler(str(self.dir)), "buy", _busy)
+
+        [path] = self.dir.glob("*-buy.prof")
+        functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+        self.assertIn("_busy", functions)
+        self.assertEqual(list(self.dir.glob("*-mem.txt")), [])
+
+        self.assertTrue(output.startswith("Профиль buy: время "))
+        self.assertIn(str(path), output)
+        self.assertNotIn("пик памяти", output)
+
+    def test_memory_report(self) -> None:
+        # Результат команды еще жив на момент снимка памяти
+        kept = []
+        profiler = CommandProfiler(str(self.dir), memory=True, top=3)
+        output = self._run(profiler, "show-portfolio", lambda: kept.append(_busy()))
+
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertIn("пик памяти", output)
+        [report] = self.dir.glob("*-show-portfolio-mem.txt")
+        lines = report.read_text(encoding="utf-8").splitlines()
+        self.assertLessEqual(len(lines), 3)
+        self.assertIn(__file__, lines[0])
+
+    def test_running_tracemalloc_left_alone(self) -> None:
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+
+        self._run(CommandProfiler(str(self.dir), memory=True), "sell", _busy)
+        self.assertTrue(tracemalloc.is_tracing())
+        self.assertEqual(list(self.dir.glob("*-mem.txt")), [])
+
+    def test_failed_command_still_profiled(self) -> None:
+        def fail() -> None:
+            raise ValueError("Недостаточно средств")
+
+        with self.assertRaises(ValueError):
+            self._run(CommandProfiler(str(self.dir), memory=True), "sell", fail)
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(len(list(self.dir.glob("*-sell.prof"))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Матрица кросс-курсов: обратные курсы, триангуляция через посредника,
+записанный путь конвертации и даты котировок.
+"""
+
+import unittest
+
+from valutatrade_hub.cli.manager.rate import RateManager
+from valutatrade_hub.core.exceptions import CurrencyNotFoundError
+from valutatrade_hub.core.money import Rate
+from valutatrade_hub.core.rate_matrix import RateMatrix
+
+QUOTES = {
+    "EUR_USD": {"rate": "1.1", "updated_at": "2026-01-01T10:00:00"},
+    "RUB_USD": {"rate": "0.0125", "updated_at": "2026-01-01T09:00:00"},
+    "BTC_USD": {"rate": "60000", "updated_at": "2026-01-01T12:00:00"},
+    # До USD у GBP есть путь только через EUR
+    "GBP_EUR": {"rate": "1.2", "updated_at": "2026-01-01T11:00:00"},
+}
+
+
+class RateMatrixTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.matrix = RateMatrix(QUOTES)
+
+    def test_direct_quote(self) -> None:
+        cell = self.matrix.lookup("BTC", "USD")
+        self.assertEqual(cell["rate"], Rate.of(60000))
+        self.assertEqual(cell["path"], ("BTC", "USD"))
+        self.assertEqual(cell["updated_at"], "2026-01-01T12:00:00")
+
+    def test_inverse_pair(self) -> None:
+        cell = self.matrix.lookup("USD", "RUB")
+        self.assertEqual(cell["rate"], Rate.of(80))
+        self.assertEqual(cell["path"], ("USD", "RUB"))
+        self.assertEqual(cell["updated_at"], "2026-01-01T09:00:00")
+
+        # 1 / 1.1 с округлением до RATE_SCALE
+        self.assertEqual(
+            self.matrix.lookup("USD", "EUR")["rate"], Rate.of("1.1").inverse()
+        )
+
+    def test_triangulation_through_pivot(self) -> None:
+        self.assertEqual(self.matrix.pivot, "USD")
+
+        cell = self.matrix.lookup("EUR", "RUB")
+        self.assertEqual(cell["rate"], Rate.of(88))
+        self.assertEqual(cell["path"], ("EUR", "USD", "RUB"))
+        # Кросс-курс не свежее самой старой из двух котировок
+        self.assertEqual(cell["updated_at"], "2026-01-01T09:00:00")
+
+        cell = self.matrix.lookup("RUB", "BTC")
+        self.assertEqual(cell["path"], ("RUB", "USD", "BTC"))
+        expected = Rate.of("0.0125").cross(Rate.of(60000).inverse())
+        self.assertEqual(cell["rate"], expected)
+
+    def test_triangulation_through_other_currency(self) -> None:
+        cell = self.matrix.lookup("GBP", "USD")
+        self.assertEqual(cell["rate"], Rate.of("1.32"))
+        self.assertEqual(cell["path"], ("GBP", "EUR", "USD"))
+
+        cell = self.matrix.lookup("USD", "GBP")
+        self.assertEqual(cell["path"], ("USD", "EUR", "GBP"))
+        # Двух посредников подряд матрица не строит
+        self.assertIsNone(self.matrix.lookup("GBP", "RUB"))
+
+    def test_identity_dated_by_own_quotes(self) -> None:
+        cell = self.matrix.lookup("RUB", "RUB")
+        self.assertEqual(cell["rate"], Rate.of(1))
+        self.assertEqual(cell["path"], ("RUB",))
+        self.assertEqual(cell["updated_at"], "2026-01-01T09:00:00")
+
+        self.assertEqual(
+            self.matrix.lookup("EUR", "EUR")["updated_at"], "2026-01-01T11:00:00"
+        )
+
+    def test_column(self) -> None:
+        column = self.matrix.column("USD")
+        self.assertEqual(column["USD"], Rate.of(1))
+        self.assertEqual(column["EUR"], Rate.of("1.1"))
+        self.assertEqual(column["GBP"], Rate.of("1.32"))
+        self.assertEqual(self.matrix.column("JPY"), {})
+
+    def test_invalid_quotes_skipped(self) -> None:
+        matrix = RateMatrix({
+            "SOL_USD": {"rate": "0", "updated_at": "2026-01-01T10:00:00"},
+            "USD_USD": {"rate": "2", "updated_at": "2026-01-01T10:00:00"},
+            "BROKEN": {"rate": "1", "updated_at": "2026-01-01T10:00:00"},
+        })
+        self.assertNotIn("SOL", matrix)
+        self.assertNotIn("USD", matrix)
+
+
+class UserPairTest(unittest.TestCase):
+    def test_same_currency_rejected(self) -> None:
+        with self.assertRaisesRegex(ValueError, "EUR->EUR"):
+            RateManager.user_pair("eur", "EUR")
+
+    def test_pair_resolved(self) -> None:
+        from_currency, to_currency = RateManager.user_pair("btc", "usd")
+        self.assertEqual((from_currency.code, to_currency.code), ("BTC", "USD"))
+
+        with self.assertRaises(CurrencyNotFoundError):
+            RateManager.user_pair("XXX", "USD")
+
+
+if __name__ == "__main__":
+    unittest.main()
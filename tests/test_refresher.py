@@ -0,0 +1,143 @@
+"""
+Фоновое обновление курсов: устаревший снимок отдается без ожидания сети,
+пока идет обновление, ошибка — только после жесткого срока; обновление
+запускается заранее по доле TTL и повторяется после сбоя.
+"""
+
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from valutatrade_hub.cli.manager.rate import RateManager
+from valutatrade_hub.core.exceptions import ApiRequestError, RatesExpiredError
+from valutatrade_hub.core.money import Rate
+from valutatrade_hub.parser.refresher import BackgroundRefresher
+
+
+class _Backend:
+    def __init__(self, age: float) -> None:
+        self.saved: list = []
+        self._rates = {
+            "EUR_USD": {"rate": "1.1", "updated_at": "2026-01-01T00:00:00"},
+            "source": "test",
+            "last_refresh": (
+                datetime.now() - timedelta(seconds=age)
+            ).isoformat(),
+        }
+
+    def load_rates(self) -> dict:
+        return self._rates
+
+    def save_rates(self, rates: dict) -> None:
+        self.saved.append(rates)
+
+
+class _Updater:
+    def __init__(self, *results) -> None:
+        self._results = list(results)
+        self.release = threading.Event()
+        self.release.set()
+        self.calls = 0
+
+    def run_update(self, verbose: bool = True) -> dict:
+        self.calls += 1
+        self.release.wait(timeout=5)
+        result = self._results.pop(0) if len(self._results) > 1 else self._results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _wait_for(condition, timeout: float = 2) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class BackgroundRefreshTest(unittest.TestCase):
+    def _manager(self, age: float, ttl: int = 10, hard_ttl: int = 100):
+        manager = RateManager(_Backend(age), ttl=ttl, hard_ttl=hard_ttl)
+        self.addCleanup(manager.stop_background_refresh)
+        return manager
+
+    def test_expired_without_refresher(self) -> None:
+        manager = self._manager(age=20)
+        with self.assertRaises(RatesExpiredError):
+            manager.get_rate("EUR", "USD")
+
+    def test_stale_snapshot_served_while_refreshing(self) -> None:
+        manager = self._manager(age=20)
+        updater = _Updater({"EUR_USD": Rate.of("1.2")})
+        updater.release.clear()
+        self.addCleanup(updater.release.set)
+
+        manager.start_background_refresh(updater)
+        refresher = manager._refresher
+        self.assertTrue(_wait_for(lambda: refresher.refreshing))
+
+        # Обновление висит на сети, а читатель сразу получает старый курс
+        started = time.perf_counter()
+        self.assertEqual(manager.get_rate("EUR", "USD")["rate"], Rate.of("1.1"))
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+        updater.release.set()
+        self.assertTrue(_wait_for(lambda: not refresher.refreshing))
+        self.assertEqual(manager.get_rate("EUR", "USD")["rate"], Rate.of("1.2"))
+        self.assertEqual(manager._backend.saved[-1]["EUR_USD"]["rate"], "1.2")
+        self.assertEqual(updater.calls, 1)
+
+    def test_hard_ttl_refuses_but_triggers_refresh(self) -> None:
+        manager = self._manager(age=200)
+        updater = _Updater({"EUR_USD": Rate.of("1.2")})
+        updater.release.clear()
+        self.addCleanup(updater.release.set)
+        manager.start_background_refresh(updater)
+
+        with self.assertRaises(RatesExpiredError):
+            manager.get_rate("EUR", "USD")
+
+        updater.release.set()
+        self.assertTrue(_wait_for(lambda: manager._backend.saved))
+        self.assertEqual(manager.get_rate("EUR", "USD")["rate"], Rate.of("1.2"))
+
+    def test_refresh_before_ttl(self) -> None:
+        # Доля 0.5 от TTL 10 секунд уже прошла: курсы еще свежие,
+        # но обновляются без обращения читателей
+        manager = self._manager(age=6)
+        updater = _Updater({"EUR_USD": Rate.of("1.2")})
+        manager.start_background_refresh(updater, fraction=0.5)
+
+        self.assertTrue(_wait_for(lambda: updater.calls == 1))
+        self.assertTrue(_wait_for(lambda: manager._backend.saved))
+
+    def test_trigger_before_due_ignored(self) -> None:
+        manager = self._manager(age=0)
+        updater = _Updater({"EUR_USD": Rate.of("1.2")})
+        manager.start_background_refresh(updater)
+
+        manager._refresher.trigger()
+        time.sleep(0.1)
+        self.assertEqual(updater.calls, 0)
+
+    def test_retry_after_failure(self) -> None:
+        manager = self._manager(age=9)
+        updater = _Updater(ApiRequestError("503"), {"EUR_USD": Rate.of("1.2")})
+        refresher = BackgroundRefresher(
+            updater, manager, refresh_after=8, retry_after=0.1
+        )
+        self.addCleanup(refresher.stop)
+
+        with self.assertLogs("valutatrade_hub.parser.refresher", "WARNING") as logs:
+            refresher.start()
+            self.assertTrue(_wait_for(lambda: manager._backend.saved))
+        self.assertIn("503", logs.output[0])
+        self.assertEqual(updater.calls, 2)
+        self.assertEqual(manager.get_rate("EUR", "USD")["rate"], Rate.of("1.2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,282 @@
+"""
+HTTP-сервер: вход и истечение токена, порядок ответов конвейера,
+коды ответов для ошибок, закрытие простаивающих соединений и
+блокировка чтений и записей.
+"""
+
+import asyncio
+import json
+import tempfile
+import unittest
+from http import HTTPStatus
+from pathlib import Path
+from unittest import mock
+
+from valutatrade_hub.cli.generate import DatasetGenerator
+from valutatrade_hub.cli.interface import CLIInterface
+from valutatrade_hub.cli.server import ReadWriteLock, TradeServer, _error_status
+from valutatrade_hub.core.exceptions import (
+    CurrencyNotFoundError,
+    InsufficientFundsError,
+)
+from valutatrade_hub.infra.settings import SettingsLoader
+
+LOGIN = {"username": "user1", "password": "password1"}
+
+
+def _request(
+    method: str, path: str, body: dict | None = None, token: str | None = None
+) -> bytes:
+    payload = json.dumps(body).encode() if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: test\r\n"
+    if token:
+        head += f"Authorization: Bearer {token}\r\n"
+    head += f"Content-Length: {len(payload)}\r\n\r\n"
+    return head.encode("latin-1") + payload
+
+
+async def _read_response(reader: asyncio.StreamReader) -> tuple[int, dict]:
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    return status, json.loads(body)
+
+
+class TradeServerTest(unittest.IsolatedAsyncioTestCase):
+    SETTINGS = {
+        "serve_session_ttl": 3600,
+        "serve_idle_timeout": 60,
+        "serve_max_connections": 16,
+    }
+
+    async def asyncSetUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        directory = Path(tmp.name)
+        paths = DatasetGenerator(seed=3).write_json(directory, users=2)
+
+        patcher = mock.patch.dict(SettingsLoader()._config, {
+            "users_file": paths["users"],
+            "portfolios_file": paths["portfolios"],
+            "rates_file": paths["rates"],
+            "trades_file": str(directory / "trades.jsonl"),
+            "storage_backend": "json",
+            "portfolio_store": "dict",
+            "metrics_textfile": None,
+            **self.SETTINGS,
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.server = TradeServer(CLIInterface(), "127.0.0.1", 0)
+        ready = asyncio.get_running_loop().create_future()
+        self.task = asyncio.create_task(
+            self.server.serve(lambda host, port: ready.set_result(port))
+        )
+        self.port = await ready
+
+    async def asyncTearDown(self) -> None:
+        self.server.stop()
+        await self.task
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.addAsyncCleanup(self._close, writer)
+        return reader, writer
+
+    @staticmethod
+    async def _close(writer: asyncio.StreamWriter) -> None:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def _call(
+        self, method: str, path: str, body: dict | None = None, token=None
+    ) -> tuple[int, dict]:
+        reader, writer = await self._connect()
+        writer.write(_request(method, path, body, token))
+        return await _read_response(reader)
+
+    async def _login(self) -> str:
+        status, body = await self._call("POST", "/login", LOGIN)
+        self.assertEqual(status, HTTPStatus.OK)
+        return body["token"]
+
+
+class SessionTest(TradeServerTest):
+    SETTINGS = {**TradeServerTest.SETTINGS, "serve_session_ttl": 0.3}
+
+    async def test_login_and_token_expiry(self) -> None:
+        status, body = await self._call("POST", "/login", {**LOGIN, "password": "x"})
+        self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+
+        token = await self._login()
+        status, body = await self._call("GET", "/portfolio", token=token)
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(body["username"], "user1")
+
+        status, _ = await self._call("GET", "/portfolio")
+        self.assertEqual(status, HTTPStatus.UNAUTHORIZED)
+
+        # Запросы продлевают сессию, без них токен истекает
+        for _ in range(3):
+            await asyncio.sleep(0.15)
+            status, _ = await self._call("GET", "/portfolio", token=token)
+            self.assertEqual(status, HTTPStatus.OK)
+        await asyncio.sleep(0.4)
+        status, body = await self._call("GET", "/portfolio", token=token)
+        self.assertEqual(status, HTTPStatus.UNAUTHORIZED)
+        self.assertEqual(body["error"], "PermissionError")
+
+    async def test_logout_revokes_token(self) -> None:
+        token = await self._login()
+        await self._call("POST", "/logout", token=token)
+        status, _ = await self._call("GET", "/portfolio", token=token)
+        self.assertEqual(status, HTTPStatus.UNAUTHORIZED)
+
+
+class PipelineTest(TradeServerTest):
+    async def test_responses_in_request_order(self) -> None:
+        token = await self._login()
+        reader, writer = await self._connect()
+
+        # Запись уходит в поток, 404 готов сразу — порядок ответов прежний
+        writer.write(
+            _request("POST", "/buy", {"currency": "EUR", "amount": "2"}, token)
+            + _request("GET", "/missing")
+            + _request("GET", "/rate?from=EUR&to=USD")
+            + _request("POST", "/sell", {"currency": "EUR", "amount": "1"}, token)
+            + _request("GET", "/portfolio", token=token)
+        )
+        responses = [await _read_response(reader) for _ in range(5)]
+
+        self.assertEqual(
+            [status for status, _ in responses], [200, 404, 200, 200, 200]
+        )
+        buy, _, rate, sell, portfolio = (body for _, body in responses)
+        self.assertEqual(buy["currency"], "EUR")
+        self.assertEqual(rate["pair"], "EUR_USD")
+        self.assertEqual(sell["old_balance"], buy["new_balance"])
+        self.assertEqual(portfolio["wallets"]["EUR"], sell["new_balance"])
+
+
+class ErrorStatusTest(TradeServerTest):
+    async def test_error_statuses(self) -> None:
+        token = await self._login()
+        cases = [
+            (("POST", "/sell", {"currency": "EUR", "amount": "1e9"}, token),
+             HTTPStatus.CONFLICT, "InsufficientFundsError"),
+            (("POST", "/buy", {"currency": "XXX", "amount": "1"}, token),
+             HTTPStatus.NOT_FOUND, "CurrencyNotFoundError"),
+            (("POST", "/buy", {"currency": "EUR"}, token),
+             HTTPStatus.BAD_REQUEST, "ValueError"),
+            (("POST", "/buy", {"currency": "EUR", "amount": "1"}, None),
+             HTTPStatus.UNAUTHORIZED, "PermissionError"),
+            (("GET", "/buy", None, token),
+             HTTPStatus.METHOD_NOT_ALLOWED, "Method Not Allowed"),
+        ]
+        # Продажа больше баланса — после покупки, чтобы кошелек был
+        await self._call("POST", "/buy", {"currency": "EUR", "amount": "1"}, token)
+        for args, status, error in cases:
+            with self.subTest(path=args[1], status=status):
+                got, body = await self._call(*args)
+                self.assertEqual(got, status)
+                self.assertEqual(body["error"], error)
+
+    async def test_protocol_errors_close_connection(self) -> None:
+        reader, writer = await self._connect()
+        writer.write(b"POST /login HTTP/1.1\r\nContent-Length: 2\r\n\r\n[]")
+        status, body = await _read_response(reader)
+        self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(await reader.read(), b"")
+
+    def test_status_found_by_mro(self) -> None:
+        class StaleRates(InsufficientFundsError):
+            pass
+
+        self.assertEqual(
+            _error_status(StaleRates("0", "EUR")), HTTPStatus.CONFLICT
+        )
+        self.assertEqual(
+            _error_status(CurrencyNotFoundError("XXX")), HTTPStatus.NOT_FOUND
+        )
+        self.assertEqual(_error_status(KeyError("x")), HTTPStatus.BAD_REQUEST)
+
+
+class IdleTimeoutTest(TradeServerTest):
+    SETTINGS = {
+        **TradeServerTest.SETTINGS,
+        "serve_idle_timeout": 0.2,
+        "serve_max_connections": 1,
+    }
+
+    async def test_idle_connection_closed_and_slot_freed(self) -> None:
+        reader, writer = await self._connect()
+        # Недописанный запрос тоже не держит соединение дольше таймаута
+        writer.write(b"GET /rates HTTP/1.1\r\n")
+        self.assertEqual(await asyncio.wait_for(reader.read(), 2), b"")
+
+        status, body = await self._call("GET", "/rates")
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertIn("rates", body)
+
+    async def test_pending_response_sent_before_close(self) -> None:
+        reader, writer = await self._connect()
+        writer.write(_request("POST", "/login", LOGIN))
+        status, _ = await _read_response(reader)
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(await asyncio.wait_for(reader.read(), 2), b"")
+
+
+class ReadWriteLockTest(unittest.IsolatedAsyncioTestCase):
+    async def test_writer_excludes_readers(self) -> None:
+        lock = ReadWriteLock()
+        events = []
+        reader_in = asyncio.Event()
+        release = asyncio.Event()
+
+        async def read(name: str, hold: asyncio.Event | None = None) -> None:
+            async with lock.read():
+                events.append(f"{name}+")
+                if hold is not None:
+                    reader_in.set()
+                    await hold.wait()
+                events.append(f"{name}-")
+
+        async def write() -> None:
+            async with lock.write():
+                events.append("write+")
+                await asyncio.sleep(0.01)
+                events.append("write-")
+
+        first = asyncio.create_task(read("r1", release))
+        await reader_in.wait()
+        writer = asyncio.create_task(write())
+        await asyncio.sleep(0.01)
+        # Ожидающая запись не пропускает новое чтение вперед
+        second = asyncio.create_task(read("r2"))
+        await asyncio.sleep(0.01)
+        self.assertEqual(events, ["r1+"])
+
+        release.set()
+        await asyncio.gather(first, writer, second)
+        self.assertEqual(events, ["r1+", "r1-", "write+", "write-", "r2+", "r2-"])
+
+    async def test_readers_share_lock(self) -> None:
+        lock = ReadWriteLock()
+        both = asyncio.Barrier(2)
+
+        async def read() -> None:
+            async with lock.read():
+                await asyncio.wait_for(both.wait(), 1)
+
+        await asyncio.gather(read(), read())
+
+
+if __name__ == "__main__":
+    unittest.main()
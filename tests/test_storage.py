@@ -0,0 +1,134 @@
+"""
+Файловое хранилище: записи через WAL без перезаписи снимка,
+восстановление после сбоя (недописанная строка WAL, прерванная запись
+снимка), групповая фиксация одним fsync и обнаружение чужих изменений.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from valutatrade_hub.cli.storage import FileStorageManager
+from valutatrade_hub.core.exceptions import StaleDataError
+
+USERS = [{"user_id": 1, "name": "alice"}, {"user_id": 2, "name": "bob"}]
+
+
+class FileStorageManagerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.path = self.dir / "users.json"
+        self.path.write_text(json.dumps(USERS))
+
+    def _storage(self, **kwargs) -> FileStorageManager:
+        storage = FileStorageManager(str(self.path), key="user_id", **kwargs)
+        storage.load()
+        return storage
+
+    def _wal_lines(self) -> list:
+        return Path(f"{self.path}.wal").read_text().splitlines()
+
+    def test_put_and_remove_go_to_wal(self) -> None:
+        storage = self._storage()
+        storage.put({"user_id": 3, "name": "carol"})
+        storage.put({"user_id": 1, "name": "alice2"})
+        storage.remove(2)
+
+        # Снимок не перезаписан, изменения — три строки после заголовка
+        self.assertEqual(json.loads(self.path.read_text()), USERS)
+        self.assertEqual(len(self._wal_lines()), 4)
+        self.assertEqual(storage.generation, 3)
+
+        loaded = FileStorageManager(str(self.path), key="user_id").load()
+        self.assertEqual(
+            sorted((u["user_id"], u["name"]) for u in loaded),
+            [(1, "alice2"), (3, "carol")],
+        )
+        # Восстановленное состояние свернуто в снимок, WAL начат заново
+        self.assertEqual(len(self._wal_lines()), 1)
+        self.assertEqual(len(json.loads(self.path.read_text())), 2)
+
+    def test_torn_wal_line_ignored(self) -> None:
+        storage = self._storage()
+        storage.put({"user_id": 3, "name": "carol"})
+        with open(f"{self.path}.wal", "a", encoding="utf-8") as f:
+            f.write('{"op": "put", "value": {"user_id": 4, "na')
+
+        loaded = FileStorageManager(str(self.path), key="user_id").load()
+        self.assertEqual(sorted(u["user_id"] for u in loaded), [1, 2, 3])
+
+    def test_interrupted_snapshot_write_keeps_old_file(self) -> None:
+        storage = self._storage()
+        with mock.patch("os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                storage.save([{"user_id": 9, "name": "x"}])
+
+        self.assertEqual(json.loads(self.path.read_text()), USERS)
+        self.assertEqual(
+            [p.name for p in self.dir.iterdir() if p.suffix == ".tmp"], []
+        )
+
+    def test_batch_commits_once(self) -> None:
+        storage = self._storage()
+        # Первая запись создает WAL с заголовком (атомарная запись файла)
+        storage.put({"user_id": 2, "name": "bob2"})
+        with mock.patch("os.fsync", wraps=os.fsync) as fsync:
+            with storage.batch():
+                for i in range(5):
+                    storage.put({"user_id": 1, "name": f"v{i}"})
+                storage.put({"user_id": 3, "name": "carol"})
+                self.assertEqual(fsync.call_count, 0)
+            self.assertEqual(fsync.call_count, 1)
+
+        # По ключу в WAL попадает только последняя версия из пакета
+        records = [json.loads(line) for line in self._wal_lines()[2:]]
+        self.assertEqual(
+            [r["value"]["name"] for r in records], ["v4", "carol"]
+        )
+
+    def test_checkpoint_after_records_limit(self) -> None:
+        storage = self._storage(checkpoint_records=3)
+        for i in range(3):
+            storage.put({"user_id": 10 + i, "name": "x"})
+
+        self.assertEqual(len(self._wal_lines()), 1)
+        self.assertEqual(len(json.loads(self.path.read_text())), 5)
+
+    def test_stale_commit_rejected_and_synced(self) -> None:
+        first = self._storage()
+        second = self._storage()
+        # WAL создан другим процессом: второй пересинхронизируется целиком
+        first.put({"user_id": 2, "name": "bob2"})
+        self.assertEqual(second.sync()[0], {"op": "reset"})
+        first.put({"user_id": 3, "name": "carol"})
+
+        with self.assertRaises(StaleDataError):
+            second.put({"user_id": 4, "name": "dave"})
+        with self.assertRaises(StaleDataError):
+            second.save(USERS)
+
+        self.assertEqual(
+            second.sync(), [{"op": "put", "value": {"user_id": 3, "name": "carol"}}]
+        )
+        second.put({"user_id": 4, "name": "dave"})
+        self.assertEqual(first.sync()[0]["value"]["name"], "dave")
+
+    def test_sync_after_rebuild_resets(self) -> None:
+        first = self._storage()
+        second = self._storage()
+        first.put({"user_id": 3, "name": "carol"})
+        first.checkpoint()
+
+        records = second.sync()
+        self.assertEqual(records[0], {"op": "reset"})
+        self.assertEqual(sorted(r["value"]["user_id"] for r in records[1:]), [1, 2, 3])
+        self.assertEqual(second.sync(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
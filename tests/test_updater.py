@@ -0,0 +1,125 @@
+"""
+Обновление курсов: источники опрашиваются параллельно, недоступный
+или зависший источник пропускается, ошибка — только если не ответил
+ни один; полученные курсы пишутся в журнал одной пачкой.
+"""
+
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.core.money import Rate
+from valutatrade_hub.parser.config import ParserConfig
+from valutatrade_hub.parser.updater import RateUpdater
+
+
+class _Client:
+    def __init__(self, rates: dict | None = None, fetch=None) -> None:
+        self._rates = rates
+        self._fetch = fetch
+        self.calls = 0
+
+    def fetch_rates(self) -> dict:
+        self.calls += 1
+        if self._fetch is not None:
+            self._fetch()
+        return self._rates
+
+
+def _fail() -> None:
+    raise ApiRequestError("503")
+
+
+class RateUpdaterTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.multiple(
+            ParserConfig,
+            HTTP_CACHE_DIR=f"{tmp.name}/http_cache",
+            UPDATE_DEADLINE=5,
+            HISTORY_BIN_APPEND=False,
+            JOURNAL_AUTO_COMPACT=False,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.updater = RateUpdater(journal_dir=f"{tmp.name}/journal")
+
+    def _use(self, **clients: _Client) -> None:
+        self.updater._clients = clients
+
+    def _journal(self) -> list:
+        return list(self.updater.journal.iter_entries())
+
+    def test_providers_fetched_in_parallel(self) -> None:
+        # Оба источника ждут друг друга: последовательный опрос не пройдет
+        barrier = threading.Barrier(2, timeout=2)
+        self._use(
+            crypto=_Client({"BTC_USD": 95000.5}, barrier.wait),
+            fiat=_Client({"EUR_USD": "1.16"}, barrier.wait),
+        )
+
+        rates = self.updater.run_update(verbose=False)
+        self.assertEqual(
+            rates, {"BTC_USD": Rate.of("95000.5"), "EUR_USD": Rate.of("1.16")}
+        )
+        self.assertEqual(self.updater.last_skipped, {})
+
+        # Одна пачка в журнале, курсы — строками без float
+        entries = self._journal()
+        self.assertEqual(
+            [(e["from_currency"], e["rate"], e["source"]) for e in entries],
+            [("BTC", "95000.5", "crypto"), ("EUR", "1.16", "fiat")],
+        )
+
+    def test_failed_provider_skipped(self) -> None:
+        self._use(
+            crypto=_Client(fetch=_fail),
+            fiat=_Client({"EUR_USD": "1.16", "RUB_USD": "0.0128"}),
+        )
+
+        rates = self.updater.run_update(verbose=False)
+        self.assertEqual(sorted(rates), ["EUR_USD", "RUB_USD"])
+        self.assertEqual(list(self.updater.last_skipped), ["crypto"])
+        self.assertIn("503", self.updater.last_skipped["crypto"])
+        self.assertEqual({e["source"] for e in self._journal()}, {"fiat"})
+
+    def test_hung_provider_cut_by_deadline(self) -> None:
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self._use(
+            slow=_Client({"BTC_USD": 1}, release.wait),
+            fiat=_Client({"EUR_USD": "1.16"}),
+        )
+
+        started = time.perf_counter()
+        with mock.patch.object(ParserConfig, "UPDATE_DEADLINE", 0.2):
+            rates = self.updater.run_update(verbose=False)
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertEqual(list(rates), ["EUR_USD"])
+        self.assertIn("время ожидания", self.updater.last_skipped["slow"])
+
+    def test_all_providers_failed(self) -> None:
+        self._use(crypto=_Client(fetch=_fail), fiat=_Client(fetch=_fail))
+
+        with self.assertRaisesRegex(ApiRequestError, "crypto: .*fiat: "):
+            self.updater.run_update(verbose=False)
+        self.assertEqual(self._journal(), [])
+
+    def test_single_source(self) -> None:
+        crypto = _Client({"BTC_USD": 1})
+        fiat = _Client({"EUR_USD": 1})
+        self._use(crypto=crypto, fiat=fiat)
+
+        rates = self.updater.run_update("fiat", verbose=False)
+        self.assertEqual(list(rates), ["EUR_USD"])
+        self.assertEqual((crypto.calls, fiat.calls), (0, 1))
+        with self.assertRaises(ValueError):
+            self.updater.run_update("other", verbose=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
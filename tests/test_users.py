@@ -0,0 +1,81 @@
+"""
+Пользователи: id удаленных пользователей не выдаются повторно, в том
+числе другим процессом после пересборки users.json; JSON и SQLite
+хранилища ведут себя одинаково.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from valutatrade_hub.cli.backend.json_backend import JsonStorageBackend
+from valutatrade_hub.cli.backend.sqlite_backend import SqliteStorageBackend
+from valutatrade_hub.cli.manager.user import USER_ID_COUNTER, UserManager
+
+
+class UserIdTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        for name in ("users", "portfolios"):
+            (self.dir / f"{name}.json").write_text("[]")
+        (self.dir / "rates.json").write_text("{}")
+
+    def _backend(self, kind: str):
+        if kind == "json":
+            return JsonStorageBackend(
+                str(self.dir / "users.json"),
+                str(self.dir / "portfolios.json"),
+                str(self.dir / "rates.json"),
+            )
+        backend = SqliteStorageBackend(str(self.dir / "valutatrade.db"))
+        self.addCleanup(backend.close)
+        return backend
+
+    def test_deleted_id_not_reused(self) -> None:
+        for kind in ("json", "sqlite"):
+            with self.subTest(kind):
+                manager = UserManager(self._backend(kind))
+                ids = [manager.create(f"user{i}", "secret").user_id for i in range(3)]
+                self.assertEqual(ids, [1, 2, 3])
+                manager.delete(3)
+
+                # Новый процесс видит тот же счетчик
+                fresh = UserManager(self._backend(kind))
+                self.assertIsNone(fresh.get_by_username("user2"))
+                self.assertEqual(fresh.create("user3", "secret").user_id, 4)
+
+    def test_create_persists_counter(self) -> None:
+        for kind in ("json", "sqlite"):
+            with self.subTest(kind):
+                backend = self._backend(kind)
+                manager = UserManager(backend)
+                manager.create(f"{kind}-a", "secret")
+                user = manager.create(f"{kind}-b", "secret")
+                self.assertEqual(
+                    backend.load_counter(USER_ID_COUNTER), user.user_id + 1
+                )
+
+    def test_counter_reloaded_after_reset(self) -> None:
+        first = UserManager(self._backend("json"))
+        second = UserManager(self._backend("json"))
+        first.create("alice", "secret")
+        # authenticate дочитывает чужие изменения
+        self.assertEqual(second.authenticate("alice", "secret").user_id, 1)
+
+        # Другой процесс создает и удаляет пользователя, затем
+        # пересобирает users.json: в записях WAL его больше нет
+        first.create("bob", "secret")
+        first.delete(2)
+        first.save()
+
+        user = second.create("carol", "secret")
+        self.assertEqual(user.user_id, 3)
+        self.assertEqual(
+            sorted(u.username for u in second.get_all()), ["alice", "carol"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Пакетная оценка портфелей: итоги по словарям и по столбцам совпадают
+и округляются до точности базовой валюты.
+"""
+
+import unittest
+
+from valutatrade_hub.cli.manager.portfolio_store import (
+    ColumnarPortfolioStore,
+    DictPortfolioStore,
+)
+from valutatrade_hub.core.money import Money, Rate
+from valutatrade_hub.core.valuation import BatchValuation
+
+# Курсы к USD и к BTC (1 BTC = 50 000 USD)
+TO_USD = {"USD": Rate.of(1), "EUR": Rate.of("1.105"), "BTC": Rate.of(50_000)}
+TO_BTC = {"USD": Rate.of("0.00002"), "EUR": Rate.of("0.0000221"), "BTC": Rate.of(1)}
+
+PORTFOLIOS = [
+    {"user_id": 1, "wallets": {"USD": "1.00", "EUR": "0.05"}},
+    {"user_id": 2, "wallets": {"BTC": "0.00012345"}},
+    {"user_id": 3, "wallets": {"EUR": "10.00", "BTC": "0.5", "USD": "7.77"}},
+    {"user_id": 4, "wallets": {}},
+]
+
+
+def _holdings():
+    return [(item["user_id"], item["wallets"]) for item in PORTFOLIOS]
+
+
+class BatchValuationTest(unittest.TestCase):
+    def test_totals_rounded_half_up_to_cents(self) -> None:
+        totals = dict(BatchValuation(TO_USD, "USD").run(_holdings()))
+
+        # 1.00 + 0.05 * 1.105 = 1.05525 -> 1.06
+        self.assertEqual(totals[1], Money.of("1.06", 2))
+        # 0.00012345 * 50 000 = 6.1725 -> 6.17
+        self.assertEqual(totals[2], Money.of("6.17", 2))
+        self.assertEqual(totals[3], Money.of("25018.82", 2))
+        self.assertEqual(totals[4], Money(0, 2))
+        self.assertEqual(totals[1].scale, 2)
+
+    def test_crypto_base_keeps_its_scale(self) -> None:
+        totals = dict(BatchValuation(TO_BTC, "BTC").run(_holdings()))
+
+        # 1.00 * 0.00002 + 0.05 * 0.0000221 = 0.000021105 -> 0.00002111
+        self.assertEqual(totals[1], Money.of("0.00002111", 8))
+        self.assertEqual(totals[2], Money.of("0.00012345", 8))
+        self.assertEqual(str(totals[1]), "0.00002111")
+
+    def test_columnar_store_matches_dict_store(self) -> None:
+        results = []
+        for store in (DictPortfolioStore(), ColumnarPortfolioStore()):
+            store.load(PORTFOLIOS)
+            for base, rates in (("USD", TO_USD), ("BTC", TO_BTC)):
+                results.append(dict(store.revalue(BatchValuation(rates, base))))
+
+        self.assertEqual(results[:2], results[2:])
+        expected = dict(BatchValuation(TO_USD, "USD").run(_holdings()))
+        self.assertEqual(results[0], expected)
+
+    def test_missing_rate_rejected(self) -> None:
+        valuation = BatchValuation({"USD": Rate.of(1)}, "USD")
+        with self.assertRaises(ValueError):
+            list(valuation.run(_holdings()))
+
+        store = ColumnarPortfolioStore()
+        store.load(PORTFOLIOS)
+        with self.assertRaises(ValueError):
+            list(store.revalue(valuation))
+
+    def test_chunks_do_not_change_totals(self) -> None:
+        whole = list(BatchValuation(TO_USD, "USD").run(_holdings()))
+        chunked = list(BatchValuation(TO_USD, "USD", chunk_size=1).run(_holdings()))
+        self.assertEqual(whole, chunked)
+
+
+if __name__ == "__main__":
+    unittest.main()
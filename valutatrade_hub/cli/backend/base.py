@@ -0,0 +1,141 @@
+from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from ...core.exceptions import StaleDataError
+
+T = TypeVar("T")
+
+# Сколько раз операция повторяется, если данные изменил другой процесс
+STALE_RETRIES = 3
+
+
+class StorageBackend(ABC):
+    """
+    Абстрактное хранилище пользователей, портфелей и курсов.
+    Менеджеры работают только через этот интерфейс.
+    """
+
+    # True — менеджеры загружают все данные в память при старте,
+    # False — читают записи из хранилища по запросу.
+    preload: bool = True
+
+    @abstractmethod
+    def load_users(self) -> List[Dict[str, Any]]:
+        """Возвращает всех пользователей."""
+
+    @abstractmethod
+    def find_user(
+        self, username: str, case_insensitive: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Ищет пользователя по username."""
+
+    @abstractmethod
+    def find_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Ищет пользователя по user_id."""
+
+    @abstractmethod
+    def next_user_id(self) -> int:
+        """
+        Возвращает следующий свободный user_id с учетом
+        сохраненного счетчика (id удаленных пользователей не переиспользуются).
+        """
+
+    @abstractmethod
+    def save_user(self, data: Dict[str, Any]) -> None:
+        """Добавляет или обновляет одного пользователя."""
+
+    @abstractmethod
+    def save_users(self, data: List[Dict[str, Any]]) -> None:
+        """Сохраняет переданных пользователей."""
+
+    @abstractmethod
+    def delete_user(self, user_id: int) -> None:
+        """Удаляет пользователя."""
+
+    @abstractmethod
+    def load_counter(self, name: str) -> int:
+        """Возвращает значение сохраненного счетчика (0, если его нет)."""
+
+    @abstractmethod
+    def save_counter(self, name: str, value: int) -> None:
+        """Сохраняет значение счетчика."""
+
+    @abstractmethod
+    def load_portfolios(self) -> List[Dict[str, Any]]:
+        """Возвращает все портфели."""
+
+    @abstractmethod
+    def find_portfolio(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Ищет портфель по id пользователя."""
+
+    @abstractmethod
+    def save_portfolio(
+        self, data: Dict[str, Any], changed: Iterable[str] | None = None
+    ) -> None:
+        """
+        Сохраняет портфель. Если указан changed — достаточно
+        записать только кошельки этих валют.
+        """
+
+    @abstractmethod
+    def save_portfolios(self, data: List[Dict[str, Any]]) -> None:
+        """Сохраняет переданные портфели."""
+
+    @abstractmethod
+    def load_rates(self) -> Dict[str, Any]:
+        """Возвращает курсы в формате rates.json."""
+
+    @abstractmethod
+    def save_rates(self, data: Dict[str, Any]) -> None:
+        """Сохраняет курсы в формате rates.json."""
+
+    @abstractmethod
+    def sync_users(self) -> List[Dict[str, Any]]:
+        """
+        Изменения пользователей, сделанные другими процессами с прошлого
+        вызова: {"op": "put", "value": ...} и {"op": "delete", "key": ...}.
+        Запись {"op": "reset"} означает, что кэш нужно сбросить целиком.
+        """
+
+    @abstractmethod
+    def sync_portfolios(self) -> List[Dict[str, Any]]:
+        """Изменения портфелей от других процессов (формат как в sync_users)."""
+
+    @abstractmethod
+    def transaction(self) -> AbstractContextManager:
+        """
+        Объединяет несколько операций записи в одну фиксацию.
+        На время транзакции хранилище заблокировано для других процессов.
+        """
+
+    @abstractmethod
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """
+        Вызывает callback, когда изменения текущей транзакции записаны на
+        диск; вне транзакции — сразу. При откате callback не вызывается.
+        """
+
+    def run_synced(
+        self,
+        sync: Callable[[bool], None],
+        operation: Callable[[], T],
+        retries: int = STALE_RETRIES,
+    ) -> T:
+        """
+        Выполняет чтение-изменение-запись в транзакции.
+        Перед операцией sync догружает изменения других процессов.
+        Если при фиксации данные на диске оказались новее (StaleDataError),
+        кэш перечитывается целиком (sync(True)) и операция повторяется.
+        """
+        for attempt in range(retries):
+            try:
+                with self.transaction():
+                    sync(attempt > 0)
+                    return operation()
+            except StaleDataError:
+                if attempt == retries - 1:
+                    raise
+
+    def close(self) -> None:
+        """Освобождает ресурсы хранилища."""
@@ -0,0 +1,30 @@
+from ...infra.settings import SettingsLoader
+from .base import StorageBackend
+from .json_backend import JsonStorageBackend
+
+
+def create_backend(settings: SettingsLoader) -> StorageBackend:
+    """Создает хранилище, выбранное в настройках (storage_backend)."""
+    kind = settings.get("storage_backend", "json")
+    users_file = settings.get("users_file")
+    portfolios_file = settings.get("portfolios_file")
+    rates_file = settings.get("rates_file")
+
+    if kind == "json":
+        return JsonStorageBackend(users_file, portfolios_file, rates_file)
+
+    if kind == "sqlite":
+        from .sqlite_backend import SqliteStorageBackend, import_from_json
+
+        backend = SqliteStorageBackend(settings.get("sqlite_file"))
+        if backend.is_empty():
+            import_from_json(
+                backend,
+                users_file,
+                portfolios_file,
+                rates_file,
+                trades_file=settings.get("trades_file"),
+            )
+        return backend
+
+    raise ValueError(f"Неизвестный тип хранилища '{kind}'")
@@ -0,0 +1,130 @@
+import os
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from ..storage import FileStorageManager
+from .base import StorageBackend
+
+
+class JsonStorageBackend(StorageBackend):
+    """Хранилище в JSON-файлах (users.json, portfolios.json, rates.json)."""
+
+    preload = True
+
+    def __init__(
+        self,
+        users_file: str,
+        portfolios_file: str,
+        rates_file: str,
+        meta_file: str | None = None,
+    ):
+        self._users = FileStorageManager(users_file, key="user_id")
+        self._portfolios = FileStorageManager(portfolios_file, key="user_id")
+        self._rates = FileStorageManager(rates_file)
+        self._meta_file = meta_file or os.path.join(
+            os.path.dirname(users_file), "meta.json"
+        )
+        self._meta = FileStorageManager(self._meta_file)
+        self._depth = 0
+        self._on_commit: List[Callable[[], None]] = []
+
+    def load_users(self) -> List[Dict[str, Any]]:
+        return self._users.load()
+
+    def find_user(
+        self, username: str, case_insensitive: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        if case_insensitive:
+            username = username.casefold()
+        for data in self._users.load():
+            name = data["username"]
+            if (name.casefold() if case_insensitive else name) == username:
+                return data
+        return None
+
+    def find_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        for data in self._users.load():
+            if data["user_id"] == user_id:
+                return data
+        return None
+
+    def next_user_id(self) -> int:
+        max_id = max((data["user_id"] for data in self._users.load()), default=0)
+        return max(max_id + 1, self.load_counter("user_id"))
+
+    def save_user(self, data: Dict[str, Any]) -> None:
+        self._users.put(data)
+
+    def save_users(self, data: List[Dict[str, Any]]) -> None:
+        self._users.save(data)
+
+    def delete_user(self, user_id: int) -> None:
+        self._users.remove(user_id)
+
+    def load_counter(self, name: str) -> int:
+        if not os.path.exists(self._meta_file):
+            return 0
+        return self._meta.load().get(name, 0)
+
+    def save_counter(self, name: str, value: int) -> None:
+        data = self._meta.load() if os.path.exists(self._meta_file) else {}
+        data[name] = value
+        self._meta.save(data)
+
+    def load_portfolios(self) -> List[Dict[str, Any]]:
+        return self._portfolios.load()
+
+    def find_portfolio(self, user_id: int) -> Optional[Dict[str, Any]]:
+        for data in self._portfolios.load():
+            if data["user_id"] == user_id:
+                return data
+        return None
+
+    def save_portfolio(
+        self, data: Dict[str, Any], changed: Iterable[str] | None = None
+    ) -> None:
+        # Запись портфеля в WAL небольшая, поэтому пишется целиком
+        self._portfolios.put(data)
+
+    def save_portfolios(self, data: List[Dict[str, Any]]) -> None:
+        self._portfolios.save(data)
+
+    def load_rates(self) -> Dict[str, Any]:
+        return self._rates.load()
+
+    def save_rates(self, data: Dict[str, Any]) -> None:
+        self._rates.save(data)
+
+    def sync_users(self) -> List[Dict[str, Any]]:
+        return self._users.sync()
+
+    def sync_portfolios(self) -> List[Dict[str, Any]]:
+        return self._portfolios.sync()
+
+    @contextmanager
+    def transaction(self) -> Iterator["JsonStorageBackend"]:
+        # Вложенная транзакция ничего не открывает: фиксирует внешняя
+        if self._depth:
+            yield self
+            return
+
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(self._users.batch())
+                stack.enter_context(self._portfolios.batch())
+                self._depth += 1
+                try:
+                    yield self
+                finally:
+                    self._depth -= 1
+        finally:
+            # Записи пакета дописаны в WAL (или отброшены) при выходе из batch
+            callbacks, self._on_commit = self._on_commit, []
+        for callback in callbacks:
+            callback()
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        if self._depth:
+            self._on_commit.append(callback)
+        else:
+            callback()
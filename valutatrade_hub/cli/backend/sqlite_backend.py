@@ -0,0 +1,301 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .base import StorageBackend
+from .json_backend import JsonStorageBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    hashed_password TEXT NOT NULL,
+    salt TEXT NOT NULL,
+    registration_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_username_nocase ON users (username COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS portfolios (
+    user_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS wallets (
+    user_id INTEGER NOT NULL,
+    currency TEXT NOT NULL,
+    balance TEXT NOT NULL,
+    PRIMARY KEY (user_id, currency)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rates (
+    pair TEXT PRIMARY KEY,
+    rate TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+USER_COLUMNS = ("user_id", "username", "hashed_password", "salt", "registration_date")
+RATES_META_KEYS = ("source", "last_refresh")
+
+
+class SqliteStorageBackend(StorageBackend):
+    """
+    Хранилище в SQLite (режим журнала WAL).
+    Данные читаются по запросу, сделка — обновление одной строки wallets.
+    """
+
+    preload = False
+
+    def __init__(self, db_file: str):
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # timeout — сколько ждать, пока другой процесс держит блокировку записи
+        self._conn = sqlite3.connect(
+            db_file, isolation_level=None, check_same_thread=False, timeout=30
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._on_commit: List[Callable[[], None]] = []
+        version = self._data_version()
+        self._seen_versions = {"users": version, "portfolios": version}
+
+    def is_empty(self) -> bool:
+        """Проверяет, что в базе ещё нет ни пользователей, ни курсов."""
+        rows = self._query(
+            "SELECT EXISTS(SELECT 1 FROM users) OR EXISTS(SELECT 1 FROM rates)"
+        )
+        return not rows[0][0]
+
+    def load_users(self) -> List[Dict[str, Any]]:
+        rows = self._query("SELECT * FROM users ORDER BY user_id")
+        return [dict(row) for row in rows]
+
+    def find_user(
+        self, username: str, case_insensitive: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        collate = " COLLATE NOCASE" if case_insensitive else ""
+        rows = self._query(
+            f"SELECT * FROM users WHERE username = ?{collate}", (username,)
+        )
+        return dict(rows[0]) if rows else None
+
+    def find_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT * FROM users WHERE user_id = ?", (user_id,))
+        return dict(rows[0]) if rows else None
+
+    def next_user_id(self) -> int:
+        rows = self._query("SELECT MAX(user_id) FROM users")
+        return max((rows[0][0] or 0) + 1, self.load_counter("user_id"))
+
+    def save_user(self, data: Dict[str, Any]) -> None:
+        self.save_users([data])
+
+    def save_users(self, data: List[Dict[str, Any]]) -> None:
+        with self.transaction():
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?)",
+                [tuple(item[c] for c in USER_COLUMNS) for item in data],
+            )
+
+    def delete_user(self, user_id: int) -> None:
+        with self.transaction():
+            self._conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+
+    def load_counter(self, name: str) -> int:
+        rows = self._query(
+            "SELECT value FROM meta WHERE key = ?", (f"counter:{name}",)
+        )
+        return int(rows[0][0]) if rows else 0
+
+    def save_counter(self, name: str, value: int) -> None:
+        with self.transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                (f"counter:{name}", str(value)),
+            )
+
+    def load_portfolios(self) -> List[Dict[str, Any]]:
+        portfolios: Dict[int, Dict[str, Any]] = {}
+        for row in self._query("SELECT user_id FROM portfolios"):
+            portfolios[row[0]] = {"user_id": row[0], "wallets": {}}
+
+        for row in self._query("SELECT * FROM wallets"):
+            portfolio = portfolios.setdefault(
+                row["user_id"], {"user_id": row["user_id"], "wallets": {}}
+            )
+            portfolio["wallets"][row["currency"]] = row["balance"]
+
+        return list(portfolios.values())
+
+    def find_portfolio(self, user_id: int) -> Optional[Dict[str, Any]]:
+        exists = self._query(
+            "SELECT 1 FROM portfolios WHERE user_id = ?", (user_id,)
+        )
+        if not exists:
+            return None
+
+        rows = self._query(
+            "SELECT currency, balance FROM wallets WHERE user_id = ?", (user_id,)
+        )
+        return {
+            "user_id": user_id,
+            "wallets": {row["currency"]: row["balance"] for row in rows},
+        }
+
+    def save_portfolio(
+        self, data: Dict[str, Any], changed: Iterable[str] | None = None
+    ) -> None:
+        user_id = data["user_id"]
+        wallets = data["wallets"]
+
+        with self.transaction():
+            self._conn.execute(
+                "INSERT OR IGNORE INTO portfolios VALUES (?)", (user_id,)
+            )
+            if changed is None:
+                self._conn.execute(
+                    "DELETE FROM wallets WHERE user_id = ?", (user_id,)
+                )
+                changed = wallets.keys()
+
+            self._conn.executemany(
+                "INSERT INTO wallets VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id, currency) "
+                "DO UPDATE SET balance = excluded.balance",
+                [(user_id, code, wallets[code]) for code in changed],
+            )
+
+    def save_portfolios(self, data: List[Dict[str, Any]]) -> None:
+        with self.transaction():
+            for item in data:
+                self.save_portfolio(item)
+
+    def load_rates(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        for row in self._query("SELECT * FROM rates"):
+            data[row["pair"]] = {
+                "rate": row["rate"],
+                "updated_at": row["updated_at"],
+            }
+
+        for row in self._query(
+            "SELECT key, value FROM meta WHERE key IN (?, ?)", RATES_META_KEYS
+        ):
+            data[row["key"]] = row["value"]
+
+        return data
+
+    def save_rates(self, data: Dict[str, Any]) -> None:
+        with self.transaction():
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rates VALUES (?, ?, ?)",
+                [
+                    (pair, str(value["rate"]), value["updated_at"])
+                    for pair, value in data.items()
+                    if pair not in RATES_META_KEYS
+                ],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [(key, data[key]) for key in RATES_META_KEYS if key in data],
+            )
+
+    def sync_users(self) -> List[Dict[str, Any]]:
+        return self._sync("users")
+
+    def sync_portfolios(self) -> List[Dict[str, Any]]:
+        return self._sync("portfolios")
+
+    def _sync(self, name: str) -> List[Dict[str, Any]]:
+        """
+        Записи читаются из базы по запросу, поэтому после чужой фиксации
+        (PRAGMA data_version изменился) достаточно сбросить кэш менеджера.
+        """
+        version = self._data_version()
+        if version == self._seen_versions[name]:
+            return []
+        self._seen_versions[name] = version
+        return [{"op": "reset"}]
+
+    def _data_version(self) -> int:
+        return self._query("PRAGMA data_version")[0][0]
+
+    @contextmanager
+    def transaction(self) -> Iterator["SqliteStorageBackend"]:
+        with self._lock:
+            outer = self._depth == 0
+            if outer:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if outer:
+                    self._on_commit.clear()
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if outer:
+                    try:
+                        self._conn.execute("COMMIT")
+                    finally:
+                        callbacks, self._on_commit = self._on_commit, []
+                    for callback in callbacks:
+                        callback()
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if self._depth:
+                self._on_commit.append(callback)
+                return
+        callback()
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """Выполняет чтение под блокировкой соединения."""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def import_from_json(
+    backend: StorageBackend,
+    users_file: str,
+    portfolios_file: str,
+    rates_file: str,
+    trades_file: str | None = None,
+) -> None:
+    """
+    Переносит данные из JSON-файлов в указанное хранилище.
+    portfolios.json — снимок, поэтому сначала к нему применяются события
+    журнала сделок после checkpoint и снимок сохраняется заново.
+    """
+    source = JsonStorageBackend(users_file, portfolios_file, rates_file)
+
+    if trades_file and os.path.exists(trades_file):
+        # Менеджеры зависят от хранилищ, а не наоборот: импорт по месту
+        from ..ledger import TradeLedger
+        from ..manager.portfolio import PortfolioManager
+
+        ledger = TradeLedger(trades_file)
+        if ledger.checkpoint()["seq"] < ledger.last_seq:
+            PortfolioManager(source, ledger=ledger).save()
+
+    with backend.transaction():
+        if os.path.exists(users_file):
+            backend.save_users(source.load_users())
+        if os.path.exists(portfolios_file):
+            backend.save_portfolios(source.load_portfolios())
+        if os.path.exists(rates_file):
+            backend.save_rates(source.load_rates())
@@ -0,0 +1,125 @@
+import io
+import json
+import sys
+import time
+from contextlib import ExitStack, redirect_stdout
+from typing import Any, Dict, Iterable, TextIO
+
+from .interface import CLIInterface
+
+BATCH_USAGE = "Использование: valutatrade batch <file|-> [--commit-every <int>]"
+
+
+class BatchRunner:
+    """
+    Неинтерактивное выполнение сценария команд.
+    Все команды работают с одним загруженным состоянием, а запись
+    в хранилище откладывается до одной фиксации в конце сценария
+    (или каждые commit_every команд).
+    Результат каждой строки выводится в out отдельной JSON-строкой.
+    """
+
+    def __init__(
+        self,
+        cli: CLIInterface,
+        out: TextIO = sys.stdout,
+        commit_every: int | None = None,
+    ) -> None:
+        self._cli = cli
+        self._out = out
+        self._commit_every = commit_every
+        self.stats = {"total": 0, "ok": 0, "errors": 0, "commits": 0}
+
+    def run(self, lines: Iterable[str]) -> Dict[str, Any]:
+        """Выполняет команды и возвращает итоговую статистику."""
+        started = time.perf_counter()
+        pending = 0
+        transaction = self._begin()
+
+        try:
+            for line_no, line in enumerate(lines, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+
+                if not self._execute(line_no, line):
+                    break
+
+                pending += 1
+                if self._commit_every and pending >= self._commit_every:
+                    transaction.close()
+                    self.stats["commits"] += 1
+                    pending = 0
+                    transaction = self._begin()
+        finally:
+            transaction.close()
+            if pending:
+                self.stats["commits"] += 1
+            self._cli.flush_metrics()
+
+        self.stats["elapsed"] = round(time.perf_counter() - started, 3)
+        self._emit({"summary": self.stats})
+        return self.stats
+
+    def _begin(self) -> ExitStack:
+        """
+        Открывает транзакцию хранилища и групповую запись журнала сделок.
+        При закрытии события журнала дописываются одним fsync раньше,
+        чем фиксируется хранилище.
+        """
+        transaction = ExitStack()
+        transaction.enter_context(self._cli.backend.transaction())
+        if self._cli.ledger is not None:
+            transaction.enter_context(self._cli.ledger.buffered())
+        return transaction
+
+    def _execute(self, line_no: int, line: str) -> bool:
+        """Выполняет одну команду; False — сценарий завершен командой exit."""
+        self.stats["total"] += 1
+        record: Dict[str, Any] = {"line": line_no, "command": line.split()[0]}
+        buffer = io.StringIO()
+
+        try:
+            with redirect_stdout(buffer):
+                self._cli.proses_command(line)
+        except SystemExit:
+            self.stats["ok"] += 1
+            return False
+        except self._cli.USER_ERRORS as e:
+            self.stats["errors"] += 1
+            record.update(status="error", error=type(e).__name__, message=str(e))
+        else:
+            self.stats["ok"] += 1
+            record.update(status="ok", output=buffer.getvalue().strip())
+
+        self._emit(record)
+        return True
+
+    def _emit(self, record: Dict[str, Any]) -> None:
+        self._out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def run_batch(cli: CLIInterface, args: list) -> int:
+    """Разбирает аргументы команды batch и выполняет сценарий. Код возврата."""
+    if not args:
+        print(BATCH_USAGE, file=sys.stderr)
+        return 2
+
+    try:
+        commit_every = (
+            int(args[args.index("--commit-every") + 1])
+            if "--commit-every" in args
+            else None
+        )
+    except (IndexError, ValueError):
+        print(BATCH_USAGE, file=sys.stderr)
+        return 2
+
+    runner = BatchRunner(cli, commit_every=commit_every)
+    if args[0] == "-":
+        stats = runner.run(sys.stdin)
+    else:
+        with open(args[0], "r", encoding="utf-8") as f:
+            stats = runner.run(f)
+
+    return 1 if stats["errors"] else 0
@@ -6,9 +6,16 @@ COMMAND_DESCRIPTIONS = {
     "show-portfolio": "Посмотреть свой портфель и балансы",
     "buy": "Купить валюту",
     "sell": "Продать валюту",
+    "history": "История своих сделок",
     "get-rate": "Получить курс валюты",
     "update-rates": "Обновить курсы валют",
+    "rate-history": "История курса пары",
+    "convert-history": "Перенести журнал курсов в бинарную историю",
+    "compact-journal": "Сжать журнал курсов (свечи OHLC, удаление старых)",
     "show-rates": "Курсы валют с фильтрацией",
+    "revalue-all": "Оценить портфели всех пользователей",
+    "stats": "Метрики производительности процесса",
+    "profile": "Профилирование команд (или --profile у команды)",
     "exit": "Выйти из программы",
 }
 
@@ -18,7 +25,15 @@ COMMAND_EXAMPLES = [
     "show-portfolio [--base <str>]",
     "buy --currency <str> --amount <float>",
     "sell --currency <str> --amount <float>",
-    "get-rate --from <str> --to <str>",
+    "history [--limit <int>]",
+    "get-rate --from <str> --to <str> [--at <datetime>]",
     "update-rates [--source <str>]",
+    "rate-history --pair <str> [--from <datetime>] [--to <datetime>] "
+    "[--interval <1m|1h|1d>]",
+    "convert-history [--out <dir>]",
+    "compact-journal [--raw <7d>] [--retention <365d>] [--dry-run]",
     "show-rates [--top <int>] [--base <str>] [--currency <str>]",
+    "revalue-all [--base <str>] [--output <file>]",
+    "stats [--prom <file>]",
+    "profile on|off [--memory]",
 ]
@@ -0,0 +1,195 @@
+import json
+import random
+import string
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from ..core.currencies import _CURRENCY_REGISTRY
+from ..core.money import Money
+from ..core.utils import hash_password
+from ..parser.config import ParserConfig
+from ..parser.journal import RateJournal, journal_entry
+from .backend.base import StorageBackend
+
+GENERATE_USAGE = (
+    "Использование: valutatrade generate --out <dir> [--users <int>] "
+    "[--journal <int>] [--seed <int>] [--backend json|sqlite]"
+)
+
+# Опорные курсы к USD, вокруг которых генерируются котировки
+BASE_RATES = {"EUR": 1.16, "RUB": 0.0128, "BTC": 95000.0, "ETH": 3300.0}
+
+START_TIME = datetime(2025, 1, 1)
+
+CHUNK_SIZE = 10_000
+
+
+def password_for(user_id: int) -> str:
+    """Пароль синтетического пользователя (нужен для login в нагрузочных тестах)."""
+    return f"password{user_id}"
+
+
+class DatasetGenerator:
+    """
+    Детерминированный генератор синтетических данных.
+    При одинаковом seed выдает одни и те же пользователей, портфели
+    и записи журнала. Данные пишутся потоком, память не зависит от объема.
+    """
+
+    def __init__(self, seed: int = 42) -> None:
+        self._seed = seed
+
+    def users(self, count: int) -> Iterator[Dict]:
+        """Пользователи в формате users.json."""
+        rng = random.Random(f"{self._seed}:users")
+        alphabet = string.ascii_letters + string.digits
+        for user_id in range(1, count + 1):
+            salt = "".join(rng.choice(alphabet) for _ in range(16))
+            registered = START_TIME + timedelta(seconds=rng.randrange(365 * 86400))
+            yield {
+                "user_id": user_id,
+                "username": f"user{user_id}",
+                "hashed_password": hash_password(password_for(user_id), salt),
+                "salt": salt,
+                "registration_date": registered.isoformat(),
+            }
+
+    def portfolios(self, count: int) -> Iterator[Dict]:
+        """Портфели в формате portfolios.json (балансы в масштабе валюты)."""
+        rng = random.Random(f"{self._seed}:portfolios")
+        codes = tuple(_CURRENCY_REGISTRY)
+        for user_id in range(1, count + 1):
+            wallets = rng.sample(codes, rng.randint(1, len(codes)))
+            yield {
+                "user_id": user_id,
+                "wallets": {
+                    code: str(
+                        Money(rng.randrange(10_000_000), 2).rescale(
+                            _CURRENCY_REGISTRY[code].scale
+                        )
+                    )
+                    for code in wallets
+                },
+            }
+
+    def journal(self, count: int) -> Iterator[Dict]:
+        """Записи журнала курсов: по котировке каждой пары раз в минуту."""
+        rng = random.Random(f"{self._seed}:journal")
+        pairs = list(BASE_RATES.items())
+        for i in range(count):
+            code, base_rate = pairs[i % len(pairs)]
+            yield journal_entry(
+                from_currency=code,
+                to_currency="USD",
+                rate=round(base_rate * rng.uniform(0.9, 1.1), 8),
+                source="generator",
+                timestamp=START_TIME + timedelta(minutes=i // len(pairs)),
+            )
+
+    @staticmethod
+    def rates() -> Dict:
+        """Кэш курсов в формате rates.json, актуальный на момент генерации."""
+        now = datetime.now().isoformat()
+        data: Dict = {
+            f"{code}_USD": {"rate": rate, "updated_at": now}
+            for code, rate in BASE_RATES.items()
+        }
+        data["source"] = "generator"
+        data["last_refresh"] = now
+        return data
+
+    def write_json(self, out_dir: Path, users: int) -> Dict[str, str]:
+        """Пишет users.json, portfolios.json и rates.json в out_dir."""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        paths = {
+            "users": str(out_dir / "users.json"),
+            "portfolios": str(out_dir / "portfolios.json"),
+            "rates": str(out_dir / "rates.json"),
+        }
+        self._write_array(paths["users"], self.users(users))
+        self._write_array(paths["portfolios"], self.portfolios(users))
+        with open(paths["rates"], "w", encoding="utf-8") as f:
+            json.dump(self.rates(), f, indent=4)
+        return paths
+
+    def write_backend(self, backend: StorageBackend, users: int) -> None:
+        """
+        Пишет данные в хранилище пачками по CHUNK_SIZE.
+        Подходит для хранилищ, где save_users/save_portfolios добавляют
+        записи, а не заменяют весь набор (SQLite).
+        """
+        with backend.transaction():
+            for chunk in self._chunks(self.users(users)):
+                backend.save_users(chunk)
+            for chunk in self._chunks(self.portfolios(users)):
+                backend.save_portfolios(chunk)
+            backend.save_rates(self.rates())
+
+    def write_journal(self, journal: RateJournal, count: int) -> None:
+        for chunk in self._chunks(self.journal(count)):
+            journal.append_batch(chunk)
+
+    @staticmethod
+    def _chunks(items: Iterator[Dict]) -> Iterator[List[Dict]]:
+        chunk: List[Dict] = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _write_array(path: str, items: Iterator[Dict]) -> None:
+        """Пишет JSON-массив по одному элементу."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("[")
+            for i, item in enumerate(items):
+                f.write(",\n    " if i else "\n    ")
+                f.write(json.dumps(item, ensure_ascii=False))
+            f.write("\n]\n")
+
+
+def run_generate(args: list) -> int:
+    """Разбирает аргументы команды generate и создает данные. Код возврата."""
+    try:
+        out_dir = Path(args[args.index("--out") + 1])
+        users = int(args[args.index("--users") + 1]) if "--users" in args else 1000
+        entries = (
+            int(args[args.index("--journal") + 1]) if "--journal" in args else 10_000
+        )
+        seed = int(args[args.index("--seed") + 1]) if "--seed" in args else 42
+        kind = args[args.index("--backend") + 1] if "--backend" in args else "json"
+    except (IndexError, ValueError):
+        print(GENERATE_USAGE, file=sys.stderr)
+        return 2
+
+    generator = DatasetGenerator(seed)
+    if kind == "json":
+        generator.write_json(out_dir, users)
+    elif kind == "sqlite":
+        from .backend.sqlite_backend import SqliteStorageBackend
+
+        backend = SqliteStorageBackend(str(out_dir / "valutatrade.db"))
+        try:
+            generator.write_backend(backend, users)
+        finally:
+            backend.close()
+    else:
+        print(f"Неизвестный тип хранилища '{kind}'", file=sys.stderr)
+        return 2
+
+    journal = RateJournal(
+        str(out_dir / Path(ParserConfig.JOURNAL_DIR).name),
+        max_segment_bytes=ParserConfig.JOURNAL_SEGMENT_MAX_BYTES,
+    )
+    generator.write_journal(journal, entries)
+
+    print(
+        f"Сгенерировано в {out_dir}: пользователей {users}, "
+        f"записей журнала {entries} (seed {seed}, хранилище {kind})."
+    )
+    return 0
@@ -1,4 +1,8 @@
 import shlex
+import sys
+from datetime import datetime
+from functools import cached_property
+from typing import TYPE_CHECKING
 
 from ..core.exceptions import (
     ApiRequestError,
@@ -7,33 +11,122 @@ from ..core.exceptions import (
     InvalidCommandFormatError,
     RatesExpiredError,
 )
+from ..infra.metrics import Histogram, MetricsRegistry
 from ..infra.settings import SettingsLoader
 from ..parser.config import ParserConfig
-from ..parser.updater import RateUpdater
 from .constants import (
     COMMAND_DESCRIPTIONS,
     COMMAND_EXAMPLES,
     INPUT_PROMT,
 )
-from .manager.portfolio import PortfolioManager
-from .manager.rate import RateManager
-from .manager.user import UserManager
+
+# Хранилище, менеджеры и модули отдельных команд (история курсов, mmap,
+# сжатие журнала, журнал сделок, cProfile/tracemalloc) импортируются
+# там, где они создаются: время старта не зависит от того, чего команда
+# не использует
+if TYPE_CHECKING:
+    from ..parser.binary_history import BinaryRateHistory
+    from ..parser.history import RateHistory
+    from ..parser.journal import RateJournal
+    from ..parser.updater import RateUpdater
+    from .backend.base import StorageBackend
+    from .ledger import TradeLedger
+    from .manager.portfolio import PortfolioManager
+    from .manager.rate import RateManager
+    from .manager.user import UserManager
+    from .profiler import CommandProfiler
 
 settings = SettingsLoader()
+metrics = MetricsRegistry()
 
 
 class CLIInterface:
     """Командный интерфейс приложения."""
 
+    # Ошибки пользовательского ввода: сообщаются, но не прерывают работу
+    USER_ERRORS = (
+        ValueError,
+        PermissionError,
+        InsufficientFundsError,
+        CurrencyNotFoundError,
+        ApiRequestError,
+        RatesExpiredError,
+        InvalidCommandFormatError,
+    )
+
     def __init__(self) -> None:
         self._user = None
-        self.user_manager = UserManager(settings.get("users_file"))
-        self.portfolio_manager = PortfolioManager(settings.get("portfolios_file"))
-        self.rate_manager = RateManager(
-            settings.get("rates_file"),
-            ttl=settings.get("rates_ttl_seconds")
+        self._rate_history: "RateHistory | BinaryRateHistory | None" = None
+        self._profiler: "CommandProfiler | None" = None
+        metrics.enabled = settings.get("metrics_enabled")
+
+    # Хранилище, менеджеры и HTTP-клиенты создаются при первом обращении:
+    # команде достаточно загрузить только то, что ей действительно нужно.
+
+    @cached_property
+    def backend(self) -> "StorageBackend":
+        from .backend.factory import create_backend
+
+        return create_backend(settings)
+
+    @cached_property
+    def user_manager(self) -> "UserManager":
+        from .manager.user import UserManager
+
+        return UserManager(
+            self.backend,
+            case_insensitive=settings.get("username_case_insensitive"),
+        )
+
+    @cached_property
+    def ledger(self) -> "TradeLedger | None":
+        path = settings.get("trades_file")
+        if not path:
+            return None
+
+        from .ledger import TradeLedger
+
+        return TradeLedger(path)
+
+    @cached_property
+    def portfolio_manager(self) -> "PortfolioManager":
+        from .manager.portfolio import PortfolioManager
+
+        return PortfolioManager(
+            self.backend,
+            store=settings.get("portfolio_store"),
+            ledger=self.ledger,
+            snapshot_every=settings.get("ledger_snapshot_every"),
         )
-        self.rate_updater = RateUpdater(ParserConfig.EXCHANGE_FILE_PATH)
+
+    @cached_property
+    def rate_manager(self) -> "RateManager":
+        from .manager.rate import RateManager
+
+        rate_manager = RateManager(
+            self.backend,
+            ttl=settings.get("rates_ttl_seconds"),
+            hard_ttl=settings.get("rates_hard_ttl_seconds"),
+        )
+        if settings.get("rates_background_refresh"):
+            rate_manager.start_background_refresh(
+                self.rate_updater, settings.get("rates_refresh_fraction")
+            )
+        return rate_manager
+
+    @cached_property
+    def rate_updater(self) -> "RateUpdater":
+        # requests импортируется только вместе с клиентами API
+        from ..parser.updater import RateUpdater
+
+        return RateUpdater(journal=self.journal)
+
+    @cached_property
+    def journal(self) -> "RateJournal":
+        # Командам истории журнал нужен без клиентов API
+        from ..parser.journal import RateJournal
+
+        return RateJournal.from_config(legacy_file=ParserConfig.EXCHANGE_FILE_PATH)
 
     def run(self) -> None:
         """Основной цикл."""
@@ -43,26 +136,60 @@ class CLIInterface:
             try:
                 user_input = input(INPUT_PROMT).strip()
                 self.proses_command(user_input)
-            except (
-                ValueError,
-                PermissionError,
-                InsufficientFundsError,
-                CurrencyNotFoundError,
-                ApiRequestError,
-                RatesExpiredError,
-                InvalidCommandFormatError,
-            ) as e:
+            except self.USER_ERRORS as e:
                 print("\033[3m\033[31m{}\033[0m".format(e))
             except (KeyboardInterrupt, EOFError):
                 break
+            finally:
+                self.flush_metrics()
+
+    def run_once(self, args: list) -> int:
+        """Выполняет одну команду из аргументов командной строки."""
+        try:
+            self.proses_command(shlex.join(args))
+        except self.USER_ERRORS as e:
+            print(e, file=sys.stderr)
+            return 1
+        finally:
+            self.flush_metrics()
+        return 0
+
+    def flush_metrics(self) -> None:
+        """Пишет метрики в файл для Prometheus, если он задан в настройках."""
+        path = settings.get("metrics_textfile")
+        if path and metrics.enabled:
+            metrics.write_textfile(path)
 
     def proses_command(self, user_input: str) -> None:
         """Обрабатывает пользовательскую команду и вызывает необходимый метод."""
         if not user_input:
             raise ValueError("Введите команду (help - список команд).")
 
-        cmd = shlex.split(user_input)
+        # shlex нужен только для строк с кавычками или экранированием
+        if any(ch in user_input for ch in "\"'\\"):
+            cmd = shlex.split(user_input)
+        else:
+            cmd = user_input.split()
+
+        # --profile у любой команды профилирует только ее
+        profile_once = "--profile" in cmd
+        if profile_once:
+            cmd.remove("--profile")
+            if not cmd:
+                raise InvalidCommandFormatError(user_input)
+
+        profiler = self._profiler
+        if profile_once and profiler is None:
+            profiler = self._make_profiler(settings.get("profile_memory"))
 
+        if profiler is None or cmd[0].lower() == "profile":
+            self._dispatch(cmd, user_input)
+        else:
+            with profiler.profile(cmd[0].lower()):
+                self._dispatch(cmd, user_input)
+
+    def _dispatch(self, cmd: list, user_input: str) -> None:
+        """Вызывает метод, соответствующий команде."""
         match cmd[0].lower():
             case "register":
                 if len(cmd) == 5 and cmd[1] == "--username" and cmd[3] == "--password":
@@ -96,12 +223,43 @@ class CLIInterface:
                 else:
                     raise InvalidCommandFormatError(user_input)
             
+            case "history":
+                try:
+                    self.trade_history(cmd[1:])
+                except (IndexError, TypeError, ValueError):
+                    raise InvalidCommandFormatError(user_input)
+
             case "get-rate":
                 if len(cmd) == 5 and cmd[1] == "--from" and cmd[3] == "--to":
                     self.get_rate(cmd[2], cmd[4])
+                elif (
+                    len(cmd) == 7
+                    and cmd[1] == "--from"
+                    and cmd[3] == "--to"
+                    and cmd[5] == "--at"
+                ):
+                    self.get_rate_at(cmd[2], cmd[4], cmd[6])
                 else:
                     raise InvalidCommandFormatError(user_input)
 
+            case "rate-history":
+                try:
+                    self.rate_history(cmd[1:])
+                except (IndexError, TypeError):
+                    raise InvalidCommandFormatError(user_input)
+
+            case "convert-history":
+                try:
+                    self.convert_history(cmd[1:])
+                except (IndexError, TypeError):
+                    raise InvalidCommandFormatError(user_input)
+
+            case "compact-journal":
+                try:
+                    self.compact_journal(cmd[1:])
+                except (IndexError, TypeError):
+                    raise InvalidCommandFormatError(user_input)
+
             case "update-rates":
                 if len(cmd) == 3 and cmd[1] == "--source":
                     self.update_rates(cmd[2])
@@ -116,6 +274,24 @@ class CLIInterface:
                 except (IndexError, TypeError, ValueError):
                     raise InvalidCommandFormatError(user_input)
 
+            case "revalue-all":
+                try:
+                    self.revalue_all(cmd[1:])
+                except (IndexError, TypeError):
+                    raise InvalidCommandFormatError(user_input)
+
+            case "profile":
+                if len(cmd) >= 2 and cmd[1] in ("on", "off"):
+                    self.set_profiling(cmd[1] == "on", "--memory" in cmd[2:])
+                else:
+                    raise InvalidCommandFormatError(user_input)
+
+            case "stats":
+                try:
+                    self.show_stats(cmd[1:])
+                except (IndexError, TypeError):
+                    raise InvalidCommandFormatError(user_input)
+
             case "help":
                 self.show_help()
 
@@ -142,9 +318,11 @@ class CLIInterface:
             raise PermissionError("Сначала выполните login.")
 
         portfolio = self.portfolio_manager.get_by_user_id(self._user.user_id)
-        print(portfolio.format_portfolio(
-            self._user.username, self.rate_manager, base_currency
-        ))
+        with metrics.timer("portfolio_format_seconds"):
+            text = portfolio.format_portfolio(
+                self._user.username, self.rate_manager, base_currency
+            )
+        print(text)
 
     def buy(self, currency, amount) -> None:
         """Покупка валюты."""
@@ -187,11 +365,140 @@ class CLIInterface:
             f"- {currency}: {result["old_balance"]} -> {result["new_balance"]}"
         )
     
+    def trade_history(self, arg: list | None) -> None:
+        """Выводит сделки пользователя из журнала сделок."""
+        if self._user is None:
+            raise PermissionError("Сначала выполните login.")
+        if self.ledger is None:
+            print("Журнал сделок выключен (trades_file).")
+            return
+
+        limit = int(arg[arg.index("--limit") + 1]) if "--limit" in arg else 20
+        events = self.ledger.history(self._user.user_id, limit)
+        if not events:
+            print("Сделок пока нет.")
+            return
+
+        print(f"Сделки пользователя {self._user.username} (последние {limit}):")
+        for e in events:
+            moment = datetime.fromisoformat(e["timestamp"])
+            print(
+                f"- {moment.strftime('%d-%m-%Y %H:%M:%S')} "
+                f"{'Покупка' if e['side'] == 'buy' else 'Продажа'} "
+                f"{e['amount']} {e['currency']} по курсу {e['rate']} "
+                f"{e['currency']}/{e['base']} (операция {e['op_id'][:8]})"
+            )
+
     def get_rate(self, from_currency, to_currency) -> None:
         """Возвращает курс валюты."""
         rate = self.rate_manager.format_rate(from_currency, to_currency)
         print(rate)
 
+    def get_rate_at(self, from_currency, to_currency, at: str) -> None:
+        """Возвращает курс валюты на указанный момент по истории котировок."""
+        pair = f"{from_currency}_{to_currency}".upper()
+        moment = datetime.fromisoformat(at)
+        point = self.history.rate_at(pair, moment)
+        if point is None:
+            print(f"Нет котировок {pair} на {moment.strftime('%d-%m-%Y %H:%M')}.")
+            return
+
+        print(
+            f"Курс {pair} на {moment.strftime('%d-%m-%Y %H:%M')}: {point['rate']} "
+            f"(котировка от {point['timestamp'].strftime('%d-%m-%Y %H:%M:%S')}, "
+            f"источник {point['source']})"
+        )
+
+    def rate_history(self, arg: list | None) -> None:
+        """Выводит историю курса пары за период или свечи OHLC."""
+        pair = arg[arg.index("--pair") + 1]
+        start = arg[arg.index("--from") + 1] if "--from" in arg else None
+        end = arg[arg.index("--to") + 1] if "--to" in arg else None
+        interval = arg[arg.index("--interval") + 1] if "--interval" in arg else None
+
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+
+        if interval:
+            from ..parser.history import parse_interval
+
+            candles = self.history.ohlc(pair, parse_interval(interval), start, end)
+            if not candles:
+                print("Котировки не найдены.")
+            for c in candles:
+                print(
+                    f"- {c['start'].strftime('%d-%m-%Y %H:%M')}: "
+                    f"O {c['open']} H {c['high']} L {c['low']} C {c['close']} "
+                    f"({c['count']})"
+                )
+            return
+
+        points = self.history.range(pair, start, end)
+        if not points:
+            print("Котировки не найдены.")
+        for p in points:
+            print(
+                f"- {p['timestamp'].strftime('%d-%m-%Y %H:%M:%S')}: "
+                f"{p['rate']} ({p['source']})"
+            )
+
+    @property
+    def history(self) -> "RateHistory | BinaryRateHistory":
+        """Индекс истории курсов: строится при первом обращении, затем дочитывается."""
+        if self._rate_history is None:
+            history_format = settings.get("rate_history_format")
+            if history_format == "binary":
+                from ..parser.binary_history import BinaryRateHistory
+
+                self._rate_history = BinaryRateHistory(ParserConfig.HISTORY_BIN_DIR)
+            elif history_format == "journal":
+                from ..parser.history import RateHistory
+
+                self._rate_history = RateHistory(self.journal)
+            else:
+                raise ValueError(f"Неизвестный формат истории '{history_format}'")
+        else:
+            self._rate_history.refresh()
+        return self._rate_history
+
+    def convert_history(self, arg: list | None) -> None:
+        """Переносит журнал курсов в бинарную историю для чтения через mmap."""
+        from ..parser.binary_history import BinaryRateHistory, convert_journal
+
+        out = arg[arg.index("--out") + 1] if "--out" in arg else None
+        history = BinaryRateHistory(out or ParserConfig.HISTORY_BIN_DIR)
+        count = convert_journal(self.journal, history)
+        print(
+            f"Журнал перенесен в {history.path}: записей {count}, "
+            f"пар {len(history.pairs())}."
+        )
+
+    def compact_journal(self, arg: list | None) -> None:
+        """Сжимает закрытые сегменты журнала курсов по политике из ParserConfig."""
+        from ..parser.compaction import CompactionPolicy, JournalCompactor
+        from ..parser.history import parse_interval
+
+        raw = arg[arg.index("--raw") + 1] if "--raw" in arg else None
+        retention = arg[arg.index("--retention") + 1] if "--retention" in arg else None
+        dry_run = "--dry-run" in arg
+
+        policy = CompactionPolicy.from_config(
+            parse_interval(raw) if raw else None,
+            parse_interval(retention) if retention else None,
+        )
+        report = JournalCompactor(self.journal, policy).run(dry_run=dry_run)
+        if not report["segments_before"]:
+            print("Закрытых сегментов нет, сжимать нечего.")
+            return
+
+        print(
+            f"{'Сжатие журнала (без изменений)' if dry_run else 'Журнал сжат'}: "
+            f"сегментов {report['segments_before']} -> {report['segments_after']}, "
+            f"записей {report['entries_before']} -> {report['entries_after']}, "
+            f"освобождено {report['bytes_reclaimed'] / 1024 / 1024:.2f} МБ "
+            f"({report['bytes_reclaimed']} байт)"
+        )
+
     def update_rates(self, source: str | None = None):
         """Обновляет курсы валют."""
         print("Курсы начали обновляться...")
@@ -200,6 +507,8 @@ class CLIInterface:
         formatted = self.rate_manager.last_refresh.strftime("%d-%m-%Y %H:%M")
         print(f"Курсы успешно обновлены. Всего обновлено: {len(rates)}. "
               f"Последнее обновление: {formatted}")
+        for name, reason in self.rate_updater.last_skipped.items():
+            print(f"Источник {name} пропущен: {reason}")
 
     def show_rates(self, arg: list | None):
         """Возвращает курс валюты с возможностью фильтрации."""
@@ -217,6 +526,78 @@ class CLIInterface:
         for r in rates:
             print(f"- {r['pair']}: {r['rate']:.4f}")
 
+    def revalue_all(self, arg: list | None):
+        """Оценивает портфели всех пользователей и выводит итоги."""
+        from ..core.money import Money, currency_scale
+
+        base = arg[arg.index("--base") + 1] if "--base" in arg else None
+        output = arg[arg.index("--output") + 1] if "--output" in arg else None
+        base = (base or settings.get("base_currency")).upper()
+
+        totals = self.portfolio_manager.revalue_all(self.rate_manager, base)
+        out = open(output, "w", encoding="utf-8") if output else sys.stdout
+        count, grand_total = 0, Money(0, currency_scale(base))
+        try:
+            for user_id, total in totals:
+                out.write(f"{user_id}\t{total} {base}\n")
+                count += 1
+                grand_total += total
+        finally:
+            if output:
+                out.close()
+
+        print(f"Оценено портфелей: {count}. Общая сумма: {grand_total} {base}")
+
+    def set_profiling(self, enabled: bool, memory: bool = False) -> None:
+        """Включает или выключает профилирование всех следующих команд."""
+        if not enabled:
+            self._profiler = None
+            print("Профилирование выключено.")
+            return
+
+        memory = memory or settings.get("profile_memory")
+        self._profiler = self._make_profiler(memory)
+        print(
+            f"Профилирование включено (память: {'да' if memory else 'нет'}), "
+            f"файлы в {self._profiler.out_dir}"
+        )
+
+    @staticmethod
+    def _make_profiler(memory: bool) -> "CommandProfiler":
+        from .profiler import CommandProfiler
+
+        return CommandProfiler(settings.get("profile_dir"), memory=memory)
+
+    def show_stats(self, arg: list | None) -> None:
+        """Выводит метрики процесса; --prom <file> дополнительно пишет их в файл."""
+        if not metrics.enabled:
+            print("Метрики выключены (metrics_enabled).")
+            return
+
+        if "--prom" in arg:
+            path = arg[arg.index("--prom") + 1]
+            metrics.write_textfile(path)
+            print(f"Метрики записаны в {path}")
+
+        items = metrics.items()
+        if not items:
+            print("Метрик пока нет.")
+            return
+
+        print("Метрики процесса:")
+        for name, labels, metric in items:
+            label = ",".join(f"{key}={value}" for key, value in labels)
+            title = f"{name}{{{label}}}" if label else name
+            if isinstance(metric, Histogram):
+                average = metric.sum / metric.count * 1000 if metric.count else 0
+                print(
+                    f"- {title}: {metric.count} шт., среднее {average:.3f} мс, "
+                    f"p50 ≤ {metric.quantile(0.5) * 1000:g} мс, "
+                    f"p99 ≤ {metric.quantile(0.99) * 1000:g} мс"
+                )
+            else:
+                print(f"- {title}: {metric.value:g}")
+
     def show_help(self) -> None:
         """Отображает доступные команды и примеры их использования."""
         print("\tДоступные команды:")
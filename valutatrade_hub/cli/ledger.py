@@ -0,0 +1,363 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+from ..core.exceptions import StaleDataError
+from ..infra.metrics import MetricsRegistry
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - нет flock (Windows)
+    fcntl = None
+
+metrics = MetricsRegistry()
+
+# Запись индекса: (user_id, смещение строки события) — два int64
+INDEX_FIELDS = 2
+INDEX_RECORD_SIZE = INDEX_FIELDS * 8
+
+
+class TradeLedger:
+    """
+    Журнал сделок: append-only JSON lines, событие на каждую сделку
+    (seq, op_id, user_id, side, currency, amount, rate, base, timestamp).
+    Балансы портфелей — производное состояние: снимок плюс события
+    журнала после него (см. PortfolioManager).
+
+    Рядом лежат:
+    - <файл>.idx — пары int64 (user_id, смещение строки) для истории
+      пользователя без просмотра всего журнала; индекс производный и
+      дописывается по журналу при запросе истории, сделки его не трогают.
+      Его дописывают все процессы, поэтому перед дозаписью под блокировкой
+      дочитываются чужие записи и продолжение идет с последней из них;
+    - <файл>.checkpoint — seq и смещение последнего снимка портфелей,
+      с него начинается повтор событий при старте.
+
+    Внутри buffered() события копятся в памяти и дописываются одной
+    записью с одним fsync при выходе из блока (или при flush()).
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._index_path = f"{path}.idx"
+        self._lock_path = f"{path}.lock"
+        self._checkpoint_path = f"{path}.checkpoint"
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Индекс по пользователям строится при первом запросе истории
+        self._by_user: Dict[int, array] | None = None
+        self._index_size = 0
+        self._indexed_end = 0
+        # Сколько журнала уже прочитал владелец и последний seq в нем
+        self._offset, self.last_seq = self._read_end()
+        # op_id последнего события этого процесса: повтор операции после
+        # StaleDataError не должен дописать ту же сделку второй раз
+        self._last_op_id: str | None = None
+
+        # Недописанные события buffered(): смещение и seq выше уже их учитывают
+        self._buffer: List[bytes] = []
+        self._buffered_bytes = 0
+        self._buffer_depth = 0
+        self._lock = threading.RLock()
+        self._lock_fd: int | None = None
+        self._lock_depth = 0
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    def append(
+        self,
+        user_id: int,
+        side: str,
+        currency: str,
+        amount: str,
+        rate: str,
+        base: str,
+        op_id: str | None = None,
+    ) -> Dict:
+        """
+        Дописывает событие сделки и выполняет fsync (внутри buffered() —
+        откладывает запись до flush). Если журнал дописал другой процесс
+        и его события еще не прочитаны (tail) — StaleDataError.
+        """
+        with self._locked():
+            end = self._truncate_torn_tail()
+            if end != self._offset - self._buffered_bytes:
+                metrics.inc("storage_stale_total", file=os.path.basename(self._path))
+                raise StaleDataError(self._path)
+
+            event = {
+                "seq": self.last_seq + 1,
+                "op_id": op_id or self.new_op_id(),
+                "user_id": user_id,
+                "side": side,
+                "currency": currency,
+                "amount": amount,
+                "rate": rate,
+                "base": base,
+                "timestamp": datetime.now().isoformat(),
+            }
+            line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+            self._buffer.append(line)
+            self._buffered_bytes += len(line)
+            self._offset += len(line)
+            self.last_seq = event["seq"]
+            self._last_op_id = event["op_id"]
+            if not self._buffer_depth:
+                self.flush()
+        return event
+
+    @contextmanager
+    def buffered(self) -> Iterator["TradeLedger"]:
+        """
+        Групповая запись: события внутри блока дописываются одной записью
+        с одним fsync при выходе. Блокировка журнала удерживается до конца
+        блока, поэтому другие процессы не могут вклиниться между событиями.
+        """
+        with self._locked():
+            self._buffer_depth += 1
+            try:
+                yield self
+            finally:
+                self._buffer_depth -= 1
+                if not self._buffer_depth:
+                    self.flush()
+
+    def flush(self) -> None:
+        """Дописывает накопленные события и выполняет fsync."""
+        with self._locked():
+            if not self._buffer:
+                return
+
+            started = time.perf_counter()
+            with open(self._path, "ab") as f:
+                f.write(b"".join(self._buffer))
+                f.flush()
+                os.fsync(f.fileno())
+            metrics.observe(
+                "storage_commit_seconds",
+                time.perf_counter() - started,
+                file=os.path.basename(self._path),
+            )
+            metrics.inc(
+                "storage_wal_records_total",
+                len(self._buffer),
+                file=os.path.basename(self._path),
+            )
+            self._buffer.clear()
+            self._buffered_bytes = 0
+
+    @staticmethod
+    def new_op_id() -> str:
+        """Идентификатор сделки; один на все попытки ее записи."""
+        return uuid.uuid4().hex
+
+    def appended(self, op_id: str) -> bool:
+        """Дописал ли этот процесс событие с op_id последним."""
+        return op_id == self._last_op_id
+
+    def tail(self) -> List[Dict]:
+        """События, дописанные другими процессами с прошлого чтения."""
+        events = []
+        for offset, event in self._read_from(self._offset):
+            events.append(event)
+            self._offset = offset + event.pop("_size")
+            self.last_seq = event["seq"]
+        return events
+
+    def replay_from(self, offset: int = 0, seq: int = 0) -> Iterator[Dict]:
+        """
+        Все события начиная со смещения offset (для восстановления при старте).
+        seq — последний seq до offset (из checkpoint): после offset событий
+        может не быть, а следующая запись должна продолжить нумерацию.
+        """
+        self._offset = offset
+        self.last_seq = seq
+        for offset, event in self._read_from(offset):
+            self._offset = offset + event.pop("_size")
+            self.last_seq = event["seq"]
+            yield event
+
+    def checkpoint(self) -> Dict[str, int]:
+        """Seq и смещение последнего снимка ({"seq": 0, "offset": 0}, если его нет)."""
+        try:
+            with open(self._checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"seq": 0, "offset": 0}
+
+    def position(self) -> Dict[str, int]:
+        """Seq последнего прочитанного или записанного события и смещение после него."""
+        return {"seq": self.last_seq, "offset": self._offset}
+
+    def save_checkpoint(self, position: Dict[str, int] | None = None) -> None:
+        """
+        Запоминает позицию снимка портфелей (по умолчанию — текущую).
+        Вызывается только после того, как снимок записан на диск: иначе
+        после сбоя checkpoint указывал бы дальше снимка и события между
+        ними потерялись бы при повторе.
+        Пишется под блокировкой журнала во временный файл с уникальным
+        именем, с fsync файла и каталога, и атомарно подменяет прежний.
+        """
+        directory = os.path.dirname(os.path.abspath(self._checkpoint_path))
+        content = json.dumps(position or self.position())
+        with self._locked():
+            fd, tmp_path = tempfile.mkstemp(
+                dir=directory,
+                prefix=f".{os.path.basename(self._checkpoint_path)}.",
+                suffix=".tmp",
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self._checkpoint_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            # fsync каталога фиксирует сам rename (на POSIX)
+            if hasattr(os, "O_DIRECTORY"):
+                dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+
+    def history(self, user_id: int, limit: int | None = None) -> List[Dict]:
+        """Сделки пользователя по времени (limit — только последние)."""
+        with self._locked():
+            self.flush()
+            self._update_index()
+
+        offsets = self._by_user.get(user_id, ())
+        if limit is not None:
+            offsets = offsets[-limit:] if limit > 0 else ()
+
+        events = []
+        if not offsets:
+            return events
+        with open(self._path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                events.append(json.loads(f.readline()))
+        return events
+
+    def _read_from(self, offset: int) -> Iterator[Tuple[int, Dict]]:
+        """(смещение, событие) для целых строк начиная с offset."""
+        if not os.path.exists(self._path):
+            return
+
+        with open(self._path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                # Недописанная строка будет прочитана в следующий раз
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    event = json.loads(line)
+                    event["_size"] = len(line)
+                    yield offset, event
+                offset += len(line)
+
+    def _read_end(self) -> Tuple[int, int]:
+        """Смещение конца последней целой строки и seq последнего события."""
+        if not os.path.exists(self._path):
+            return 0, 0
+
+        with open(self._path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            chunk = 4096
+            while True:
+                start = max(size - chunk, 0)
+                f.seek(start)
+                data = f.read(size - start)
+                end = data.rfind(b"\n")
+                last = data.rfind(b"\n", 0, end) if end >= 0 else -1
+                if last >= 0 or start == 0:
+                    break
+                chunk *= 2
+
+        if end < 0:
+            return 0, 0
+        return start + end + 1, json.loads(data[last + 1:end + 1])["seq"]
+
+    def _truncate_torn_tail(self) -> int:
+        """Отрезает недописанную строку (сбой при записи); возвращает конец журнала."""
+        end, _ = self._read_end()
+        if os.path.exists(self._path) and os.path.getsize(self._path) > end:
+            os.truncate(self._path, end)
+        return end
+
+    def _update_index(self) -> None:
+        """
+        Дочитывает индекс (его дописывают и другие процессы) и дописывает
+        в него хвост журнала. Вызывается под блокировкой журнала.
+        """
+        if self._by_user is None:
+            self._by_user = {}
+
+        entries = array("q")
+        if os.path.exists(self._index_path):
+            with open(self._index_path, "rb") as f:
+                f.seek(self._index_size)
+                data = f.read()
+            # Недописанная запись индекса отбрасывается и перезапишется
+            valid = len(data) - len(data) % INDEX_RECORD_SIZE
+            entries.frombytes(data[:valid])
+            if valid != len(data):
+                os.truncate(self._index_path, self._index_size + valid)
+            self._index_size += valid
+
+        for i in range(0, len(entries), INDEX_FIELDS):
+            self._index_user(entries[i]).append(entries[i + 1])
+        if entries:
+            # Продолжение — после последнего события, уже записанного в индекс
+            with open(self._path, "rb") as f:
+                f.seek(entries[-1])
+                self._indexed_end = entries[-1] + len(f.readline())
+
+        positions = array("q")
+        for offset, event in self._read_from(self._indexed_end):
+            positions.extend((event["user_id"], offset))
+            self._index_user(event["user_id"]).append(offset)
+            self._indexed_end = offset + event["_size"]
+
+        if positions:
+            with open(self._index_path, "ab") as f:
+                f.write(positions.tobytes())
+            self._index_size += len(positions) * positions.itemsize
+
+    def _index_user(self, user_id: int) -> array:
+        offsets = self._by_user.get(user_id)
+        if offsets is None:
+            offsets = self._by_user[user_id] = array("q")
+        return offsets
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Межпроцессная блокировка записи в журнал (flock), повторно входимая."""
+        with self._lock:
+            if self._lock_depth == 0:
+                self._lock_fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
@@ -1,46 +1,83 @@
-from decimal import Decimal, InvalidOperation
-from typing import Dict, Optional
+from decimal import InvalidOperation
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Optional, Tuple
 
 from ...cli.manager.rate import RateManager
 from ...core.currencies import get_currency
 from ...core.decorators import log_action
-from ...core.exceptions import CurrencyNotFoundError
+from ...core.exceptions import CurrencyNotFoundError, InsufficientFundsError
 from ...core.models.portfolio import Portfolio
 from ...core.models.wallet import Wallet
-from ...core.utils import format_balance
-from ..storage import FileStorageManager
+from ...core.money import Money
+from ...core.valuation import BatchValuation
+from ...infra.metrics import MetricsRegistry
+from ..backend.base import StorageBackend
+from .portfolio_store import PortfolioStore, create_portfolio_store
+
+if TYPE_CHECKING:
+    from ..ledger import TradeLedger
+
+metrics = MetricsRegistry()
 
 
 class PortfolioManager:
-    """Менеджер портфелей пользователей."""
+    """
+    Менеджер портфелей пользователей.
+    Портфели в памяти держит PortfolioStore: объекты в словаре (dict)
+    или столбцы балансов (columnar) для десятков миллионов кошельков.
+
+    С журналом сделок (ledger) каждая сделка — событие в TradeLedger.
+    Если хранилище загружается в память целиком, балансы после сделки
+    не пишутся: раз в snapshot_every событий сохраняется снимок портфелей
+    с ledger_seq (seq последнего учтенного события), а при старте
+    к снимку применяются только события после него. Иначе журнал —
+    история сделок, и событие пишется только после записи баланса.
+    """
 
-    def __init__(self, file_path: str):
-        self._storage = FileStorageManager(file_path)
-        self._portfolios: Dict[int, Portfolio] = {}
+    def __init__(
+        self,
+        backend: StorageBackend,
+        store: str = "dict",
+        ledger: "TradeLedger | None" = None,
+        snapshot_every: int = 1000,
+    ):
+        self._backend = backend
+        self._portfolios: PortfolioStore = create_portfolio_store(store)
+        self._ledger = ledger
+        self._snapshot_every = snapshot_every
+        self._events_since_snapshot = 0
         self._load()
 
     def get_by_user_id(self, user_id: int) -> Optional[Portfolio]:
         """Возвращает портфель пользователя по его id."""
-        return self._portfolios.get(user_id)
+        portfolio = self._portfolios.get(user_id)
+        if portfolio is None and not self._backend.preload:
+            data = self._backend.find_portfolio(user_id)
+            if data:
+                portfolio = self._portfolios.add(data)
+        return portfolio
 
     def create_portfolio(self, user_id: int) -> Portfolio:
         """Создает портфель пользователю."""
-        if user_id in self._portfolios:
-            raise ValueError("Портфель уже есть у пользователя.")
-
-        portfolio = Portfolio(user_id)
-        self._portfolios[user_id] = portfolio
-        self.save()
-        return portfolio
+        return self._backend.run_synced(
+            self._sync, lambda: self._create_portfolio(user_id)
+        )
 
     def add_currency(self, user_id: int, currency_code: str) -> Wallet:
         """Добавляет новую валюту в портфель."""
         portfolio = self._get_or_create(user_id)
         return portfolio.add_currency(currency_code)
-    
+
     def save(self) -> None:
-        """Сохраняет текущее состояние в файл portfolios.json."""
-        self._storage.save(self._serialize())
+        """Сохраняет текущее состояние в хранилище."""
+        self._backend.run_synced(self._sync, self._save_snapshot)
+
+    def _create_portfolio(self, user_id: int) -> Portfolio:
+        if self.get_by_user_id(user_id):
+            raise ValueError("Портфель уже есть у пользователя.")
+
+        portfolio = self._portfolios.add({"user_id": user_id, "wallets": {}})
+        self._backend.save_portfolio(self._serialize_portfolio(portfolio))
+        return portfolio
 
     @log_action("BUY", verbose=True)
     def buy_currency(
@@ -55,30 +92,28 @@ class PortfolioManager:
         currency_obj = get_currency(currency)
 
         try:
-            amount = Decimal(amount)
-        except InvalidOperation:
+            amount = Money.of(amount, currency_obj.scale)
+        except (InvalidOperation, ValueError):
             raise ValueError("Количество должен быть числом")
 
         if amount <= 0:
             raise ValueError("Количество должен быть больше 0")
 
         rate_manager.is_expired()
-        portfolio = self.get_by_user_id(user_id)
-
-        if not portfolio.get_wallet(currency_obj.code):
-            portfolio.add_currency(currency_obj.code)
-
-        wallet = portfolio.get_wallet(currency_obj.code)
-        old_balance = wallet.balance
-        wallet.deposit(amount)
         rate = rate_manager.get_rate(currency_obj.code, base_currency)
+        # Один op_id на все попытки run_synced: по нему повтор узнает
+        # уже записанную в журнал сделку
+        op_id = self._new_op_id()
 
-        self.save()
-        return {
-            "rate": rate["rate"],
-            "old_balance": old_balance,
-            "new_balance": wallet.balance,
-        }
+        with metrics.timer("trade_seconds", action="buy"):
+            result = self._backend.run_synced(
+                self._sync,
+                lambda: self._apply_buy(
+                    user_id, currency_obj.code, amount, rate, base_currency, op_id
+                ),
+            )
+        metrics.inc("trades_total", action="buy")
+        return result
 
     @log_action("SELL", verbose=True)
     def sell_currency(
@@ -93,63 +128,287 @@ class PortfolioManager:
         currency_obj = get_currency(currency)
 
         try:
-            amount = Decimal(amount)
-        except InvalidOperation:
+            amount = Money.of(amount, currency_obj.scale)
+        except (InvalidOperation, ValueError):
             raise ValueError("Количество должен быть числом")
 
         if amount <= 0:
             raise ValueError("Количество должен быть больше 0")
 
         rate_manager.is_expired()
+        rate = rate_manager.get_rate(currency_obj.code, base_currency)
+        # Один op_id на все попытки run_synced: по нему повтор узнает
+        # уже записанную в журнал сделку
+        op_id = self._new_op_id()
+
+        with metrics.timer("trade_seconds", action="sell"):
+            result = self._backend.run_synced(
+                self._sync,
+                lambda: self._apply_sell(
+                    user_id, currency_obj.code, amount, rate, base_currency, op_id
+                ),
+            )
+        metrics.inc("trades_total", action="sell")
+        return result
+
+    def _apply_buy(
+        self,
+        user_id: int,
+        code: str,
+        amount: Money,
+        rate: Dict,
+        base: str,
+        op_id: str | None,
+    ) -> Dict:
+        """Зачисляет валюту на свежем состоянии портфеля (внутри транзакции)."""
+        portfolio = self.get_by_user_id(user_id)
+
+        if not portfolio.get_wallet(code):
+            portfolio.add_currency(code)
+
+        wallet = portfolio.get_wallet(code)
+        old_balance = self._trade(
+            portfolio, "buy", code, amount, rate, base, op_id, wallet.deposit
+        )
+        return {
+            "rate": rate["rate"],
+            "old_balance": old_balance,
+            "new_balance": wallet.balance,
+        }
+
+    def _apply_sell(
+        self,
+        user_id: int,
+        code: str,
+        amount: Money,
+        rate: Dict,
+        base: str,
+        op_id: str | None,
+    ) -> Dict:
+        """Списывает валюту на свежем состоянии портфеля (внутри транзакции)."""
         portfolio = self.get_by_user_id(user_id)
-        wallet = portfolio.get_wallet(currency_obj.code)
+        wallet = portfolio.get_wallet(code)
 
         if not wallet:
-            raise CurrencyNotFoundError(currency_obj.code)
+            raise CurrencyNotFoundError(code)
 
-        old_balance = wallet.balance
-        wallet.withdraw(amount)
-        rate = rate_manager.get_rate(currency_obj.code, base_currency)
+        # Проверка до записи события: в журнал попадают только сделки
+        # (при повторе сделка уже списана, и проверять нечего)
+        if amount > wallet.balance and not self._appended(op_id):
+            raise InsufficientFundsError(wallet.balance, code)
 
-        self.save()
+        old_balance = self._trade(
+            portfolio, "sell", code, amount, rate, base, op_id, wallet.withdraw
+        )
         return {
             "rate": rate["rate"],
             "old_balance": old_balance,
             "new_balance": wallet.balance,
         }
 
+    def _trade(
+        self,
+        portfolio: Portfolio,
+        side: str,
+        code: str,
+        amount: Money,
+        rate: Dict,
+        base: str,
+        op_id: str | None,
+        change: Callable[[Money], None],
+    ) -> Money:
+        """
+        Проводит сделку по кошельку и возвращает прежний баланс.
+        С журналом при полной загрузке в память событие и есть запись
+        сделки, поэтому пишется первым. Иначе сначала сохраняется баланс,
+        и событие дописывается в той же транзакции хранилища: при ошибке
+        записи баланса в журнале не остается непроведенной сделки.
+        """
+        balance = portfolio.get_wallet(code).balance
+        if self._appended(op_id):
+            # Повтор после StaleDataError: событие уже в журнале, и
+            # перечитывание портфелей (sync(True)) его применило
+            return balance - amount if side == "buy" else balance + amount
+
+        if self._ledger is not None and self._backend.preload:
+            self._record(portfolio.user, side, code, amount, rate, base, op_id)
+            change(amount)
+            self._persist(portfolio, code)
+            return balance
+
+        change(amount)
+        try:
+            self._persist(portfolio, code)
+            self._record(portfolio.user, side, code, amount, rate, base, op_id)
+        except BaseException:
+            if not self._backend.preload:
+                # Баланс в кэше не записан: портфель перечитается из хранилища
+                self._portfolios.remove(portfolio.user)
+            raise
+        return balance
+
+    def _new_op_id(self) -> str | None:
+        return self._ledger.new_op_id() if self._ledger is not None else None
+
+    def _appended(self, op_id: str | None) -> bool:
+        return op_id is not None and self._ledger.appended(op_id)
+
+    def _record(
+        self,
+        user_id: int,
+        side: str,
+        code: str,
+        amount: Money,
+        rate: Dict,
+        base: str,
+        op_id: str | None,
+    ) -> None:
+        """Пишет сделку в журнал сделок (если он подключен)."""
+        if self._ledger is not None:
+            self._ledger.append(
+                user_id, side, code, str(amount), str(rate["rate"]), base, op_id
+            )
+
+    def _persist(self, portfolio: Portfolio, code: str) -> None:
+        """
+        Сохраняет портфель после сделки. С журналом сделок при полной
+        загрузке в память — только снимком раз в snapshot_every событий.
+        """
+        if self._ledger is None or not self._backend.preload:
+            self._backend.save_portfolio(
+                self._serialize_portfolio(portfolio), changed=[code]
+            )
+            return
+
+        self._events_since_snapshot += 1
+        if self._events_since_snapshot >= self._snapshot_every:
+            self._save_snapshot()
+
+    def _save_snapshot(self) -> None:
+        if self._ledger is not None:
+            # Снимок не должен опережать журнал на диске: иначе после сбоя
+            # события с seq не выше ledger_seq были бы пропущены при повторе
+            self._ledger.flush()
+        self._backend.save_portfolios(self._serialize())
+        if self._ledger is not None:
+            # checkpoint сдвигается к seq снимка, только когда снимок
+            # зафиксирован: в транзакции после сделки — после ее фиксации
+            position = self._ledger.position()
+            self._backend.after_commit(
+                lambda: self._ledger.save_checkpoint(position)
+            )
+        self._events_since_snapshot = 0
+
+    def _apply_event(self, event: Dict) -> None:
+        """Применяет событие журнала сделок к портфелю в памяти."""
+        user_id, code = event["user_id"], event["currency"]
+        portfolio = self._portfolios.get(user_id)
+        if portfolio is None:
+            portfolio = self._portfolios.add({"user_id": user_id, "wallets": {}})
+        if not portfolio.get_wallet(code):
+            portfolio.add_currency(code)
+
+        wallet = portfolio.get_wallet(code)
+        if event["side"] == "buy":
+            wallet.deposit(event["amount"])
+        else:
+            wallet.withdraw(event["amount"])
+
+    def revalue_all(
+        self, rate_manager: RateManager, base_currency: str
+    ) -> Iterator[Tuple[int, Money]]:
+        """Оценивает все портфели по одному снимку курсов: (user_id, итог)."""
+        valuation = BatchValuation(
+            rate_manager.get_rate_vector(base_currency), base_currency
+        )
+        if self._backend.preload:
+            return self._portfolios.revalue(valuation)
+        return valuation.run(self._iter_holdings())
+
+    def _iter_holdings(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Балансы всех портфелей прямо из хранилища."""
+        for item in self._backend.load_portfolios():
+            yield item["user_id"], item["wallets"]
+
     def _get_or_create(self, user_id: int) -> Portfolio:
         """Создает или возвращает портфолио пользователя."""
-        portfolio = self._portfolios.get(user_id)
+        portfolio = self.get_by_user_id(user_id)
         if portfolio is None:
             portfolio = self.create_portfolio(user_id)
         return portfolio
 
+    def _sync(self, reset: bool = False) -> None:
+        """
+        Применяет изменения портфелей, сделанные другими процессами.
+        reset=True — перечитать портфели из хранилища целиком.
+        """
+        records = [] if reset else self._backend.sync_portfolios()
+        if reset or any(record["op"] == "reset" for record in records):
+            # Новый снимок: загрузка заново с повтором событий после него
+            self._portfolios.clear()
+            self._load()
+            return
+
+        # Портфель из записи уже учитывает события до ее ledger_seq
+        applied: Dict[int, int] = {}
+        for record in records:
+            if record["op"] == "delete":
+                self._portfolios.remove(record["key"])
+            else:
+                self._portfolios.add(record["value"])
+                applied[record["value"]["user_id"]] = record["value"].get(
+                    "ledger_seq", 0
+                )
+
+        if self._ledger is not None:
+            for event in self._ledger.tail():
+                if self._backend.preload and event["seq"] > applied.get(
+                    event["user_id"], 0
+                ):
+                    self._apply_event(event)
+
     def _load(self) -> None:
-        """Загружает файл portfolios.json"""
-        raw = self._storage.load()
+        """Загружает портфели из хранилища и повторяет события после снимка."""
+        if not self._backend.preload:
+            if self._ledger is not None:
+                # Балансы читаются из базы, журнал только дочитывается
+                self._ledger.tail()
+            return
 
-        for item in raw:
-            portfolio = Portfolio(item["user_id"])
+        items = self._backend.load_portfolios()
+        self._portfolios.load(items)
+        if self._ledger is not None:
+            self._replay(items)
 
-            for code, balance in item["wallets"].items():
-                wallet = Wallet(code, Decimal(balance))
-                portfolio._wallets[code] = wallet
+    def _replay(self, items: list[dict]) -> None:
+        """Применяет события журнала сделок, которых еще нет в портфелях."""
+        applied = {item["user_id"]: item.get("ledger_seq", 0) for item in items}
+        start = min(applied.values(), default=0)
+        checkpoint = self._ledger.checkpoint()
+        if checkpoint["seq"] > start:
+            checkpoint = {"seq": 0, "offset": 0}
 
-            self._portfolios[portfolio.user] = portfolio
+        self._events_since_snapshot = 0
+        for event in self._ledger.replay_from(checkpoint["offset"], checkpoint["seq"]):
+            if event["seq"] > applied.get(event["user_id"], 0):
+                self._apply_event(event)
+                self._events_since_snapshot += 1
 
     def _serialize(self) -> list[dict]:
-        data = []
-
-        for portfolio in self._portfolios.values():
-            data.append(
-                {
-                    "user_id": portfolio.user,
-                    "wallets": {
-                        code: format_balance(wallet.balance)
-                        for code, wallet in portfolio.wallets.items()
-                    },
-                }
-            )
+        records = list(self._portfolios.records())
+        if self._ledger is not None:
+            for record in records:
+                record["ledger_seq"] = self._ledger.last_seq
+        return records
 
+    def _serialize_portfolio(self, portfolio: Portfolio) -> dict:
+        data = {
+            "user_id": portfolio.user,
+            "wallets": {
+                code: str(wallet.balance)
+                for code, wallet in portfolio._wallets.items()
+            },
+        }
+        if self._ledger is not None:
+            data["ledger_seq"] = self._ledger.last_seq
         return data
@@ -0,0 +1,444 @@
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ...core.currencies import get_currency
+from ...core.models.portfolio import Portfolio
+from ...core.models.wallet import Wallet
+from ...core.money import Money, to_units
+from ...core.valuation import BatchValuation
+
+# Балансы: (user_id, {код валюты: сумма})
+Holdings = Iterator[Tuple[int, Dict[str, Money]]]
+
+# Границы баланса в столбце int64
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+
+
+class PortfolioStore(ABC):
+    """
+    Портфели в памяти PortfolioManager.
+    Записи принимаются и отдаются в формате хранилища:
+    {"user_id": int, "wallets": {"USD": "100.00", ...}}.
+    """
+
+    @abstractmethod
+    def get(self, user_id: int) -> Optional[Portfolio]:
+        """Возвращает портфель пользователя или None."""
+
+    @abstractmethod
+    def add(self, item: dict) -> Portfolio:
+        """Добавляет портфель из записи хранилища (заменяет существующий)."""
+
+    @abstractmethod
+    def remove(self, user_id: int) -> None:
+        """Удаляет портфель пользователя."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Удаляет все портфели."""
+
+    @abstractmethod
+    def holdings(self) -> Holdings:
+        """Балансы всех портфелей без создания моделей."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def load(self, items: Iterable[dict]) -> None:
+        """Массовая загрузка записей хранилища."""
+        for item in items:
+            self.add(item)
+        self.compact()
+
+    def compact(self) -> None:
+        """Уплотняет данные после массовой загрузки (если это нужно)."""
+
+    def revalue(self, valuation: BatchValuation) -> Iterator[Tuple[int, Money]]:
+        """Оценивает все портфели: (user_id, итог)."""
+        return valuation.run(self.holdings())
+
+    def records(self) -> Iterator[dict]:
+        """Все портфели в формате хранилища."""
+        for user_id, wallets in self.holdings():
+            yield {
+                "user_id": user_id,
+                "wallets": {code: str(balance) for code, balance in wallets.items()},
+            }
+
+
+class DictPortfolioStore(PortfolioStore):
+    """Портфели как объекты Portfolio/Wallet в словаре по user_id."""
+
+    def __init__(self) -> None:
+        self._portfolios: Dict[int, Portfolio] = {}
+
+    def get(self, user_id: int) -> Optional[Portfolio]:
+        return self._portfolios.get(user_id)
+
+    def add(self, item: dict) -> Portfolio:
+        portfolio = Portfolio(item["user_id"])
+
+        for code, balance in item["wallets"].items():
+            wallet = Wallet(code, balance)
+            portfolio._wallets[wallet._currency_code.code] = wallet
+
+        self._portfolios[portfolio.user] = portfolio
+        return portfolio
+
+    def remove(self, user_id: int) -> None:
+        self._portfolios.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._portfolios.clear()
+
+    def holdings(self) -> Holdings:
+        for portfolio in self._portfolios.values():
+            yield portfolio.user, {
+                code: wallet.balance for code, wallet in portfolio._wallets.items()
+            }
+
+    def __len__(self) -> int:
+        return len(self._portfolios)
+
+
+class ColumnarPortfolioStore(PortfolioStore):
+    """
+    Портфели в столбцах (CSR): отсортированный массив user_id,
+    смещения строк, коды валют (номер в словаре валют) и балансы
+    в целых минимальных единицах (int64). На кошелек — 10 байт.
+
+    Изменения, которые не укладываются в строку (новая валюта у
+    пользователя, id не по порядку), копят в словаре _overrides
+    и переносятся в массивы при compact(); None в нем — удаленный портфель.
+    Portfolio и Wallet отдаются как представления над столбцами.
+    """
+
+    def __init__(self, compact_ratio: float = 0.125) -> None:
+        self._compact_ratio = compact_ratio
+        self._reset()
+
+    def _reset(self) -> None:
+        self._codes: List[str] = []
+        self._code_index: Dict[str, int] = {}
+        self._user_ids = array("q")
+        self._offsets = array("q", [0])
+        self._wallet_codes = array("H")
+        self._units = array("q")
+        self._overrides: Dict[int, Optional[Dict[int, int]]] = {}
+        self._size = 0
+
+    def get(self, user_id: int) -> Optional[Portfolio]:
+        codes = self._wallet_code_list(user_id)
+        if codes is None:
+            return None
+        return PortfolioView(self, user_id, codes)
+
+    def add(self, item: dict) -> Portfolio:
+        user_id = item["user_id"]
+        wallets = {
+            self._code(code): to_units(balance, get_currency(code).scale)
+            for code, balance in item["wallets"].items()
+        }
+        _check_units(wallets.values())
+        exists = self._contains(user_id)
+        row = None if user_id in self._overrides else self._row(user_id)
+
+        if row is not None and self._row_codes(row) == list(wallets):
+            # Тот же набор валют — балансы меняются на месте
+            start = self._offsets[row]
+            self._units[start:start + len(wallets)] = array("q", wallets.values())
+        elif (
+            row is None
+            and user_id not in self._overrides
+            and (not self._user_ids or user_id > self._user_ids[-1])
+        ):
+            # Новый id больше всех — строка дописывается в конец массивов
+            self._append_row(user_id, wallets)
+        else:
+            self._overrides[user_id] = wallets
+            self._maybe_compact()
+
+        if not exists:
+            self._size += 1
+        return self.get(user_id)
+
+    def load(self, items: Iterable[dict]) -> None:
+        # Без представлений и поиска: строки по возрастанию id дописываются
+        # в массивы, остальные (и повторы) идут в _overrides до compact()
+        currencies: Dict[str, Tuple[int, int]] = {}
+        for item in items:
+            user_id = item["user_id"]
+            wallets = {}
+            for code, balance in item["wallets"].items():
+                currency = currencies.get(code)
+                if currency is None:
+                    scale = get_currency(code).scale
+                    currency = currencies[code] = (self._code(code), scale)
+                wallets[currency[0]] = to_units(balance, currency[1])
+            _check_units(wallets.values())
+
+            if not self._contains(user_id):
+                self._size += 1
+            if user_id not in self._overrides and (
+                not self._user_ids or user_id > self._user_ids[-1]
+            ):
+                self._append_row(user_id, wallets)
+            else:
+                self._overrides[user_id] = wallets
+        self.compact()
+
+    def remove(self, user_id: int) -> None:
+        if not self._contains(user_id):
+            return
+        if self._row(user_id) is None:
+            del self._overrides[user_id]
+        else:
+            self._overrides[user_id] = None
+        self._size -= 1
+        self._maybe_compact()
+
+    def clear(self) -> None:
+        self._reset()
+
+    def holdings(self) -> Holdings:
+        codes = self._codes
+        scales = [get_currency(code).scale for code in codes]
+        overrides = self._overrides
+
+        for row, user_id in enumerate(self._user_ids):
+            if user_id in overrides:
+                continue
+            start, end = self._offsets[row], self._offsets[row + 1]
+            yield user_id, {
+                codes[code]: Money(units, scales[code])
+                for code, units in zip(
+                    self._wallet_codes[start:end], self._units[start:end]
+                )
+            }
+
+        for user_id, wallets in overrides.items():
+            if wallets is not None:
+                yield user_id, {
+                    codes[code]: Money(units, scales[code])
+                    for code, units in wallets.items()
+                }
+
+    def compact(self) -> None:
+        """
+        Переносит изменения из _overrides в массивы за один проход.
+        Строки между измененными копируются срезами целиком.
+        """
+        if not self._overrides:
+            return
+
+        overrides = self._overrides
+        old = (self._user_ids, self._offsets, self._wallet_codes, self._units)
+        self._user_ids = array("q")
+        self._offsets = array("q", [0])
+        self._wallet_codes = array("H")
+        self._units = array("q")
+        self._overrides = {}
+
+        old_ids = old[0]
+        start = 0
+        for user_id in sorted(overrides):
+            row = bisect_left(old_ids, user_id)
+            self._copy_rows(old, start, row)
+            start = row + 1 if row < len(old_ids) and old_ids[row] == user_id else row
+
+            wallets = overrides[user_id]
+            if wallets is not None:
+                self._append_row(user_id, wallets)
+        self._copy_rows(old, start, len(old_ids))
+
+    def revalue(self, valuation: BatchValuation) -> Iterator[Tuple[int, Money]]:
+        # Столбцы передаются в оценку как есть, без словарей на портфель
+        self.compact()
+        return valuation.run_columns(
+            self._user_ids,
+            self._offsets,
+            self._wallet_codes,
+            self._units,
+            self._codes,
+            [get_currency(code).scale for code in self._codes],
+        )
+
+    def memory_bytes(self) -> int:
+        """Объем массивов в байтах (без словаря _overrides)."""
+        return sum(
+            column.itemsize * len(column)
+            for column in (
+                self._user_ids, self._offsets, self._wallet_codes, self._units
+            )
+        )
+
+    def __len__(self) -> int:
+        return self._size
+
+    # --- доступ к отдельным кошелькам (для представлений) ---
+
+    def get_units(self, user_id: int, code: int) -> int:
+        wallets = self._overrides.get(user_id)
+        if wallets is not None:
+            return wallets[code]
+        return self._units[self._position(user_id, code)]
+
+    def set_units(self, user_id: int, code: int, units: int) -> None:
+        _check_units((units,))
+        wallets = self._overrides.get(user_id)
+        if wallets is not None:
+            wallets[code] = units
+        else:
+            self._units[self._position(user_id, code)] = units
+
+    def add_wallet(self, user_id: int, currency_code: str) -> int:
+        """Добавляет пользователю кошелек с нулевым балансом."""
+        code = self._code(currency_code)
+        wallets = self._overrides.get(user_id)
+        if wallets is None:
+            # Строка переносится в _overrides, где ее можно расширить
+            wallets = self._overrides[user_id] = dict(self._row_items(user_id))
+        wallets[code] = 0
+        return code
+
+    # --- внутреннее устройство ---
+
+    def _code(self, currency_code: str) -> int:
+        code = self._code_index.get(currency_code)
+        if code is None:
+            code = self._code_index[currency_code] = len(self._codes)
+            self._codes.append(currency_code)
+        return code
+
+    def _row(self, user_id: int) -> Optional[int]:
+        user_ids = self._user_ids
+        row = bisect_left(user_ids, user_id)
+        if row < len(user_ids) and user_ids[row] == user_id:
+            return row
+        return None
+
+    def _contains(self, user_id: int) -> bool:
+        if user_id in self._overrides:
+            return self._overrides[user_id] is not None
+        return self._row(user_id) is not None
+
+    def _row_codes(self, row: int) -> List[int]:
+        return list(self._wallet_codes[self._offsets[row]:self._offsets[row + 1]])
+
+    def _row_items(self, user_id: int) -> Iterator[Tuple[int, int]]:
+        row = self._row(user_id)
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return zip(self._wallet_codes[start:end], self._units[start:end])
+
+    def _wallet_code_list(self, user_id: int) -> Optional[List[str]]:
+        if user_id in self._overrides:
+            wallets = self._overrides[user_id]
+            if wallets is None:
+                return None
+            return [self._codes[code] for code in wallets]
+
+        row = self._row(user_id)
+        if row is None:
+            return None
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return [self._codes[code] for code in self._wallet_codes[start:end]]
+
+    def _position(self, user_id: int, code: int) -> int:
+        row = self._row(user_id)
+        start, end = self._offsets[row], self._offsets[row + 1]
+        for position in range(start, end):
+            if self._wallet_codes[position] == code:
+                return position
+        raise KeyError(code)
+
+    def _append_row(self, user_id: int, wallets: Dict[int, int]) -> None:
+        self._user_ids.append(user_id)
+        self._wallet_codes.extend(wallets.keys())
+        self._units.extend(wallets.values())
+        self._offsets.append(len(self._units))
+
+    def _copy_rows(self, old: tuple, start: int, end: int) -> None:
+        """Дописывает строки [start, end) из старых массивов."""
+        if start >= end:
+            return
+        old_ids, old_offsets, old_codes, old_units = old
+        shift = len(self._units) - old_offsets[start]
+
+        self._user_ids.extend(old_ids[start:end])
+        self._wallet_codes.extend(old_codes[old_offsets[start]:old_offsets[end]])
+        self._units.extend(old_units[old_offsets[start]:old_offsets[end]])
+        if shift:
+            self._offsets.extend(
+                offset + shift for offset in old_offsets[start + 1:end + 1]
+            )
+        else:
+            self._offsets.extend(old_offsets[start + 1:end + 1])
+
+    def _maybe_compact(self) -> None:
+        limit = max(1024, len(self._user_ids) * self._compact_ratio)
+        if len(self._overrides) > limit:
+            self.compact()
+
+
+def _check_units(values) -> None:
+    for units in values:
+        if not INT64_MIN <= units <= INT64_MAX:
+            raise ValueError("Баланс превышает допустимый размер.")
+
+
+class WalletView(Wallet):
+    """Кошелек, баланс которого читается и пишется прямо в столбец."""
+
+    __slots__ = ("_store", "_user_id", "_code")
+
+    def __init__(
+        self, store: ColumnarPortfolioStore, user_id: int, currency_code: str
+    ) -> None:
+        self._currency_code = get_currency(currency_code)
+        self._store = store
+        self._user_id = user_id
+        self._code = store._code(self._currency_code.code)
+
+    @property
+    def _units(self) -> int:
+        return self._store.get_units(self._user_id, self._code)
+
+    @_units.setter
+    def _units(self, units: int) -> None:
+        self._store.set_units(self._user_id, self._code, units)
+
+
+class PortfolioView(Portfolio):
+    """Портфель-представление над строкой ColumnarPortfolioStore."""
+
+    __slots__ = ("_store",)
+
+    def __init__(
+        self, store: ColumnarPortfolioStore, user_id: int, codes: List[str]
+    ) -> None:
+        super().__init__(
+            user_id, {code: WalletView(store, user_id, code) for code in codes}
+        )
+        self._store = store
+
+    def add_currency(self, currency_code: str) -> None:
+        if self._wallets.get(currency_code, None):
+            raise ValueError(
+                f"У пользователя уже есть кошелек с валютой '{currency_code}'."
+            )
+
+        code = get_currency(currency_code).code
+        self._store.add_wallet(self._user_id, code)
+        self._wallets[code] = WalletView(self._store, self._user_id, code)
+
+
+def create_portfolio_store(kind: str) -> PortfolioStore:
+    """Создает хранилище портфелей в памяти (настройка portfolio_store)."""
+    if kind == "dict":
+        return DictPortfolioStore()
+    if kind == "columnar":
+        return ColumnarPortfolioStore()
+    raise ValueError(f"Неизвестный тип хранилища портфелей '{kind}'")
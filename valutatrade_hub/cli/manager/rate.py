@@ -1,69 +1,122 @@
+import threading
 from datetime import datetime
-from decimal import Decimal
 from typing import Dict
 
 from ...core.currencies import get_currency
 from ...core.exceptions import CurrencyNotFoundError, RatesExpiredError
-from ..storage import FileStorageManager
+from ...core.money import Rate
+from ...core.rate_matrix import RateMatrix
+from ...infra.metrics import MetricsRegistry
+from ...parser.refresher import BackgroundRefresher
+from ..backend.base import StorageBackend
 
+metrics = MetricsRegistry()
 
-class RateManager:
-    """Менеджер курсов валют."""
 
-    def __init__(self, file_path: str, ttl: int):
-        self._storage = FileStorageManager(file_path)
+class RateManager:
+    """
+    Менеджер курсов валют.
+    Курсы старше ttl считаются устаревшими. Если запущено фоновое
+    обновление, устаревший снимок продолжает отдаваться до hard_ttl.
+    """
+
+    def __init__(
+        self, backend: StorageBackend, ttl: int, hard_ttl: int | None = None
+    ):
+        self._backend = backend
         self._ttl = ttl
+        self._hard_ttl = max(hard_ttl or ttl, ttl)
         self._rates: Dict[str, Dict[str, any]] = {}
+        self._matrix = RateMatrix({})
+        self._write_lock = threading.Lock()
+        self._refresher: BackgroundRefresher | None = None
         self.source: str = ""
         self.last_refresh: datetime | None = None
         self._load()
 
-    def get_rate(self, from_currency: str, to_currency: str) -> Decimal:
-        """Возвращает курс from_currency -> to_currency."""
+    def start_background_refresh(self, updater, fraction: float = 0.8) -> None:
+        """Запускает фоновое обновление по прошествии доли ttl."""
+        if self._refresher is not None:
+            return
+        self._refresher = BackgroundRefresher(
+            updater, self, refresh_after=self._ttl * fraction
+        )
+        self._refresher.start()
+
+    def stop_background_refresh(self) -> None:
+        if self._refresher is not None:
+            self._refresher.stop()
+            self._refresher = None
+
+    def get_rate(self, from_currency: str, to_currency: str) -> dict:
+        """
+        Возвращает курс from_currency -> to_currency из матрицы кросс-курсов:
+        {"rate": Rate, "updated_at": str, "path": (...)}.
+        Для одинаковых валют — единичный курс (оценка в базовой валюте).
+        """
         self.is_expired()
         from_currency_obj = get_currency(from_currency)
         to_currency_obj = get_currency(to_currency)
-        key = f"{from_currency_obj.code}_{to_currency_obj.code}"
-        if key not in self._rates:
+        # Поиск в матрице — O(1): таймер стоил бы дороже самого поиска,
+        # поэтому считаются только промахи
+        rate = self._matrix.lookup(from_currency_obj.code, to_currency_obj.code)
+        if rate is None:
+            metrics.inc("rate_lookup_misses_total")
             raise ValueError(
                 f"Курс для {from_currency_obj.code}->{to_currency_obj.code} не найден."
             )
-        return self._rates[key]
-
-    def update(self, rates: dict[str, Decimal], source: str) -> None:
-        """Обновляет курс и дату обновления."""
-        self.source = source
+        return rate
 
-        for pair, rate in rates.items():
-            self._rates[pair] = {
-                "rate": float(rate),
-                "updated_at": datetime.now().isoformat(),
-            }
-
-        self.save()
+    def get_rate_vector(self, base_currency: str) -> Dict[str, Rate]:
+        """Возвращает курсы всех валют к base_currency одним снимком."""
+        self.is_expired()
+        base_currency_obj = get_currency(base_currency)
+        return self._matrix.column(base_currency_obj.code)
+
+    def update(self, rates: dict[str, Rate], source: str) -> None:
+        """
+        Обновляет курс и дату обновления.
+        Новый снимок собирается отдельно и подменяет старый целиком,
+        поэтому читатели не блокируются и не видят его частично.
+        """
+        with self._write_lock:
+            updated = dict(self._rates)
+            for pair, rate in rates.items():
+                updated[pair] = {
+                    "rate": Rate.of(rate),
+                    "updated_at": datetime.now().isoformat(),
+                }
+
+            matrix = RateMatrix(updated)
+            self._rates, self._matrix = updated, matrix
+            self.source = source
+            self.save()
 
     def save(self, source: str = "ParserService") -> None:
-        """Сохраняет текущие курсы в файл rates.json"""
-        data = {k: v for k, v in self._rates.items()}
+        """Сохраняет текущие курсы в хранилище (курсы — строками без потерь)."""
+        data = {
+            pair: {"rate": str(value["rate"]), "updated_at": value["updated_at"]}
+            for pair, value in self._rates.items()
+        }
         data["source"] = source
         data["last_refresh"] = datetime.now().isoformat()
-        self._storage.save(data)
+        self._backend.save_rates(data)
         self.last_refresh = datetime.now()
         self.source = data["source"]
 
     def get_rate_pair(self, from_currency: str, to_currency: str) -> dict:
         """Возвращает прямой и обратный курс."""
         self.is_expired()
-        from_currency_obj = get_currency(from_currency)
-        to_currency_obj = get_currency(to_currency)
-        key = f"{from_currency_obj.code}_{to_currency_obj.code}"
-        if key not in self._rates:
+        from_currency_obj, to_currency_obj = self.user_pair(from_currency, to_currency)
+        matrix = self._matrix
+        rate_data = matrix.lookup(from_currency_obj.code, to_currency_obj.code)
+        inverse_data = matrix.lookup(to_currency_obj.code, from_currency_obj.code)
+        if rate_data is None or inverse_data is None:
             raise ValueError(
                 f"Курс для {from_currency_obj.code}->{to_currency_obj.code} не найден."
             )
-        rate_data = self._rates[key]
 
-        direct_rate = Decimal("1") / Decimal(str(rate_data["rate"]))
+        direct_rate = inverse_data["rate"]
         reverse_rate = rate_data["rate"]
 
         return {
@@ -74,6 +127,21 @@ class RateManager:
             "updated_at": rate_data["updated_at"],
         }
 
+    @staticmethod
+    def user_pair(from_currency: str, to_currency: str) -> tuple:
+        """
+        Валюты пары, запрошенной пользователем (get-rate, GET /rate).
+        Курс валюты к самой себе — ошибка ввода: единичный курс в матрице
+        нужен только для оценки портфеля в базовой валюте.
+        """
+        from_currency_obj = get_currency(from_currency)
+        to_currency_obj = get_currency(to_currency)
+        if from_currency_obj.code == to_currency_obj.code:
+            raise ValueError(
+                f"Курс для {from_currency_obj.code}->{to_currency_obj.code} не найден."
+            )
+        return from_currency_obj, to_currency_obj
+
     def format_rate(self, from_currency: str, to_currency: str) -> str:
         data = self.get_rate_pair(from_currency, to_currency)
         updated_at = datetime.fromisoformat(data["updated_at"]).strftime(
@@ -89,8 +157,8 @@ class RateManager:
         )
     
     def _load(self) -> None:
-        """Загружает файл rates.json"""
-        raw = self._storage.load()
+        """Загружает курсы из хранилища."""
+        raw = self._backend.load_rates()
         self.source = raw.get("source", "Unknown")
         last_refresh_str = raw.get("last_refresh")
         self.last_refresh = datetime.fromisoformat(last_refresh_str) \
@@ -100,14 +168,32 @@ class RateManager:
             if key in ["source", "last_refresh"]:
                 continue
             self._rates[key] = {
-                "rate": Decimal(str(value["rate"])),
+                "rate": Rate.of(value["rate"]),
                 "updated_at": value["updated_at"],
             }
 
+        self._matrix = RateMatrix(self._rates)
+
     def is_expired(self):
-        """Проверяет актуальность курсов валют"""
-        elapsed_seconds = (datetime.now() - self.last_refresh).total_seconds()
-        if elapsed_seconds > self._ttl:
+        """
+        Проверяет актуальность курсов валют.
+        При фоновом обновлении устаревшие курсы запускают обновление
+        и отдаются дальше, ошибка — только после hard_ttl.
+        """
+        if self.last_refresh is None:
+            elapsed_seconds = float("inf")
+        else:
+            elapsed_seconds = (datetime.now() - self.last_refresh).total_seconds()
+            metrics.set("rates_age_seconds", elapsed_seconds)
+
+        if elapsed_seconds <= self._ttl:
+            return
+
+        if self._refresher is None:
+            raise RatesExpiredError()
+
+        self._refresher.trigger()
+        if elapsed_seconds > self._hard_ttl:
             raise RatesExpiredError()
     
     def get_rates_filter(
@@ -115,37 +201,38 @@ class RateManager:
         currency: str | None = None,
         top: int | None = None,
         base: str | None = "USD",
+    ) -> list[dict]:
+        with metrics.timer("rates_filter_seconds"):
+            return self._rates_filter(currency, top, base)
+
+    def _rates_filter(
+        self, currency: str | None, top: int | None, base: str | None
     ) -> list[dict]:
         self.is_expired()
         base = (base or "USD").upper()
 
-        if base != "USD":
-            base_key = f"{base}_USD"
-            if base_key not in self._rates:
-                raise CurrencyNotFoundError(f"Базовая валюта {base} недоступна")
-            base_rate = Decimal(str(self._rates[base_key]["rate"]))
-        else:
-            base_rate = Decimal("1")
+        matrix = self._matrix
+        if base not in matrix:
+            raise CurrencyNotFoundError(f"Базовая валюта {base} недоступна")
 
         rates = []
 
-        for pair, info in self._rates.items():
-            from_code, _ = pair.split("_")
-
+        for from_code in matrix.codes:
             if currency and from_code != currency.upper():
                 continue
 
-            rate_usd = Decimal(str(info["rate"]))
-            rate_in_base = rate_usd / base_rate
+            info = matrix.lookup(from_code, base)
+            if info is None:
+                continue
 
             rates.append({
                 "pair": f"{from_code}_{base}",
-                "rate": rate_in_base,
+                "rate": info["rate"],
                 "updated_at": info["updated_at"],
             })
 
         if top:
-            rates.sort(key=lambda x: x["rate"], reverse=True)
+            rates.sort(key=lambda x: x["rate"].units, reverse=True)
             rates = rates[:top]
 
         return rates
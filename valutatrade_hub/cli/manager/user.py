@@ -1,32 +1,89 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from ...core.models.user import User
 from ...core.utils import generate_salt, hash_password
-from ..storage import FileStorageManager
+from ..backend.base import StorageBackend
 
+USER_ID_COUNTER = "user_id"
 
-class UserManager:
-    """Менеджер пользователей."""
 
-    def __init__(self, file_path: str):
-        self._storage = FileStorageManager(file_path)
-        self._users : List[User] = []
+class UserManager:
+    """
+    Менеджер пользователей.
+    Пользователи индексируются по username и user_id, новые id выдаются
+    монотонным счетчиком.
+    """
+
+    def __init__(self, backend: StorageBackend, case_insensitive: bool = False):
+        self._backend = backend
+        self._case_insensitive = case_insensitive
+        self._by_id: Dict[int, User] = {}
+        self._by_username: Dict[str, User] = {}
+        self._next_id = 1
         self._load()
 
     def get_all(self) -> List[User]:
         """Возвращает всех пользователей."""
-        return list(self._users)
+        if not self._backend.preload:
+            return [self._deserialize(data) for data in self._backend.load_users()]
+        return list(self._by_id.values())
 
     def get_by_username(self, username: str) -> Optional[User]:
         """Ищет пользователя по username."""
-        for user in self._users:
-            if user._username == username:
-                return user
-        return None
+        user = self._by_username.get(self._username_key(username))
+        if user is None and not self._backend.preload:
+            data = self._backend.find_user(username, self._case_insensitive)
+            if data:
+                user = self._deserialize(data)
+                self._index(user)
+        return user
+
+    def get_by_id(self, user_id: int) -> Optional[User]:
+        """Ищет пользователя по user_id."""
+        user = self._by_id.get(user_id)
+        if user is None and not self._backend.preload:
+            data = self._backend.find_user_by_id(user_id)
+            if data:
+                user = self._deserialize(data)
+                self._index(user)
+        return user
 
     def create(self, username: str, password: str) -> User:
         """Создаёт и добавляет нового пользователя."""
+        return self._backend.run_synced(
+            self._sync, lambda: self._create(username, password)
+        )
+
+    def rename(self, user_id: int, new_username: str) -> User:
+        """Меняет username пользователя."""
+        return self._backend.run_synced(
+            self._sync, lambda: self._rename(user_id, new_username)
+        )
+
+    def delete(self, user_id: int) -> None:
+        """Удаляет пользователя. Его id повторно не выдается."""
+        self._backend.run_synced(self._sync, lambda: self._delete(user_id))
+
+    def save(self) -> None:
+        """Сохраняет текущее состояние в хранилище."""
+        self._backend.run_synced(self._sync, self._save)
+
+    def authenticate(self, username: str, password: str) -> User:
+        """Аутентификация пользователя."""
+        # Пользователь мог зарегистрироваться в другом процессе
+        self._sync()
+        user = self.get_by_username(username)
+        if user is None:
+            raise ValueError("Неверный логин или пароль.")
+
+        hashed_input = hash_password(password, user._salt)
+        if hashed_input != user._hashed_password:
+            raise ValueError("Неверный логин или пароль.")
+
+        return user
+
+    def _create(self, username: str, password: str) -> User:
         if self.get_by_username(username):
             raise ValueError(f"Имя пользователя {username} уже занято.")
 
@@ -45,36 +102,111 @@ class UserManager:
             datetime.now(),
         )
 
-        self._users.append(user)
-        self.save()
+        self._index(user)
+        self._backend.save_user(self._serialize_user(user))
+        # Счетчик сохраняется вместе с пользователем: если его удалят до
+        # следующего снимка, id все равно не выдадут повторно
+        self._backend.save_counter(USER_ID_COUNTER, self._peek_next_id())
         return user
 
-    def save(self) -> None:
-        """Сохраняет текущее состояние в файл users.json"""
-        self._storage.save(self._serialize())
-
-    def authenticate(self, username: str, password: str) -> User:
-        """Аутентификация пользователя."""
-        user = self.get_by_username(username)
+    def _rename(self, user_id: int, new_username: str) -> User:
+        user = self.get_by_id(user_id)
         if user is None:
-            raise ValueError("Неверный логин или пароль.")
+            raise ValueError(f"Пользователь с id {user_id} не найден.")
 
-        hashed_input = hash_password(password, user._salt)
-        if hashed_input != user._hashed_password:
-            raise ValueError("Неверный логин или пароль.")
+        other = self.get_by_username(new_username)
+        if other is not None and other.user_id != user_id:
+            raise ValueError(f"Имя пользователя {new_username} уже занято.")
 
+        self._unindex(user)
+        user.username = new_username
+        self._index(user)
+        self._backend.save_user(self._serialize_user(user))
         return user
 
+    def _delete(self, user_id: int) -> None:
+        user = self.get_by_id(user_id)
+        if user is None:
+            raise ValueError(f"Пользователь с id {user_id} не найден.")
+
+        self._unindex(user)
+        self._backend.save_counter(USER_ID_COUNTER, self._peek_next_id())
+        self._backend.delete_user(user_id)
+
+    def _save(self) -> None:
+        self._backend.save_users(self._serialize())
+        self._backend.save_counter(USER_ID_COUNTER, self._peek_next_id())
+
+    def _sync(self, reset: bool = False) -> None:
+        """
+        Применяет изменения пользователей, сделанные другими процессами.
+        reset=True — перечитать пользователей из хранилища целиком.
+        """
+        if reset:
+            self._by_id.clear()
+            self._by_username.clear()
+            self._load()
+            return
+
+        for record in self._backend.sync_users():
+            if record["op"] == "reset":
+                self._by_id.clear()
+                self._by_username.clear()
+                # Пользователей, удаленных до пересборки файла, в записях
+                # уже нет — их id известны только по счетчику
+                self._next_id = max(
+                    self._next_id, self._backend.load_counter(USER_ID_COUNTER)
+                )
+            elif record["op"] == "delete":
+                user = self._by_id.get(record["key"])
+                if user is not None:
+                    self._unindex(user)
+            else:
+                user = self._deserialize(record["value"])
+                old = self._by_id.get(user.user_id)
+                if old is not None:
+                    self._unindex(old)
+                self._index(user)
+                self._next_id = max(self._next_id, user.user_id + 1)
+
     def _load(self) -> None:
-        """Загружает файл users.json"""
-        raw_users = self._storage.load()
+        """Загружает пользователей из хранилища и строит индексы."""
+        if not self._backend.preload:
+            return
+
+        raw_users = self._backend.load_users()
+        max_id = 0
         for data in raw_users:
-            self._users.append(self._deserialize(data))
+            user = self._deserialize(data)
+            self._index(user)
+            max_id = max(max_id, user.user_id)
+
+        self._next_id = max(
+            max_id + 1, self._backend.load_counter(USER_ID_COUNTER)
+        )
 
     def _generate_user_id(self) -> int:
-        if not self._users:
-            return 1
-        return max(user.user_id for user in self._users) + 1
+        if not self._backend.preload:
+            return self._backend.next_user_id()
+        user_id = self._next_id
+        self._next_id += 1
+        return user_id
+
+    def _peek_next_id(self) -> int:
+        if not self._backend.preload:
+            return self._backend.next_user_id()
+        return self._next_id
+
+    def _username_key(self, username: str) -> str:
+        return username.casefold() if self._case_insensitive else username
+
+    def _index(self, user: User) -> None:
+        self._by_id[user.user_id] = user
+        self._by_username[self._username_key(user.username)] = user
+
+    def _unindex(self, user: User) -> None:
+        self._by_id.pop(user.user_id, None)
+        self._by_username.pop(self._username_key(user.username), None)
 
     @staticmethod
     def _deserialize(data: dict) -> User:
@@ -86,14 +218,15 @@ class UserManager:
             datetime.fromisoformat(data["registration_date"]),
         )
 
+    @staticmethod
+    def _serialize_user(user: User) -> dict:
+        return {
+            "user_id": user._user_id,
+            "username": user._username,
+            "hashed_password": user._hashed_password,
+            "salt": user._salt,
+            "registration_date": user._registration_date.isoformat(),
+        }
+
     def _serialize(self) -> list[dict]:
-        return [
-            {
-                "user_id": user._user_id,
-                "username": user._username,
-                "hashed_password": user._hashed_password,
-                "salt": user._salt,
-                "registration_date": user._registration_date.isoformat(),
-            }
-            for user in self._users
-        ]
+        return [self._serialize_user(user) for user in self._by_id.values()]
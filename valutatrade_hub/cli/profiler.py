@@ -0,0 +1,86 @@
+import cProfile
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - нет getrusage (Windows)
+    resource = None
+
+
+class CommandProfiler:
+    """
+    Профилирование отдельных команд CLI.
+    Команда выполняется под cProfile (и, если включено, tracemalloc);
+    результат сохраняется в out_dir: <время>-<команда>.prof для pstats/snakeviz
+    и <время>-<команда>-mem.txt с крупнейшими местами выделения памяти.
+    """
+
+    def __init__(self, out_dir: str, memory: bool = False, top: int = 20) -> None:
+        self.out_dir = out_dir
+        self.memory = memory
+        self.top = top
+
+    @contextmanager
+    def profile(self, command: str) -> Iterator[None]:
+        os.makedirs(self.out_dir, exist_ok=True)
+        prefix = os.path.join(
+            self.out_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{command}"
+        )
+
+        trace_memory = self.memory and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start()
+
+        profiler = cProfile.Profile()
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            wall = time.perf_counter() - wall_started
+            cpu = time.process_time() - cpu_started
+
+            peak = None
+            if trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                self._dump_allocations(f"{prefix}-mem.txt")
+                tracemalloc.stop()
+
+            profiler.dump_stats(f"{prefix}.prof")
+
+            summary = (
+                f"Профиль {command}: время {wall * 1000:.1f} мс, "
+                f"CPU {cpu * 1000:.1f} мс"
+            )
+            if peak is not None:
+                summary += f", пик памяти {peak / 1024 / 1024:.2f} МБ"
+            elif (rss := _peak_rss()) is not None:
+                # Без tracemalloc — пик RSS процесса за все время работы
+                summary += f", пик RSS {rss / 1024 / 1024:.2f} МБ"
+            print(f"{summary} ({prefix}.prof)")
+
+    def _dump_allocations(self, path: str) -> None:
+        """Сохраняет top мест, где выделено больше всего памяти."""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ))
+        stats = snapshot.statistics("lineno")
+        with open(path, "w", encoding="utf-8") as f:
+            for stat in stats[:self.top]:
+                f.write(f"{stat}\n")
+
+
+def _peak_rss() -> int | None:
+    """Пиковый RSS процесса в байтах (ru_maxrss: КБ в Linux, байты в macOS)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
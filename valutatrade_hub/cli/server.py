@@ -0,0 +1,609 @@
+import asyncio
+import json
+import logging
+import secrets
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from ..core.exceptions import (
+    ApiRequestError,
+    CurrencyNotFoundError,
+    InsufficientFundsError,
+    InvalidCommandFormatError,
+    RatesExpiredError,
+)
+from ..core.models.user import User
+from ..core.valuation import BatchValuation
+from ..infra.metrics import MetricsRegistry
+from ..infra.settings import SettingsLoader
+from .interface import CLIInterface
+
+logger = logging.getLogger(__name__)
+settings = SettingsLoader()
+metrics = MetricsRegistry()
+
+SERVE_USAGE = "Использование: valutatrade serve [--host <str>] [--port <int>]"
+
+# Статус ответа для пользовательских ошибок (ищется по MRO исключения)
+ERROR_STATUS = {
+    PermissionError: HTTPStatus.UNAUTHORIZED,
+    InsufficientFundsError: HTTPStatus.CONFLICT,
+    CurrencyNotFoundError: HTTPStatus.NOT_FOUND,
+    RatesExpiredError: HTTPStatus.SERVICE_UNAVAILABLE,
+    ApiRequestError: HTTPStatus.BAD_GATEWAY,
+    InvalidCommandFormatError: HTTPStatus.BAD_REQUEST,
+    ValueError: HTTPStatus.BAD_REQUEST,
+}
+
+MAX_HEADERS = 100
+TOO_LARGE = HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE
+
+
+class HttpError(Exception):
+    """Ошибка протокола: ответ отправляется, соединение закрывается."""
+
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        self.status = status
+        super().__init__(message)
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    params: Dict[str, Any]
+    token: str | None
+    keep_alive: bool
+
+
+class Route(NamedTuple):
+    """
+    handler — имя метода TradeServer; lock — None (без блокировки),
+    "read" (общая) или "write" (исключительная); blocking — выполнять
+    в пуле потоков, а не в цикле событий (диск, сеть, fsync).
+    """
+
+    handler: str
+    lock: str | None = None
+    blocking: bool = False
+    auth: bool = False
+
+
+ROUTES = {
+    ("POST", "/register"): Route("register", lock="write", blocking=True),
+    ("POST", "/login"): Route("login", lock="write", blocking=True),
+    ("POST", "/logout"): Route("logout"),
+    # Курсы подменяются в RateManager целым снимком — блокировка не нужна
+    ("GET", "/rate"): Route("get_rate"),
+    ("GET", "/rates"): Route("show_rates"),
+    ("POST", "/update-rates"): Route("update_rates", blocking=True),
+    ("GET", "/portfolio"): Route("show_portfolio", lock="read", auth=True),
+    ("POST", "/buy"): Route("buy", lock="write", blocking=True, auth=True),
+    ("POST", "/sell"): Route("sell", lock="write", blocking=True, auth=True),
+    ("GET", "/history"): Route(
+        "trade_history", lock="read", blocking=True, auth=True
+    ),
+    ("GET", "/metrics"): Route("show_metrics"),
+}
+
+
+class ReadWriteLock:
+    """
+    Блокировка для корутин: чтения идут параллельно, запись — одна
+    и без чтений. Ожидающая запись не пропускает новые чтения вперед,
+    поэтому поток чтений не откладывает сделки бесконечно.
+    """
+
+    def __init__(self) -> None:
+        self._cond = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @asynccontextmanager
+    async def read(self) -> Iterator[None]:
+        async with self._cond:
+            await self._cond.wait_for(
+                lambda: not self._writer and not self._writers_waiting
+            )
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @asynccontextmanager
+    async def write(self) -> Iterator[None]:
+        async with self._cond:
+            self._writers_waiting += 1
+            try:
+                await self._cond.wait_for(
+                    lambda: not self._writer and not self._readers
+                )
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class TradeServer:
+    """
+    HTTP/JSON-сервер на asyncio поверх менеджеров CLIInterface.
+    Одно состояние в памяти обслуживает всех клиентов вместо копии
+    данных в каждом процессе valutatrade.
+
+    - После POST /login запросы авторизуются токеном
+      (Authorization: Bearer <token>), сессии живут serve_session_ttl
+      секунд с последнего запроса.
+    - Соединения keep-alive, запросы можно отправлять конвейером:
+      следующий разбирается, пока выполняется предыдущий, ответы
+      уходят в порядке запросов (до serve_pipeline_depth в очереди).
+    - Одновременно выполняется не больше serve_max_inflight запросов.
+    - Соединение, по которому serve_idle_timeout секунд не приходит
+      полный запрос, закрывается: простаивающие клиенты не занимают
+      место из serve_max_connections.
+    - Записи (регистрация, вход, сделки) идут по одной в отдельном
+      потоке, чтения портфелей — параллельно между записями.
+    """
+
+    def __init__(
+        self,
+        cli: CLIInterface,
+        host: str | None = None,
+        port: int | None = None,
+    ) -> None:
+        self._cli = cli
+        self._host = host or settings.get("serve_host")
+        self._port = port if port is not None else settings.get("serve_port")
+        self._max_connections = settings.get("serve_max_connections")
+        self._max_inflight = settings.get("serve_max_inflight")
+        self._pipeline_depth = settings.get("serve_pipeline_depth")
+        self._max_body = settings.get("serve_max_body")
+        self._session_ttl = settings.get("serve_session_ttl")
+        self._idle_timeout = settings.get("serve_idle_timeout")
+
+        # token -> (пользователь, срок); порядок — по сроку, старые в начале
+        self._sessions: OrderedDict[str, Tuple[User, float]] = OrderedDict()
+        # login выполняется в потоке записи, проверка токена — в цикле событий
+        self._sessions_lock = threading.Lock()
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._update_lock = threading.Lock()
+        self._writer_pool = ThreadPoolExecutor(1, thread_name_prefix="serve-write")
+        self._reader_pool = ThreadPoolExecutor(
+            settings.get("serve_read_workers"), thread_name_prefix="serve-read"
+        )
+
+    async def serve(self, ready: Callable[[str, int], None] | None = None) -> None:
+        """Принимает соединения до SIGINT/SIGTERM, затем сохраняет снимок."""
+        # Менеджеры загружаются до первого запроса, а не в потоке записи
+        cli = self._cli
+        cli.user_manager, cli.portfolio_manager, cli.rate_manager
+
+        self._lock = ReadWriteLock()
+        self._inflight = asyncio.Semaphore(self._max_inflight)
+        self._stop = stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):  # pragma: no cover
+                pass
+
+        server = await asyncio.start_server(
+            self._handle_connection, self._host, self._port
+        )
+        host, port = server.sockets[0].getsockname()[:2]
+        if ready is not None:
+            ready(host, port)
+
+        await stop.wait()
+        server.close()
+        # Соединения keep-alive закрываются сами, иначе wait_closed их ждет
+        for writer in self._writers:
+            writer.close()
+        await server.wait_closed()
+        await self._shutdown()
+
+    def stop(self) -> None:
+        """Останавливает serve() так же, как SIGTERM (из цикла событий сервера)."""
+        self._stop.set()
+
+    async def _shutdown(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._lock.write():
+            await loop.run_in_executor(self._writer_pool, self._save)
+        self._writer_pool.shutdown()
+        self._reader_pool.shutdown()
+        self._cli.flush_metrics()
+
+    def _save(self) -> None:
+        """Снимок портфелей: при следующем старте журнал сделок повторять не нужно."""
+        if self._cli.ledger is not None:
+            self._cli.portfolio_manager.save()
+        self._cli.rate_manager.stop_background_refresh()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        if len(self._writers) >= self._max_connections:
+            metrics.inc("http_rejected_total")
+            writer.write(_response(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                {"error": "Overloaded", "message": "Слишком много соединений."},
+                keep_alive=False,
+            ))
+            await _close(writer)
+            return
+
+        self._writers.add(writer)
+        # Очередь ответов в порядке запросов: ограничивает конвейер соединения
+        pending: asyncio.Queue = asyncio.Queue(self._pipeline_depth)
+        sender = asyncio.create_task(self._send_responses(writer, pending))
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(
+                        self._read_request(reader), self._idle_timeout
+                    )
+                except TimeoutError:
+                    # Ответы на уже принятые запросы отправляются до закрытия
+                    metrics.inc("http_idle_closed_total")
+                    break
+                except HttpError as e:
+                    await pending.put(_ready(_response(
+                        e.status,
+                        {"error": e.status.phrase, "message": str(e)},
+                        keep_alive=False,
+                    )))
+                    break
+                if request is None:
+                    break
+
+                await pending.put(asyncio.create_task(self._respond(request)))
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await pending.put(None)
+            await sender
+            self._writers.discard(writer)
+            await _close(writer)
+
+    async def _send_responses(
+        self, writer: asyncio.StreamWriter, pending: asyncio.Queue
+    ) -> None:
+        while (task := await pending.get()) is not None:
+            data = await task
+            if writer.is_closing():
+                continue
+            writer.write(data)
+            # Ответы конвейера уходят одной записью в сокет
+            if pending.empty():
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Request | None:
+        """Разбирает запрос HTTP/1.x; None — клиент закрыл соединение."""
+        try:
+            line = await reader.readline()
+        except ValueError:
+            raise HttpError(HTTPStatus.REQUEST_URI_TOO_LONG, "Слишком длинный запрос.")
+        if not line:
+            return None
+
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Неверная строка запроса.")
+
+        headers: Dict[str, str] = {}
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                raise HttpError(TOO_LARGE, "Слишком длинный заголовок.")
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HttpError(TOO_LARGE, "Слишком много заголовков.")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", ""):
+            raise HttpError(HTTPStatus.LENGTH_REQUIRED, "Нужен Content-Length.")
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Неверный Content-Length.")
+        if length > self._max_body:
+            raise HttpError(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Слишком большое тело."
+            )
+        body = await reader.readexactly(length) if length else b""
+
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            keep_alive = connection != "close"
+        else:
+            keep_alive = connection == "keep-alive"
+
+        url = urlsplit(target)
+        params: Dict[str, Any] = dict(parse_qsl(url.query))
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                raise HttpError(
+                    HTTPStatus.BAD_REQUEST, "Тело должно быть JSON-объектом."
+                )
+            params.update(data)
+
+        auth = headers.get("authorization", "")
+        token = auth[7:].strip() if auth[:7].lower() == "bearer " else None
+        return Request(method.upper(), url.path, params, token, keep_alive)
+
+    async def _respond(self, request: Request) -> bytes:
+        """Выполняет запрос и возвращает готовый ответ."""
+        started = time.perf_counter()
+        route = ROUTES.get((request.method, request.path))
+        if route is None:
+            known = any(path == request.path for _, path in ROUTES)
+            status = HTTPStatus.METHOD_NOT_ALLOWED if known else HTTPStatus.NOT_FOUND
+            body: Any = {"error": status.phrase, "message": request.path}
+            name = "unknown"
+        else:
+            name = route.handler
+            async with self._inflight:
+                status, body = await self._execute(route, request)
+
+        elapsed = time.perf_counter() - started
+        metrics.observe("http_request_seconds", elapsed, route=name)
+        metrics.inc("http_requests_total", route=name, status=str(status.value))
+        return _response(status, body, request.keep_alive)
+
+    async def _execute(self, route: Route, request: Request) -> Tuple[HTTPStatus, Any]:
+        handler = getattr(self, route.handler)
+        try:
+            user = self._authorize(request.token) if route.auth else None
+            if route.lock is None:
+                body = await self._call(route, handler, request, user)
+            elif route.lock == "write":
+                async with self._lock.write():
+                    body = await self._call(route, handler, request, user)
+            else:
+                async with self._lock.read():
+                    body = await self._call(route, handler, request, user)
+        except CLIInterface.USER_ERRORS as e:
+            return _error_status(e), {"error": type(e).__name__, "message": str(e)}
+        except Exception as e:
+            logger.exception("Ошибка обработки %s %s", request.method, request.path)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {
+                "error": type(e).__name__, "message": str(e)
+            }
+        return HTTPStatus.OK, body
+
+    async def _call(self, route: Route, handler, request: Request, user) -> Any:
+        if not route.blocking:
+            return handler(request, user)
+        pool = self._writer_pool if route.lock == "write" else self._reader_pool
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, handler, request, user)
+
+    def _authorize(self, token: str | None) -> User:
+        """Пользователь сессии; срок продлевается на каждый запрос."""
+        now = time.monotonic()
+        with self._sessions_lock:
+            # Истекшие сессии лежат в начале: удаляются до первой живой
+            while self._sessions:
+                oldest, (_, expires) = next(iter(self._sessions.items()))
+                if expires > now:
+                    break
+                del self._sessions[oldest]
+
+            session = self._sessions.get(token) if token else None
+            if session is None:
+                raise PermissionError("Сначала выполните login.")
+            self._sessions[token] = (session[0], now + self._session_ttl)
+            self._sessions.move_to_end(token)
+        return session[0]
+
+    # Обработчики: (запрос, пользователь сессии) -> тело ответа (JSON)
+
+    def register(self, request: Request, user: None) -> Dict:
+        params = request.params
+        new_user = self._cli.user_manager.create(
+            _param(params, "username"), _param(params, "password")
+        )
+        self._cli.portfolio_manager.create_portfolio(new_user.user_id)
+        return {"user_id": new_user.user_id, "username": new_user.username}
+
+    def login(self, request: Request, user: None) -> Dict:
+        params = request.params
+        user = self._cli.user_manager.authenticate(
+            _param(params, "username"), _param(params, "password")
+        )
+        token = secrets.token_urlsafe(32)
+        with self._sessions_lock:
+            self._sessions[token] = (user, time.monotonic() + self._session_ttl)
+        return {
+            "token": token,
+            "user_id": user.user_id,
+            "username": user.username,
+            "expires_in": self._session_ttl,
+        }
+
+    def logout(self, request: Request, user: None) -> Dict:
+        with self._sessions_lock:
+            self._sessions.pop(request.token, None)
+        return {"status": "ok"}
+
+    def get_rate(self, request: Request, user: None) -> Dict:
+        params = request.params
+        from_currency = _param(params, "from").upper()
+        to_currency = _param(params, "to").upper()
+        rate_manager = self._cli.rate_manager
+        rate_manager.user_pair(from_currency, to_currency)
+        rate = rate_manager.get_rate(from_currency, to_currency)
+        return {
+            "pair": f"{from_currency}_{to_currency}",
+            "rate": rate["rate"],
+            "updated_at": rate["updated_at"],
+        }
+
+    def show_rates(self, request: Request, user: None) -> Dict:
+        params = request.params
+        top = params.get("top")
+        rates = self._cli.rate_manager.get_rates_filter(
+            params.get("currency"), int(top) if top else None, params.get("base")
+        )
+        return {"last_refresh": self._cli.rate_manager.last_refresh, "rates": rates}
+
+    def update_rates(self, request: Request, user: None) -> Dict:
+        # Обновления идут по одному, чтения курсов при этом не ждут
+        with self._update_lock:
+            rate_updater = self._cli.rate_updater
+            rates = rate_updater.run_update(request.params.get("source"))
+            self._cli.rate_manager.update(rates=rates, source="")
+        return {
+            "updated": len(rates),
+            "last_refresh": self._cli.rate_manager.last_refresh,
+            "skipped": rate_updater.last_skipped,
+        }
+
+    def show_portfolio(self, request: Request, user: User) -> Dict:
+        base = (request.params.get("base") or settings.get("base_currency")).upper()
+        portfolio = self._cli.portfolio_manager.get_by_user_id(user.user_id)
+        wallets = {
+            code: wallet.balance
+            for code, wallet in (portfolio.wallets.items() if portfolio else ())
+        }
+        rates = self._cli.rate_manager.get_rate_vector(base)
+        _, total = next(BatchValuation(rates, base).run([(user.user_id, wallets)]))
+        return {
+            "user_id": user.user_id,
+            "username": user.username,
+            "base": base,
+            "wallets": wallets,
+            "total": total,
+        }
+
+    def buy(self, request: Request, user: User) -> Dict:
+        return self._trade(self._cli.portfolio_manager.buy_currency, request, user)
+
+    def sell(self, request: Request, user: User) -> Dict:
+        return self._trade(self._cli.portfolio_manager.sell_currency, request, user)
+
+    def _trade(self, operation: Callable, request: Request, user: User) -> Dict:
+        params = request.params
+        currency = _param(params, "currency").upper()
+        amount = str(_param(params, "amount"))
+        base = settings.get("base_currency")
+        result = operation(
+            user.user_id, self._cli.rate_manager, currency, amount, base
+        )
+        return {"currency": currency, "amount": amount, "base": base, **result}
+
+    def trade_history(self, request: Request, user: User) -> Dict:
+        if self._cli.ledger is None:
+            raise ValueError("Журнал сделок выключен (trades_file).")
+        limit = int(request.params.get("limit", 20))
+        return {"trades": self._cli.ledger.history(user.user_id, limit)}
+
+    def show_metrics(self, request: Request, user: None) -> str:
+        return metrics.render_prometheus()
+
+
+def _param(params: Dict[str, Any], name: str) -> Any:
+    value = params.get(name)
+    if value is None or value == "":
+        raise ValueError(f"Не указан параметр {name}.")
+    return value
+
+
+def _error_status(error: Exception) -> HTTPStatus:
+    for cls in type(error).__mro__:
+        if cls in ERROR_STATUS:
+            return ERROR_STATUS[cls]
+    return HTTPStatus.BAD_REQUEST
+
+
+def _response(status: HTTPStatus, body: Any, keep_alive: bool) -> bytes:
+    """Ответ HTTP/1.1: строка — text/plain, остальное — JSON."""
+    if isinstance(body, str):
+        content_type = "text/plain; version=0.0.4; charset=utf-8"
+        payload = body.encode("utf-8")
+    else:
+        content_type = "application/json; charset=utf-8"
+        text = json.dumps(body, ensure_ascii=False, default=_json_value)
+        payload = text.encode("utf-8")
+
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + payload
+
+
+def _json_value(value: Any) -> str:
+    """Money и Rate — строками без потерь, даты — в ISO 8601."""
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _ready(data: bytes) -> asyncio.Future:
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(data)
+    return future
+
+
+async def _close(writer: asyncio.StreamWriter) -> None:
+    try:
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
+
+
+def run_serve(cli: CLIInterface, args: list) -> int:
+    """Разбирает аргументы команды serve и запускает сервер. Код возврата."""
+    try:
+        host = args[args.index("--host") + 1] if "--host" in args else None
+        port = int(args[args.index("--port") + 1]) if "--port" in args else None
+    except (IndexError, ValueError):
+        print(SERVE_USAGE, file=sys.stderr)
+        return 2
+
+    def ready(host: str, port: int) -> None:
+        print(f"Сервер запущен: http://{host}:{port} (Ctrl+C — остановка)", flush=True)
+
+    try:
+        asyncio.run(TradeServer(cli, host, port).serve(ready))
+    except OSError as e:
+        print(f"Не удалось запустить сервер: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:  # pragma: no cover - без обработчиков сигналов
+        pass
+    return 0
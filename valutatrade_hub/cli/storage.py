@@ -1,22 +1,323 @@
 import json
-from typing import Any, Dict, List
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+from ..core.exceptions import StaleDataError
+from ..infra.metrics import MetricsRegistry
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - нет flock (Windows)
+    fcntl = None
+
+metrics = MetricsRegistry()
 
 
 class FileStorageManager:
-    """Менеджер файлов."""
+    """
+    Менеджер файлов.
+    Снимок данных перезаписывается атомарно (временный файл, fsync, rename).
+    Если задан key, отдельные записи фиксируются дозаписью в журнал
+    предзаписи (WAL) рядом со снимком, без перезаписи всего файла.
 
-    def __init__(self, file_path: str) -> None:
+    Несколько процессов координируются через flock на файле <path>.lock.
+    Первая строка WAL — заголовок с поколением снимка (generation) и
+    эпохой; по ним и по длине WAL процесс понимает, что данные на диске
+    изменились, и дочитывает чужие записи (sync).
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        key: str | None = None,
+        checkpoint_records: int = 1000,
+    ) -> None:
         self._file_path = file_path
+        self._wal_path = f"{file_path}.wal"
+        self._lock_path = f"{file_path}.lock"
+        self._name = os.path.basename(file_path)
+        self._key = key
+        self._checkpoint_records = checkpoint_records
+        # Незафиксированные записи по ключу: в пределах пакета по каждому
+        # ключу в WAL попадает только последняя версия
+        self._pending: Dict[Any, str] = {}
+        self._batch_depth = 0
+        self._lock = threading.RLock()
+        self._lock_fd: int | None = None
+        self._lock_depth = 0
+        # Данные уже сверены с диском, пока блокировка удерживается
+        self._fresh = False
+
+        # Что этот процесс уже видел на диске
+        self._epoch: str | None = None
+        self._base_generation = 0
+        self._wal_records = 0
+        self._wal_offset = 0
 
-    def load(self) -> None:
-        """Читает данные из файла."""
+    @property
+    def generation(self) -> int:
+        """Версия данных: поколение снимка плюс число записей WAL."""
+        return self._base_generation + self._wal_records
+
+    def load(self) -> Any:
+        """Читает снимок и применяет к нему записи из WAL."""
         if not self._file_path:
             return []
 
+        with self.locked(), metrics.timer("storage_load_seconds", file=self._name):
+            data = self._read_snapshot()
+            header, records, offset = self._read_wal()
+            self._remember(header, len(records), offset)
+            if records:
+                data = self._replay(data, records)
+                # Восстановленное состояние сразу сворачивается в новый снимок
+                self._write_snapshot(data)
+            return data
+
+    def save(self, data: List[Dict[str, Any]]) -> None:
+        """
+        Атомарно сохраняет полный снимок и очищает WAL.
+        Если данные на диске изменились с последнего чтения — StaleDataError.
+        """
+        with self.locked(), metrics.timer("storage_save_seconds", file=self._name):
+            if self._key is not None and self._is_stale():
+                raise StaleDataError(self._file_path)
+            self._pending.clear()
+            self._write_snapshot(data)
+
+    def put(self, item: Dict[str, Any]) -> None:
+        """Фиксирует одну запись (вставка или замена по ключу) через WAL."""
+        if self._key is None:
+            raise ValueError("Для записи через WAL не задан ключ.")
+
+        self._append(item[self._key], {"op": "put", "value": item})
+
+    def remove(self, key_value: Any) -> None:
+        """Фиксирует удаление записи по ключу через WAL."""
+        if self._key is None:
+            raise ValueError("Для записи через WAL не задан ключ.")
+
+        self._append(key_value, {"op": "delete", "key": key_value})
+
+    def sync(self) -> List[Dict[str, Any]]:
+        """
+        Возвращает записи, зафиксированные другими процессами с момента
+        последнего чтения. Если файл был пересобран, первой идет запись
+        {"op": "reset"}, за ней — все записи снимка.
+        """
+        with self.locked():
+            if self._fresh:
+                return []
+
+            # Смещение имеет смысл только в том же WAL: эпоха проверяется
+            # до чтения записей, иначе чтение начнется с середины строки
+            header, _, _ = self._read_wal(header_only=True)
+            if header.get("epoch") == self._epoch:
+                header, records, offset = self._read_wal(self._wal_offset)
+                self._remember(header, self._wal_records + len(records), offset)
+                return records
+
+            data = self._read_snapshot()
+            header, records, offset = self._read_wal()
+            self._remember(header, len(records), offset)
+            data = self._replay(data, records)
+            return [{"op": "reset"}] + [{"op": "put", "value": item} for item in data]
+
+    @contextmanager
+    def locked(self) -> Iterator["FileStorageManager"]:
+        """Межпроцессная блокировка (flock) на время чтения-изменения-записи."""
+        with self._lock:
+            if self._lock_depth == 0:
+                self._lock_fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield self
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    self._fresh = False
+                    if fcntl is not None:
+                        fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
+
+    @contextmanager
+    def batch(self) -> Iterator["FileStorageManager"]:
+        """
+        Групповая фиксация: все записи внутри блока разделяют один fsync.
+        Блокировка файла удерживается до конца блока.
+        """
+        with self.locked():
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.commit()
+
+    def commit(self) -> None:
+        """Дописывает накопленные записи в WAL и выполняет fsync."""
+        with self.locked():
+            if not self._pending:
+                return
+
+            if self._is_stale():
+                self._pending.clear()
+                metrics.inc("storage_stale_total", file=self._name)
+                raise StaleDataError(self._file_path)
+
+            started = time.perf_counter()
+
+            if self._epoch is None or not os.path.exists(self._wal_path):
+                self._write_wal_header(self._base_generation)
+
+            with open(self._wal_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(self._pending.values()) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+                self._wal_offset = f.tell()
+
+            self._wal_records += len(self._pending)
+            metrics.observe(
+                "storage_commit_seconds",
+                time.perf_counter() - started,
+                file=self._name,
+            )
+            metrics.inc(
+                "storage_wal_records_total", len(self._pending), file=self._name
+            )
+            self._pending.clear()
+
+            if self._wal_records >= self._checkpoint_records:
+                self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Сворачивает WAL в снимок."""
+        with self.locked():
+            header, records, offset = self._read_wal()
+            self._remember(header, len(records), offset)
+            self._write_snapshot(self._replay(self._read_snapshot(), records))
+
+    def _append(self, key_value: Any, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.pop(key_value, None)
+            self._pending[key_value] = json.dumps(record, ensure_ascii=False)
+            if not self._batch_depth:
+                self.commit()
+
+    def _is_stale(self) -> bool:
+        """Изменились ли данные на диске с момента нашего последнего чтения."""
+        header, _, _ = self._read_wal(self._wal_offset, header_only=True)
+        if header.get("epoch") != self._epoch:
+            return True
+        size = os.path.getsize(self._wal_path) if os.path.exists(self._wal_path) else 0
+        return size != self._wal_offset
+
+    def _remember(self, header: Dict[str, Any], records: int, offset: int) -> None:
+        self._epoch = header.get("epoch")
+        self._base_generation = header.get("generation", 0)
+        self._wal_records = records
+        self._wal_offset = offset
+        self._fresh = self._lock_depth > 0
+
+    def _read_snapshot(self) -> Any:
         with open(self._file_path, "r", encoding="utf-8") as f:
             return json.load(f)
 
-    def save(self, data: List[Dict[str, Any]]) -> None:
-        """Сохраняет данные в файл."""
-        with open(self._file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+    def _write_snapshot(self, data: Any) -> None:
+        """Пишет новый снимок и начинает новый WAL со следующим поколением."""
+        generation = self.generation + 1
+        self._atomic_write(
+            self._file_path,
+            json.dumps(data, indent=4, ensure_ascii=False),
+        )
+        if self._key is not None:
+            self._write_wal_header(generation)
+
+    def _write_wal_header(self, generation: int) -> None:
+        header = {
+            "op": "header",
+            "generation": generation,
+            "epoch": f"{time.time_ns()}-{os.getpid()}",
+        }
+        content = json.dumps(header) + "\n"
+        self._atomic_write(self._wal_path, content)
+        self._remember(header, 0, len(content.encode("utf-8")))
+
+    def _read_wal(
+        self, offset: int = 0, header_only: bool = False
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], int]:
+        """
+        Читает заголовок WAL и записи начиная со смещения offset.
+        Недописанная последняя строка отбрасывается.
+        """
+        if not os.path.exists(self._wal_path):
+            return {}, [], 0
+
+        records = []
+        with open(self._wal_path, "rb") as f:
+            first = f.readline()
+            header = json.loads(first) if first.endswith(b"\n") else {}
+            if header.get("op") != "header":
+                # WAL без заголовка (старый формат) читается целиком
+                header, offset = {}, 0
+                f.seek(0)
+            if header_only:
+                return header, [], offset
+
+            f.seek(max(offset, f.tell()))
+            position = f.tell()
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                position += len(line)
+                records.append(json.loads(line))
+        return header, records, position
+
+    def _replay(
+        self, data: List[Dict[str, Any]], records: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Применяет записи WAL к снимку."""
+        items = {item[self._key]: item for item in data}
+
+        for record in records:
+            if record["op"] == "delete":
+                items.pop(record["key"], None)
+            else:
+                item = record["value"]
+                items[item[self._key]] = item
+
+        return list(items.values())
+
+    @staticmethod
+    def _atomic_write(file_path: str, content: str) -> None:
+        """Пишет во временный файл рядом с целевым и атомарно подменяет его."""
+        directory = os.path.dirname(os.path.abspath(file_path))
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # fsync каталога фиксирует сам rename (на POSIX)
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
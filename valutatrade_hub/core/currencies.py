@@ -7,8 +7,14 @@ class Currency(ABC):
     """
     Абстрактная валюта. Определяет единый интерфейс
     для всех типов валют (фиатных и крипто).
+    scale — число знаков после точки в балансах этой валюты.
+    Экземпляры создаются один раз в реестре и общие для всех кошельков.
     """
 
+    __slots__ = ("name", "code")
+
+    scale: int = 2
+
     def __init__(self, name: str, code: str):
         if not isinstance(name, str) or not name.strip():
             raise ValueError("Имя валюты не может быть пустым.")
@@ -36,6 +42,8 @@ class Currency(ABC):
 class FiatCurrency(Currency):
     """Фиатные валюты."""
 
+    __slots__ = ("issuing_country",)
+
     def __init__(self, name: str, code: str, issuing_country: str):
         super().__init__(name, code)
 
@@ -54,6 +62,10 @@ class FiatCurrency(Currency):
 class CryptoCurrency(Currency):
     """Криптовалюты."""
 
+    __slots__ = ("algorithm", "market_cap")
+
+    scale = 8
+
     def __init__(
         self,
         name: str,
@@ -1,21 +1,50 @@
 import logging
+import time
 from functools import wraps
-from inspect import signature
+from inspect import Parameter, signature
 
 logger = logging.getLogger(__name__)
 
+# Параметры операций, попадающие в лог
+LOGGED_PARAMS = ("user", "user_id", "currency", "amount", "base_currency")
+
+
+def _extraction_plan(func) -> tuple:
+    """
+    План извлечения логируемых аргументов, строится один раз:
+    (имя, позиция, значение по умолчанию) для каждого параметра.
+    """
+    plan = []
+    for position, param in enumerate(signature(func).parameters.values()):
+        if param.name not in LOGGED_PARAMS:
+            continue
+        if param.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
+            continue
+
+        default = None if param.default is Parameter.empty else param.default
+        if param.kind is Parameter.KEYWORD_ONLY:
+            position = None
+        plan.append((param.name, position, default))
+    return tuple(plan)
+
+
 def log_action(action: str, verbose: bool = False):
     """Декоратор для логирования бизнес-операций."""
 
     def decorator(func):
-        sig = signature(func)
+        plan = _extraction_plan(func)
 
         @wraps(func)
         def wrapper(*args, **kwargs):
-            bound = sig.bind_partial(*args, **kwargs)
-            bound.apply_defaults()
+            if not logger.isEnabledFor(logging.ERROR):
+                return func(*args, **kwargs)
 
-            params = bound.arguments
+            params = {}
+            for name, position, default in plan:
+                if position is not None and position < len(args):
+                    params[name] = args[position]
+                else:
+                    params[name] = kwargs.get(name, default)
 
             context = {
                 "action": action,
@@ -26,9 +55,13 @@ def log_action(action: str, verbose: bool = False):
                 "base": params.get("base_currency"),
             }
 
+            started = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
 
+                context["duration_ms"] = round(
+                    (time.perf_counter() - started) * 1000, 3
+                )
                 logger.info(
                     "%s user=%s currency=%s amount=%s base=%s result=OK",
                     action,
@@ -36,10 +69,14 @@ def log_action(action: str, verbose: bool = False):
                     context["currency"],
                     context["amount"],
                     context["base"],
+                    extra={**context, "result": "OK"},
                 )
                 return result
 
             except Exception as exc:
+                context["duration_ms"] = round(
+                    (time.perf_counter() - started) * 1000, 3
+                )
                 logger.error(
                     "%s user=%s currency=%s amount=%s result=ERROR "
                     "error_type=%s error_message=%s",
@@ -49,6 +86,12 @@ def log_action(action: str, verbose: bool = False):
                     context["amount"],
                     type(exc).__name__,
                     str(exc),
+                    extra={
+                        **context,
+                        "result": "ERROR",
+                        "error_type": type(exc).__name__,
+                        "error_message": str(exc),
+                    },
                 )
                 raise
 
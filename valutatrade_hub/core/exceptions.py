@@ -36,3 +36,12 @@ class InvalidCommandFormatError(Exception):
             f"Неверная команда: {cmd}\n"
             "Введите 'help' для просмотра списка команд и примеров."
         )
+
+
+class StaleDataError(Exception):
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        super().__init__(
+            f"Данные в {file_path} изменены другим процессом. "
+            "Повторите операцию."
+        )
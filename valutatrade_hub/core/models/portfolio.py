@@ -1,13 +1,16 @@
-from decimal import Decimal
-from typing import Dict
+from types import MappingProxyType
+from typing import Dict, Mapping
 
 from ...cli.manager.rate import RateManager
+from ..money import Money, currency_scale
 from .wallet import Wallet
 
 
 class Portfolio:
     """Портфель пользователя - агрегатор всех валютных кошельков."""
-    
+
+    __slots__ = ("_user_id", "_wallets")
+
     def __init__(self, user_id: int, wallets: Dict[str, Wallet] | None = None) -> None:
         self._user_id = user_id
         self._wallets: Dict[str, Wallet] = wallets or {}
@@ -17,8 +20,9 @@ class Portfolio:
         return self._user_id
 
     @property
-    def wallets(self) -> Dict[str, Wallet]:
-        return self._wallets.copy()
+    def wallets(self) -> Mapping[str, Wallet]:
+        """Кошельки только для чтения (без копирования словаря)."""
+        return MappingProxyType(self._wallets)
     
     def add_currency(self, currency_code: str) -> None:
         """Добавление пользователю кошелька."""
@@ -27,7 +31,9 @@ class Portfolio:
                 f"У пользователя уже есть кошелек с валютой '{currency_code}'."
             )
 
-        self._wallets[currency_code] = Wallet(currency_code)
+        wallet = Wallet(currency_code)
+        # Ключ — код из реестра валют: одна строка на все портфели
+        self._wallets[wallet._currency_code.code] = wallet
 
     def get_wallet(self, currency_code: str):
         """Возвращает кошелек."""
@@ -40,13 +46,14 @@ class Portfolio:
         base_currency: str
     ) -> str:
         """Возвращает строку с полной информацией по портфелю."""
-        if not self.wallets:
+        if not self._wallets:
             return "Портфель пуст."
 
         lines = [f"Портфель пользователя {username} (валюта: {base_currency}):"]
-        total = Decimal("0")
+        scale = currency_scale(base_currency)
+        total = Money(0, scale)
 
-        for wallet in self.wallets.values():
+        for wallet in self._wallets.values():
             amount = wallet.balance
             currency = wallet._currency_code
 
@@ -55,7 +62,7 @@ class Portfolio:
                 rate_info = "без конвертации"
             else:
                 rate = rate_manager.get_rate(currency.code, base_currency)
-                converted = amount * Decimal(str(rate["rate"]))
+                converted = amount.convert(rate["rate"], scale)
                 rate_info = f"курс {currency.code}->{base_currency}: {rate["rate"]:.4f}"
 
             total += converted
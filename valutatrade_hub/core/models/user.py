@@ -7,6 +7,10 @@ from ..utils import generate_salt, hash_password
 class User:
     """Пользователь."""
 
+    __slots__ = (
+        "_user_id", "_username", "_hashed_password", "_salt", "_registration_date"
+    )
+
     def __init__(
         self,
         user_id: int,
@@ -1,42 +1,50 @@
-from decimal import Decimal
-from typing import Dict
+from typing import Any, Dict
 
 from ..currencies import Currency, get_currency
 from ..exceptions import InsufficientFundsError
+from ..money import Money, to_units
 
 
 class Wallet:
-    """Кошелек пользователя для одной валюты."""
+    """
+    Кошелек пользователя для одной валюты.
+    Баланс хранится целым числом минимальных единиц валюты
+    (2 знака у фиата, 8 у крипто) и отдается наружу как Money.
+    Объект валюты общий для всех кошельков (берется из реестра).
+    """
+
+    __slots__ = ("_currency_code", "_units")
 
     def __init__(
         self,
         currency_code: str = "USD",
-        balance: Decimal = Decimal("0")
+        balance: Any = 0
     ) -> None:
         self._currency_code: Currency = get_currency(currency_code)
-        self._balance = balance
+        self._units = to_units(balance, self._currency_code.scale)
 
     @property
-    def balance(self) -> Decimal:
-        return Decimal(self._balance)
+    def balance(self) -> Money:
+        return Money(self._units, self._currency_code.scale)
 
     @balance.setter
-    def balance(self, balance: Decimal) -> None:
-        self._balance = balance
+    def balance(self, balance: Any) -> None:
+        self._units = to_units(balance, self._currency_code.scale)
 
-    def deposit(self, amount: Decimal) -> None:
+    def deposit(self, amount: Any) -> None:
         """Пополнение кошелька."""
-        self._balance += amount
+        self._units += to_units(amount, self._currency_code.scale)
 
-    def withdraw(self, amount: Decimal) -> None:
+    def withdraw(self, amount: Any) -> None:
         """Снятие средств с кошелька."""
-        if amount > self._balance:
-            raise InsufficientFundsError(self._balance, self._currency_code.code)
-        self._balance -= amount
+        units = to_units(amount, self._currency_code.scale)
+        if units > self._units:
+            raise InsufficientFundsError(self.balance, self._currency_code.code)
+        self._units -= units
 
     def get_balance_info(self) -> Dict:
         """Возвращает информацию о кошельке."""
         return {
             "currency_code": self._currency_code.code,
-            "balance": self._balance
+            "balance": self.balance
         }
@@ -0,0 +1,260 @@
+from decimal import ROUND_HALF_UP, Context, Decimal
+from typing import Any
+
+from .currencies import get_currency
+from .exceptions import CurrencyNotFoundError
+
+# Масштаб курсов и масштаб балансов валют, которых нет в реестре
+RATE_SCALE = 18
+BALANCE_SCALE = 8
+
+# Контекст без потери точности при сдвиге запятой в to_units
+_CONTEXT = Context(prec=100, rounding=ROUND_HALF_UP)
+
+# Разобранные спецификации формата вида ".Nf": спецификация -> N
+_FIXED_SPECS: dict[str, int] = {}
+
+_MAX_POW = 2 * RATE_SCALE + 1
+_POW10 = tuple(10**i for i in range(_MAX_POW))
+
+
+def _pow10(exponent: int) -> int:
+    return _POW10[exponent] if exponent < _MAX_POW else 10**exponent
+
+
+def _round_div(numerator: int, denominator: int) -> int:
+    """Целочисленное деление с округлением половины от нуля."""
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if remainder * 2 >= denominator:
+        quotient += 1
+    return -quotient if numerator < 0 else quotient
+
+
+def _render(units: int, scale: int) -> str:
+    """Строка с ровно scale знаками после точки."""
+    if not scale:
+        return str(units)
+    if units < 0:
+        return "-" + _render(-units, scale)
+    text = str(units).rjust(scale + 1, "0")
+    return text[:-scale] + "." + text[-scale:]
+
+
+def to_units(value: Any, scale: int) -> int:
+    """
+    Переводит значение в целое число единиц 10**-scale.
+    Простые строки разбираются без Decimal, float — через repr
+    (как Decimal(str(x))).
+    Лишние знаки округляются половиной от нуля.
+    """
+    if type(value) is str:
+        # Быстрый путь для "123.45": int("12345") со сдвигом на недостающие знаки
+        point = value.find(".")
+        if point < 0:
+            digits, frac_len = value, 0
+        else:
+            digits, frac_len = value[:point] + value[point + 1:], len(value) - point - 1
+        if frac_len <= scale < _MAX_POW and digits.isdecimal():
+            return int(digits) * _POW10[scale - frac_len]
+    elif isinstance(value, Fixed):
+        if scale >= value.scale:
+            return value.units * _pow10(scale - value.scale)
+        return _round_div(value.units, _pow10(value.scale - scale))
+    elif isinstance(value, int):
+        return value * _pow10(scale)
+    elif isinstance(value, float):
+        return to_units(repr(value), scale)
+
+    value = Decimal(value)
+    if not value.is_finite():
+        raise ValueError(f"Некорректное значение: {value}")
+    return int(value.scaleb(scale, _CONTEXT).to_integral_value(context=_CONTEXT))
+
+
+class Fixed:
+    """
+    Число с фиксированной точкой: целое units в единицах 10**-scale.
+    Сложение и сравнение идут в целых числах без округления,
+    округление (половина от нуля) — только при смене масштаба.
+    """
+
+    __slots__ = ("units", "scale")
+
+    def __init__(self, units: int = 0, scale: int = 2) -> None:
+        self.units = units
+        self.scale = scale
+
+    @classmethod
+    def of(cls, value: Any, scale: int):
+        """Создает число из str, int, float, Decimal или другого Fixed."""
+        return cls(to_units(value, scale), scale)
+
+    def rescale(self, scale: int):
+        """Возвращает то же значение в масштабе scale (с округлением)."""
+        if scale == self.scale:
+            return self
+        if scale > self.scale:
+            return type(self)(self.units * _pow10(scale - self.scale), scale)
+        return type(self)(_round_div(self.units, _pow10(self.scale - scale)), scale)
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.units).scaleb(-self.scale)
+
+    def _align(self, other: Any) -> tuple | None:
+        """Общий масштаб для операции: (units self, units other, scale)."""
+        if isinstance(other, Fixed):
+            if other.scale == self.scale:
+                return self.units, other.units, self.scale
+            scale = max(self.scale, other.scale)
+            return (
+                self.rescale(scale).units, other.rescale(scale).units, scale
+            )
+        if isinstance(other, int):
+            return self.units, other * _pow10(self.scale), self.scale
+        return None
+
+    def __add__(self, other: Any):
+        aligned = self._align(other)
+        if aligned is None:
+            return NotImplemented
+        left, right, scale = aligned
+        return type(self)(left + right, scale)
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Any):
+        aligned = self._align(other)
+        if aligned is None:
+            return NotImplemented
+        left, right, scale = aligned
+        return type(self)(left - right, scale)
+
+    def __rsub__(self, other: Any):
+        aligned = self._align(other)
+        if aligned is None:
+            return NotImplemented
+        left, right, scale = aligned
+        return type(self)(right - left, scale)
+
+    def __neg__(self):
+        return type(self)(-self.units, self.scale)
+
+    def __abs__(self):
+        return type(self)(abs(self.units), self.scale)
+
+    def __bool__(self) -> bool:
+        return self.units != 0
+
+    def __eq__(self, other: Any) -> bool:
+        aligned = self._align(other)
+        if aligned is None:
+            return NotImplemented
+        return aligned[0] == aligned[1]
+
+    def __lt__(self, other: Any) -> bool:
+        aligned = self._align(other)
+        if aligned is None:
+            return NotImplemented
+        return aligned[0] < aligned[1]
+
+    def __le__(self, other: Any) -> bool:
+        aligned = self._align(other)
+        if aligned is None:
+            return NotImplemented
+        return aligned[0] <= aligned[1]
+
+    def __gt__(self, other: Any) -> bool:
+        aligned = self._align(other)
+        if aligned is None:
+            return NotImplemented
+        return aligned[0] > aligned[1]
+
+    def __ge__(self, other: Any) -> bool:
+        aligned = self._align(other)
+        if aligned is None:
+            return NotImplemented
+        return aligned[0] >= aligned[1]
+
+    def __hash__(self) -> int:
+        # Равные значения в разных масштабах дают одинаковый хэш
+        return hash(self.to_decimal())
+
+    def __float__(self) -> float:
+        return self.units / _pow10(self.scale)
+
+    def __str__(self) -> str:
+        return _render(self.units, self.scale)
+
+    def __format__(self, spec: str) -> str:
+        if not spec:
+            return str(self)
+        places = _FIXED_SPECS.get(spec)
+        if places is None and spec[0] == "." and spec[-1] == "f" \
+                and spec[1:-1].isdigit():
+            places = _FIXED_SPECS[spec] = int(spec[1:-1])
+        if places is not None:
+            # Частый случай ".Nf" — округление в целых, без Decimal
+            units = self.units
+            if places < self.scale:
+                units = _round_div(units, _pow10(self.scale - places))
+            elif places > self.scale:
+                units *= _pow10(places - self.scale)
+            return _render(units, places)
+        return format(self.to_decimal(), spec)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}('{self}')"
+
+
+class Money(Fixed):
+    """Сумма в валюте с масштабом по числу минимальных единиц валюты."""
+
+    __slots__ = ()
+
+    def convert(self, rate: "Rate", scale: int) -> "Money":
+        """Переводит сумму по курсу в масштаб scale (с округлением)."""
+        units = self.units * rate.units
+        shift = self.scale + rate.scale - scale
+        if shift < 0:
+            # Масштаб больше, чем у произведения: округлять нечего
+            return Money(units * _pow10(-shift), scale)
+        return Money(_round_div(units, _pow10(shift)), scale)
+
+
+class Rate(Fixed):
+    """Курс валюты с масштабом RATE_SCALE; выводится без хвостовых нулей."""
+
+    __slots__ = ()
+
+    def __init__(self, units: int = 0, scale: int = RATE_SCALE) -> None:
+        super().__init__(units, scale)
+
+    @classmethod
+    def of(cls, value: Any, scale: int = RATE_SCALE) -> "Rate":
+        return cls(to_units(value, scale), scale)
+
+    def inverse(self) -> "Rate":
+        """Обратный курс 1 / rate."""
+        if not self.units:
+            raise ZeroDivisionError("Обратный курс для нулевого курса не определен.")
+        return Rate(_round_div(_pow10(2 * self.scale), self.units), self.scale)
+
+    def cross(self, other: "Rate") -> "Rate":
+        """Кросс-курс через посредника: self * other."""
+        return Rate(
+            _round_div(self.units * other.units, _pow10(other.scale)), self.scale
+        )
+
+    def __str__(self) -> str:
+        text = _render(self.units, self.scale)
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+        return text
+
+
+def currency_scale(currency_code: str) -> int:
+    """Число знаков после точки для балансов валюты."""
+    try:
+        return get_currency(currency_code).scale
+    except CurrencyNotFoundError:
+        return BALANCE_SCALE
@@ -0,0 +1,161 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from .money import RATE_SCALE, Rate
+
+# Единичный курс в единицах RATE_SCALE
+_ONE = 10**RATE_SCALE
+
+
+class RateMatrix:
+    """
+    Плотная матрица кросс-курсов N×N.
+    Строится один раз из прямых котировок вида {"BTC_USD": {...}}:
+    обратные курсы получаются делением, остальные — через валюту-посредник
+    (pivot) с наибольшим числом котировок, а пары, до которых через него
+    не дойти, — через любую другую валюту с котировками к обеим.
+    Путь конвертации сохраняется в ячейке. Чтение курса — O(1).
+
+    Ячейки хранятся в плоских списках по строкам; курс — целое число
+    единиц RATE_SCALE. array("q") здесь не подходит: курс 60 000 в единицах
+    10**-18 не помещается в int64, а float потерял бы точность Rate.
+    Кросс-курсы через посредника считаются одним проходом по строке
+    посредника для каждой строки матрицы.
+    """
+
+    def __init__(self, quotes: Dict[str, Dict[str, Any]]) -> None:
+        edges = self._collect_edges(quotes)
+
+        degree: Dict[str, int] = {}
+        for from_code, to_code in edges:
+            degree[from_code] = degree.get(from_code, 0) + 1
+
+        self.codes: List[str] = sorted(degree)
+        self._index: Dict[str, int] = {code: i for i, code in enumerate(self.codes)}
+        # Посредники от самого ликвидного; при равенстве первым идет USD
+        self._pivots: List[str] = sorted(
+            self.codes, key=lambda code: (degree[code], code == "USD"), reverse=True
+        )
+        self.pivot: Optional[str] = self._pivots[0] if self._pivots else None
+
+        size = len(self.codes)
+        self._size = size
+        self._units: List[Optional[int]] = [None] * (size * size)
+        self._updated_at: List[Optional[str]] = [None] * (size * size)
+        self._paths: List[Optional[Tuple[str, ...]]] = [None] * (size * size)
+        self._fill(edges)
+
+    def lookup(self, from_code: str, to_code: str) -> Optional[Dict[str, Any]]:
+        """Возвращает курс, дату котировки и путь конвертации."""
+        i = self._index.get(from_code)
+        j = self._index.get(to_code)
+        if i is None or j is None:
+            return None
+
+        cell = i * self._size + j
+        units = self._units[cell]
+        if units is None:
+            return None
+
+        return {
+            "rate": Rate(units),
+            "updated_at": self._updated_at[cell],
+            "path": self._paths[cell],
+        }
+
+    def column(self, to_code: str) -> Dict[str, Rate]:
+        """Возвращает курсы всех валют к to_code (один столбец матрицы)."""
+        j = self._index.get(to_code)
+        if j is None:
+            return {}
+
+        column = self._units[j::self._size]
+        return {
+            code: Rate(units)
+            for code, units in zip(self.codes, column)
+            if units is not None
+        }
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._index
+
+    @staticmethod
+    def _collect_edges(
+        quotes: Dict[str, Dict[str, Any]],
+    ) -> Dict[Tuple[str, str], Tuple[Rate, str]]:
+        """Прямые котировки и обратные к ним; прямая котировка приоритетнее."""
+        direct: Dict[Tuple[str, str], Tuple[Rate, str]] = {}
+        for pair, info in quotes.items():
+            from_code, _, to_code = pair.partition("_")
+            if not to_code or from_code == to_code:
+                continue
+
+            rate = info["rate"]
+            if not isinstance(rate, Rate):
+                rate = Rate.of(rate)
+            if rate.units <= 0:
+                continue
+            direct[(from_code, to_code)] = (rate, info["updated_at"])
+
+        edges = dict(direct)
+        for (from_code, to_code), (rate, updated_at) in direct.items():
+            edges.setdefault((to_code, from_code), (rate.inverse(), updated_at))
+        return edges
+
+    def _fill(self, edges: Dict[Tuple[str, str], Tuple[Rate, str]]) -> None:
+        size = self._size
+        index = self._index
+        units, updated, paths = self._units, self._updated_at, self._paths
+
+        # Прямые и обратные котировки
+        for (from_code, to_code), (rate, updated_at) in edges.items():
+            cell = index[from_code] * size + index[to_code]
+            units[cell], updated[cell] = rate.units, updated_at
+            paths[cell] = (from_code, to_code)
+
+        # Курс валюты к самой себе датируется самой свежей котировкой этой
+        # валюты (у каждой валюты матрицы есть хотя бы одна)
+        for i, code in enumerate(self.codes):
+            cell = i * size + i
+            own = [updated[i * size + j] for j in range(size) if j != i]
+            units[cell] = _ONE
+            updated[cell] = max((at for at in own if at is not None), default=None)
+            paths[cell] = (code,)
+
+        # Через основного посредника: строка i — курс i->pivot на строку pivot
+        pivot = self.pivot
+        if pivot is None:
+            return
+        p = index[pivot]
+        from_pivot = [
+            None if u is None else Rate(u) for u in units[p * size:(p + 1) * size]
+        ]
+        from_pivot_at = updated[p * size:(p + 1) * size]
+        missing = []
+        for i, from_code in enumerate(self.codes):
+            row = i * size
+            leg_in, leg_in_at = units[row + p], updated[row + p]
+            leg_in = None if leg_in is None else Rate(leg_in)
+            for j, to_code in enumerate(self.codes):
+                if units[row + j] is not None:
+                    continue
+                leg_out = from_pivot[j]
+                if leg_in is None or leg_out is None:
+                    missing.append((i, j))
+                    continue
+                units[row + j] = leg_in.cross(leg_out).units
+                updated[row + j] = min(leg_in_at, from_pivot_at[j])
+                paths[row + j] = (from_code, pivot, to_code)
+
+        # Остальные пары — через первого посредника с прямыми котировками к обеим
+        for i, j in missing:
+            from_code, to_code = self.codes[i], self.codes[j]
+            for via in self._pivots[1:]:
+                leg_in = edges.get((from_code, via))
+                leg_out = edges.get((via, to_code))
+                if leg_in is None or leg_out is None:
+                    continue
+                cell = i * size + j
+                units[cell] = leg_in[0].cross(leg_out[0]).units
+                updated[cell] = min(leg_in[1], leg_out[1])
+                paths[cell] = (from_code, via, to_code)
+                break
@@ -1,7 +1,9 @@
 import hashlib
 import secrets
 import string
-from decimal import ROUND_HALF_UP, Decimal
+from typing import Any
+
+from .money import Money
 
 
 def generate_salt(length: int = 16) -> str:
@@ -13,6 +15,10 @@ def hash_password(password: str, salt: str) -> str:
     return hashlib.sha256(value.encode("utf-8")).hexdigest()
 
 
-def format_balance(amount: Decimal) -> str:
-    """Округляет Decimal до 2 знаков после точки и возвращает строку."""
-    return str(amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+def format_balance(amount: Any) -> str:
+    """
+    Округляет сумму до 2 знаков после точки (половина от нуля) и
+    возвращает строку. Оставлена для совместимости: балансы теперь
+    хранятся как Money и пишутся в масштабе своей валюты (str(Money)).
+    """
+    return str(Money.of(amount, 2))
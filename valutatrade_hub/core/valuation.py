@@ -0,0 +1,109 @@
+from operator import mul
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from .money import BALANCE_SCALE, RATE_SCALE, Money, Rate, currency_scale, to_units
+
+
+class BatchValuation:
+    """
+    Пакетная оценка портфелей по одному снимку курсов.
+    Балансы раскладываются по столбцам валют (индексы пользователей и
+    балансы в целых единицах), каждый столбец умножается на курс целиком.
+    Итог округляется один раз, до точности базовой валюты (как в
+    format_portfolio): копейки для USD, 8 знаков для BTC.
+
+    Произведения считаются в целых Python: баланс (до 8 знаков) на курс
+    (18 знаков) не помещается в int64, поэтому array("q") и numpy
+    используются только для хранения столбцов, а не для умножения.
+    """
+
+    def __init__(
+        self,
+        rates: Dict[str, Rate],
+        base_currency: str,
+        chunk_size: int = 100_000,
+    ):
+        self._rates = {code: to_units(rate, RATE_SCALE) for code, rate in rates.items()}
+        self._chunk_size = chunk_size
+        self.scale = currency_scale(base_currency)
+        self._shift = 10 ** (BALANCE_SCALE + RATE_SCALE - self.scale)
+
+    def run(
+        self, holdings: Iterable[Tuple[int, Dict[str, Any]]]
+    ) -> Iterator[Tuple[int, Money]]:
+        """Возвращает пары (user_id, итог в базовой валюте) по мере расчета."""
+        chunk: List[Tuple[int, Dict[str, Any]]] = []
+        for item in holdings:
+            chunk.append(item)
+            if len(chunk) >= self._chunk_size:
+                yield from self._value_chunk(chunk)
+                chunk = []
+
+        if chunk:
+            yield from self._value_chunk(chunk)
+
+    def _value_chunk(
+        self, chunk: List[Tuple[int, Dict[str, Any]]]
+    ) -> Iterator[Tuple[int, Money]]:
+        # Разреженная матрица пользователи × валюты по столбцам
+        columns: Dict[str, Tuple[List[int], List[int]]] = {}
+        for row, (_, wallets) in enumerate(chunk):
+            for code, balance in wallets.items():
+                rows, balances = columns.setdefault(code, ([], []))
+                rows.append(row)
+                balances.append(to_units(balance, BALANCE_SCALE))
+
+        totals = [0] * len(chunk)
+        for code, (rows, balances) in columns.items():
+            rate = self._rates.get(code)
+            if rate is None:
+                raise ValueError(f"Курс для {code} не найден.")
+            for row, balance in zip(rows, balances):
+                totals[row] += balance * rate
+
+        for (user_id, _), total in zip(chunk, totals):
+            yield user_id, self._round_total(total)
+
+    def run_columns(
+        self,
+        user_ids: Sequence[int],
+        offsets: Sequence[int],
+        wallet_codes: Sequence[int],
+        units: Sequence[int],
+        codes: List[str],
+        scales: List[int],
+    ) -> Iterator[Tuple[int, Money]]:
+        """
+        Оценка портфелей, уже лежащих по столбцам (CSR): кошельки строки
+        row — позиции offsets[row]..offsets[row + 1], валюта — номер в codes,
+        балансы в целых единицах масштаба scales[номер].
+        """
+        # Множитель на кошелек: курс с поправкой масштаба баланса до BALANCE_SCALE
+        factors = []
+        for code, scale in zip(codes, scales):
+            rate = self._rates.get(code)
+            factors.append(
+                None if rate is None else rate * 10 ** (BALANCE_SCALE - scale)
+            )
+
+        factor_of = factors.__getitem__
+        for row, user_id in enumerate(user_ids):
+            start, end = offsets[row], offsets[row + 1]
+            try:
+                row_factors = map(factor_of, wallet_codes[start:end])
+                total = sum(map(mul, units[start:end], row_factors))
+            except TypeError:
+                missing = next(
+                    codes[code] for code in wallet_codes[start:end]
+                    if factors[code] is None
+                )
+                raise ValueError(f"Курс для {missing} не найден.")
+            yield user_id, self._round_total(total)
+
+
+    def _round_total(self, total: int) -> Money:
+        """Итог в единицах BALANCE_SCALE + RATE_SCALE -> Money в масштабе scale."""
+        # Округление половины вверх (от нуля) в целых числах
+        sign = -1 if total < 0 else 1
+        units = (abs(total) * 2 + self._shift) // (2 * self._shift)
+        return Money(sign * units, self.scale)
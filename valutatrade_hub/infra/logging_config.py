@@ -1,26 +1,139 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
-LOG_DIR = Path("logs")
-LOG_DIR.mkdir(exist_ok=True)
+from .settings import SettingsLoader
 
+LOG_DIR = Path("logs")
 LOG_FILE = LOG_DIR / "actions.log"
 
-def setup_logging(level=logging.INFO):
-    formatter = logging.Formatter(
-        "%(levelname)s %(asctime)s %(message)s",
-        datefmt="%Y-%m-%dT%H:%M:%S",
-    )
+# Поля бизнес-операций, которые log_action передает через extra
+ACTION_FIELDS = (
+    "action",
+    "user",
+    "currency",
+    "amount",
+    "base",
+    "result",
+    "duration_ms",
+    "error_type",
+    "error_message",
+)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Форматирует запись лога как одну JSON-строку."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ACTION_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class LazyDirRotatingFileHandler(RotatingFileHandler):
+    """Создает каталог лога при открытии файла (первой записи), а не на старте."""
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
 
-    handler = RotatingFileHandler(
+class BoundedQueueHandler(QueueHandler):
+    """
+    Кладет записи в ограниченную очередь, запись в файл делает QueueListener.
+    При переполнении: "drop" — запись отбрасывается (считается в dropped),
+    "block" — вызывающий поток ждет освобождения места.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "drop") -> None:
+        super().__init__(log_queue)
+        if overflow not in ("drop", "block"):
+            raise ValueError(f"Неизвестная политика переполнения '{overflow}'")
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Очередь внутри процесса: форматирование целиком уходит в поток
+        # QueueListener, здесь запись не копируется
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level=logging.INFO) -> QueueListener:
+    """
+    Настраивает логирование через очередь: вызывающий код только кладет
+    запись в очередь, в файл ее пишет фоновый поток.
+    Формат (text | json), размер очереди и политика переполнения
+    берутся из настроек.
+    """
+    settings = SettingsLoader()
+
+    if settings.get("log_format") == "json":
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(levelname)s %(asctime)s %(message)s",
+            datefmt="%Y-%m-%dT%H:%M:%S",
+        )
+
+    file_handler = LazyDirRotatingFileHandler(
         LOG_FILE,
         maxBytes=1_000_000,
         backupCount=5,
         encoding="utf-8",
+        delay=True,  # файл открывается при первой записи
     )
-    handler.setFormatter(formatter)
+    file_handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.get("log_queue_size"))
+    queue_handler = BoundedQueueHandler(log_queue, settings.get("log_overflow"))
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(_shutdown, listener, queue_handler, file_handler)
 
     root = logging.getLogger()
     root.setLevel(level)
-    root.addHandler(handler)
+    root.addHandler(queue_handler)
+    return listener
+
+
+def _shutdown(
+    listener: QueueListener,
+    queue_handler: BoundedQueueHandler,
+    file_handler: logging.Handler,
+) -> None:
+    """Дописывает очередь при выходе и отмечает отброшенные записи."""
+    listener.stop()
+    if queue_handler.dropped:
+        file_handler.handle(logging.makeLogRecord({
+            "name": __name__,
+            "levelno": logging.WARNING,
+            "levelname": "WARNING",
+            "msg": "Очередь логов переполнена, отброшено записей: %s",
+            "args": (queue_handler.dropped,),
+        }))
+    file_handler.close()
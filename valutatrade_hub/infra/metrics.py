@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Tuple
+
+# Границы корзин гистограмм задержек, в секундах
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """Монотонно растущий счетчик."""
+
+    kind = "counter"
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    """Текущее значение величины."""
+
+    kind = "gauge"
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (кумулятивная при выводе)."""
+
+    kind = "histogram"
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля: верхняя граница корзины, в которую он попал."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class MetricsRegistry:
+    """
+    Singleton с метриками процесса: счетчики, gauge и гистограммы задержек.
+    Метрика определяется именем и метками. Если метрики выключены,
+    все методы сразу возвращаются, а timer() отдает пустой контекст.
+    Обновления идут под одной блокировкой: += у счетчика и гистограммы
+    не атомарен, а метрики пишут пулы потоков сервера и фоновое
+    обновление курсов.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.enabled = True
+            cls._instance._metrics = {}
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    def inc(self, name: str, amount: int = 1, **labels: str) -> None:
+        if self.enabled:
+            with self._lock:
+                self._get(name, labels, Counter).inc(amount)
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        if self.enabled:
+            with self._lock:
+                self._get(name, labels, Gauge).set(value)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if self.enabled:
+            with self._lock:
+                self._get(name, labels, Histogram).observe(value)
+
+    def timer(self, name: str, **labels: str):
+        """Контекст, который записывает длительность блока в гистограмму."""
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(name, labels)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+    def items(self) -> List[Tuple[str, LabelKey, object]]:
+        """Все метрики: (имя, метки, объект), отсортированные по имени."""
+        with self._lock:
+            return sorted(
+                ((name, labels, metric)
+                 for (name, labels), metric in self._metrics.items()),
+                key=lambda item: (item[0], item[1]),
+            )
+
+    def render_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus."""
+        lines: List[str] = []
+        declared = set()
+        # Под блокировкой: корзины, сумма и число у гистограммы согласованы
+        with self._lock:
+            for (name, labels), metric in sorted(self._metrics.items()):
+                if name not in declared:
+                    declared.add(name)
+                    lines.append(f"# TYPE {name} {metric.kind}")
+
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    bounds = metric.buckets + (None,)
+                    for bound, count in zip(bounds, metric.counts):
+                        cumulative += count
+                        le = "+Inf" if bound is None else repr(bound)
+                        lines.append(
+                            f"{name}_bucket{_labels(labels, le=le)} {cumulative}"
+                        )
+                    lines.append(f"{name}_sum{_labels(labels)} {metric.sum}")
+                    lines.append(f"{name}_count{_labels(labels)} {metric.count}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """
+        Атомарно пишет метрики в файл для textfile collector node_exporter
+        (файл должен иметь расширение .prom).
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _timer(self, name: str, labels: Dict[str, str]) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._get(name, labels, Histogram).observe(elapsed)
+
+    def _get(self, name: str, labels: Dict[str, str], factory):
+        """Метрика по имени и меткам; вызывается под self._lock."""
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            metric = self._metrics[key] = factory()
+        return metric
+
+
+def _labels(labels: LabelKey, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
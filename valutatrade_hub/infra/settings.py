@@ -23,9 +23,39 @@ class SettingsLoader:
             "users_file": "data/users.json",
             "portfolios_file": "data/portfolios.json",
             "rates_file": "data/rates.json",
+            # Журнал сделок включен по умолчанию: с хранилищем json балансы
+            # — это снимок portfolios.json (раз в ledger_snapshot_every
+            # событий) плюс хвост журнала. None — без журнала, портфель
+            # пишется в portfolios.json на каждую сделку, как раньше
+            "trades_file": "data/trades.jsonl",
+            "ledger_snapshot_every": 1000,  # событий между снимками портфелей
+            "storage_backend": "json",      # json | sqlite
+            "portfolio_store": "dict",      # dict | columnar (портфели в памяти)
+            "sqlite_file": "data/valutatrade.db",
+            "username_case_insensitive": False,  # уникальность имен без учета регистра
             "rates_ttl_seconds": 300,       # TTL курсов в секундах
+            "rates_hard_ttl_seconds": 3600, # после него устаревшие курсы не отдаются
+            "rates_background_refresh": False,  # фоновое обновление курсов
+            "rates_refresh_fraction": 0.8,  # доля TTL до фонового обновления
+            "rate_history_format": "journal",  # journal | binary (история курсов)
             "logs_path": "logs/actions.log", # путь к логам
+            "log_format": "text",           # text | json (JSON lines)
+            "log_queue_size": 10000,        # размер очереди записей лога
+            "log_overflow": "drop",         # drop | block при переполнении
+            "metrics_enabled": True,        # сбор метрик (команда stats)
+            "metrics_textfile": None,       # .prom-файл для node_exporter
+            "profile_dir": "profiles",      # куда сохранять профили команд
+            "profile_memory": False,        # tracemalloc при профилировании
             "base_currency": "USD",
+            "serve_host": "127.0.0.1",      # адрес HTTP-сервера (serve)
+            "serve_port": 8765,
+            "serve_max_connections": 1024,  # больше — ответ 503 и закрытие
+            "serve_max_inflight": 256,      # запросов в обработке одновременно
+            "serve_pipeline_depth": 32,     # запросов в очереди одного соединения
+            "serve_read_workers": 4,        # потоки для чтений с диска
+            "serve_max_body": 65536,        # байт в теле запроса
+            "serve_session_ttl": 3600,      # секунд жизни токена без запросов
+            "serve_idle_timeout": 60,       # секунд ожидания запроса, затем закрытие
         }
 
     def get(self, key: str, default: Any = None) -> Any:
@@ -1,11 +1,35 @@
-from .cli.interface import CLIInterface
+import sys
+
 from .infra.logging_config import setup_logging
 
 
 def main():
     setup_logging()
+    args = sys.argv[1:]
+
+    # Модули подкоманд импортируются только в своей ветке
+    if args[:1] == ["generate"]:
+        from .cli.generate import run_generate
+
+        sys.exit(run_generate(args[1:]))
+
+    from .cli.interface import CLIInterface
+
     cli = CLIInterface()
-    cli.run()
+    if not args:
+        cli.run()
+    elif args[0] == "batch":
+        from .cli.batch import run_batch
+
+        sys.exit(run_batch(cli, args[1:]))
+    elif args[0] == "serve":
+        # asyncio импортируется только для сервера
+        from .cli.server import run_serve
+
+        sys.exit(run_serve(cli, args[1:]))
+    else:
+        # Одна команда прямо из argv: valutatrade get-rate --from BTC --to USD
+        sys.exit(cli.run_once(args))
 
 
 if __name__ == "__main__":
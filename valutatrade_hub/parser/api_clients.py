@@ -1,18 +1,63 @@
 from abc import ABC, abstractmethod
-from decimal import Decimal
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from ..core.exceptions import ApiRequestError
+from ..core.money import Rate
 from .config import ParserConfig
+from .http_cache import HttpCache
 
 
 class BaseApiClient(ABC):
     """
     Абстрактный клиент внешнего API курсов.
     Все реализации должны предоставлять fetch_rates() -> dict
+    Запросы идут через общий keep-alive пул соединений (requests.Session),
+    ответы кэшируются на диске с учетом ETag/Last-Modified/Cache-Control.
     """
-    
+
+    def __init__(
+        self,
+        timeout: int = 10,
+        pool_size: int = ParserConfig.HTTP_POOL_SIZE,
+        cache: HttpCache | None = None,
+    ):
+        self.timeout = timeout
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _get_json(self, url: str, headers: dict | None = None) -> dict:
+        """
+        GET-запрос с учетом кэша: свежий ответ возвращается без запроса,
+        устаревший перепроверяется условным запросом (304 — без тела).
+        """
+        entry = self.cache.get(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            return entry["body"]
+
+        headers = dict(headers or {})
+        if entry:
+            headers.update(self.cache.conditional_headers(entry))
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry:
+                self.cache.refresh(url, entry, response.headers)
+                return entry["body"]
+            if response.status_code != 200:
+                raise ApiRequestError(response.status_code)
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise ApiRequestError(e)
+
+        if self.cache:
+            self.cache.put(url, data, response.headers)
+        return data
+
     @abstractmethod
     def fetch_rates(self) -> dict:
         """Возвращает словарь курсов в формате {"BTC_USD": 59337.21, ...}."""
@@ -22,20 +67,14 @@ class BaseApiClient(ABC):
 class CoinGeckoClient(BaseApiClient):
     BASE_URL = ParserConfig.COINGECKO_URL
 
-    def __init__(self, base_currency: str = "USD"):
+    def __init__(self, base_currency: str = "USD", **kwargs):
+        super().__init__(**kwargs)
         self.base_currency = base_currency.upper()
-    
+
     def fetch_rates(self) -> dict:
         ids = ",".join(ParserConfig.CRYPTO_ID_MAP.values())
         url = f"{self.BASE_URL}?ids={ids}&vs_currencies={self.base_currency}"
-
-        try:
-            response = requests.get(url, timeout=10)
-            if response.status_code != 200:
-                raise ApiRequestError(response.status_code)
-            data = response.json()
-        except requests.exceptions.RequestException as e:
-            raise ApiRequestError(e)
+        data = self._get_json(url)
 
         # Приводим к стандартному формату {"BTC_USD": 59337.21}
         result = {}
@@ -50,29 +89,47 @@ class CoinGeckoClient(BaseApiClient):
 class ExchangeRateApiClient(BaseApiClient):
     BASE_URL = ParserConfig.EXCHANGERATE_API_URL
 
-    def __init__(self, base_currency: str = "USD", api_key: str | None = None):
+    def __init__(
+        self,
+        base_currency: str = "USD",
+        api_key: str | None = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
         self.base_currency = base_currency.upper()
         self.api_key = api_key
 
     def fetch_rates(self) -> dict:
         url = f"{self.BASE_URL}/{self.base_currency}"
         headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
-
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code != 200:
-                raise ApiRequestError(response)
-            data = response.json()
-        except requests.exceptions.RequestException as e:
-            raise ApiRequestError(e)
+        data = self._get_json(url, headers)
 
         rates = data.get("rates")
-        if not rates:
+        if not rates or not isinstance(rates, dict):
             raise ApiRequestError("Неверный формат ответа от ExchangeRate API")
 
         # Приводим к стандартному формату {"EUR_USD": 1.0786, "BTC_USD": 59337.21}
         result = {}
         for code, rate in rates.items():
             result[f"{code.upper()}_{self.base_currency}"] = \
-                float(Decimal("1") / Decimal(str(rate)))
+                self._inverse(code, rate)
         return result
+
+    @staticmethod
+    def _inverse(code: str, value) -> Rate:
+        """
+        Курс к базовой валюте из курса базовой к code (1 / value).
+        Нулевой, отрицательный, нечисловой или не представимый курс —
+        ApiRequestError, а не ZeroDivisionError посреди обновления.
+        """
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            rate = None
+        else:
+            try:
+                rate = Rate.of(value)
+            except (ArithmeticError, ValueError):
+                rate = None
+        # Слишком большой курс дает обратный, округлившийся до нуля
+        if rate is None or rate.units <= 0 or not rate.inverse().units:
+            raise ApiRequestError(f"некорректный курс {code}: {value!r}")
+        return rate.inverse()
@@ -0,0 +1,500 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from ..core.money import Rate, to_units
+from .journal import RateJournal
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - нет flock (Windows)
+    fcntl = None
+
+# Заголовок файла пары: магия, версия, полей в записи, знаков в курсе
+HEADER = struct.Struct("<4sHHi4x")
+MAGIC = b"VTRH"
+VERSION = 1
+# Запись — три int64: время в микросекундах, курс в единицах 10**-8, id источника
+FIELDS = 3
+# Свечи после сжатия журнала — в <пара>.ohlc: время (как у точки закрытия
+# в .bin), open, high, low в единицах 10**-8 и число котировок
+CANDLE_FIELDS = 5
+# Курс хранится с 8 знаками, а не с масштабом Rate (18): int64 с 18 знаками
+# вмещает курсы только до ~9.22. Младшие знаки округляются половиной
+# от нуля (потеря точности — до 5e-9), курсы меньше 5e-9 не хранятся вовсе.
+RATE_SCALE = 8
+INT64_MAX = 2**63 - 1
+
+_MICROS = 1_000_000
+
+
+class _Columns:
+    """Файл записей, отображенный в память; столбцы — срезы memoryview без копий."""
+
+    FIELDS = FIELDS
+
+    __slots__ = ("path", "size", "_mmap", "_view", "columns")
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.size = -1
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self.columns: tuple = ((),) * self.FIELDS
+        self.remap()
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def times(self):
+        return self.columns[0]
+
+    def remap(self) -> int:
+        """Переоткрывает отображение, если файл вырос. Число новых записей."""
+        size = os.stat(self.path).st_size
+        # Файл только что создан другим процессом и еще без заголовка
+        if size == self.size or size < HEADER.size:
+            return 0
+
+        before = len(self.times)
+        self.close()
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _check_header(self._mmap[:HEADER.size], self.path, self.FIELDS)
+
+        # Недописанная последняя запись (сбой при записи) не видна
+        fields = self.FIELDS
+        count = max(size - HEADER.size, 0) // (fields * 8)
+        self._view = memoryview(self._mmap)[
+            HEADER.size:HEADER.size + count * fields * 8
+        ].cast("q")
+        self.columns = tuple(self._view[i::fields] for i in range(fields))
+        self.size = size
+        return count - before
+
+    def close(self) -> None:
+        # mmap закрывается только после освобождения всех представлений
+        if self._view is not None:
+            for column in (*self.columns, self._view):
+                column.release()
+            self._view = None
+            self.columns = ((),) * self.FIELDS
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class _PairColumns(_Columns):
+    """Котировки пары: время, курс, источник."""
+
+    __slots__ = ()
+
+    @property
+    def rates(self):
+        return self.columns[1]
+
+    @property
+    def sources(self):
+        return self.columns[2]
+
+
+class _CandleColumns(_Columns):
+    """Свечи пары после сжатия журнала: время, open, high, low, count."""
+
+    FIELDS = CANDLE_FIELDS
+
+    __slots__ = ()
+
+    def span(self, start: int, end: int) -> tuple[int, int]:
+        """Индексы свечей со временем в [start, end)."""
+        times = self.times
+        return bisect_left(times, start), bisect_left(times, end)
+
+
+class BinaryRateHistory:
+    """
+    История курсов в бинарном столбцовом формате: файл на пару
+    (<пара>.bin) из записей фиксированной ширины, отсортированных по времени.
+    Файлы читаются через mmap, столбцы времени, курсов и источников —
+    представления memoryview: запросы по диапазону и агрегаты идут
+    бинарным поиском и встроенными min/max/sum без разбора текста.
+    Запросы совпадают с RateHistory, поэтому индексы взаимозаменяемы.
+    Свечи сжатого журнала хранят open/high/low/count в <пара>.ohlc,
+    их учитывают ohlc и summary.
+
+    Курсы хранятся с RATE_SCALE = 8 знаками (точнее Rate с 18 знаками
+    int64 не вмещает), поэтому совпадают с журналом с точностью до 5e-9;
+    запросы отдают их как Rate с RATE_SCALE знаками, без float.
+    Байты int64 — в порядке платформы, формат рассчитан на little-endian.
+    """
+
+    SUFFIX = ".bin"
+    CANDLE_SUFFIX = ".ohlc"
+    SOURCES_FILE = "sources.json"
+    LOCK_FILE = "append.lock"
+
+    def __init__(self, dir_path: str) -> None:
+        if sys.byteorder != "little":
+            raise RuntimeError("Бинарная история требует little-endian платформу.")
+
+        self._dir = Path(dir_path)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._series: Dict[str, _PairColumns] = {}
+        self._candles: Dict[str, _CandleColumns] = {}
+        self._sources: List[str] = []
+        self._source_ids: Dict[str, int] = {}
+        self.refresh()
+
+    @property
+    def path(self) -> Path:
+        return self._dir
+
+    def refresh(self) -> int:
+        """Подхватывает новые пары и записи, дописанные с прошлого раза."""
+        self._load_sources()
+        added = 0
+        for path in self._dir.glob(f"*{self.SUFFIX}"):
+            series = self._series.get(path.stem)
+            if series is None:
+                series = self._series[path.stem] = _PairColumns(path)
+                added += len(series)
+            else:
+                added += series.remap()
+
+        for path in self._dir.glob(f"*{self.CANDLE_SUFFIX}"):
+            candles = self._candles.get(path.stem)
+            if candles is None:
+                self._candles[path.stem] = _CandleColumns(path)
+            else:
+                candles.remap()
+        return added
+
+    def close(self) -> None:
+        for columns in (*self._series.values(), *self._candles.values()):
+            columns.close()
+        self._series.clear()
+        self._candles.clear()
+
+    def append(self, entries: Iterable[Dict]) -> int:
+        """
+        Дописывает записи журнала в файлы пар одной записью на пару.
+        Записи не по порядку времени вставляются перезаписью файла пары.
+        Свечи сжатого журнала пишутся точкой закрытия в <пара>.bin
+        и open/high/low/count в <пара>.ohlc.
+        """
+        with self._locked():
+            self._load_sources()
+            batches: Dict[str, List[tuple]] = {}
+            candle_batches: Dict[str, List[tuple]] = {}
+            for entry in entries:
+                pair = f"{entry['from_currency']}_{entry['to_currency']}"
+                timestamp = datetime.fromisoformat(entry["timestamp"]).timestamp()
+                micros = round(timestamp * _MICROS)
+                batches.setdefault(pair, []).append((
+                    micros,
+                    _rate_units(pair, entry["rate"]),
+                    self._source_id(entry.get("source") or ""),
+                ))
+
+                meta = entry.get("meta") or {}
+                if "interval" in meta:
+                    candle_batches.setdefault(pair, []).append((
+                        micros,
+                        _rate_units(pair, meta["open"]),
+                        _rate_units(pair, meta["high"]),
+                        _rate_units(pair, meta["low"]),
+                        meta["count"],
+                    ))
+
+            for suffix, fields, pair_batches in (
+                (self.SUFFIX, FIELDS, batches),
+                (self.CANDLE_SUFFIX, CANDLE_FIELDS, candle_batches),
+            ):
+                for pair, records in pair_batches.items():
+                    records.sort(key=lambda record: record[0])
+                    self._append_records(
+                        self._dir / f"{pair}{suffix}", records, fields
+                    )
+
+        self.refresh()
+        return sum(len(records) for records in batches.values())
+
+    def pairs(self) -> List[str]:
+        return sorted(self._series)
+
+    def rate_at(self, pair: str, at: datetime) -> Optional[Dict]:
+        """Последняя котировка пары не позже момента at."""
+        series = self._get_series(pair)
+        pos = bisect_right(series.times, _to_micros(at)) - 1
+        if pos < 0:
+            return None
+        return self._point(series, pos)
+
+    def range(
+        self,
+        pair: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> List[Dict]:
+        """Котировки пары в интервале [start, end]."""
+        series = self._get_series(pair)
+        lo, hi = self._bounds(series, start, end)
+        return [self._point(series, i) for i in range(lo, hi)]
+
+    def ohlc(
+        self,
+        pair: str,
+        interval: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> List[Dict]:
+        """
+        Свечи open/high/low/close пары с шагом interval секунд, выровненные
+        по местному времени, как в RateHistory.
+        Границы свечи ищутся бинарно, high/low считаются по срезу столбца
+        и уточняются свечами сжатого журнала из <пара>.ohlc.
+        """
+        series = self._get_series(pair)
+        lo, hi = self._bounds(series, start, end)
+        times, rates = series.times, series.rates
+        step = interval * _MICROS
+
+        candles: List[Dict] = []
+        while lo < hi:
+            bucket_start = _bucket_start(times[lo], step)
+            bucket_end = bisect_left(times, bucket_start + step, lo, hi)
+            window = rates[lo:bucket_end]
+            open_, high, low, count = self._with_candles(
+                pair, times, lo, bucket_end,
+                (rates[lo], max(window), min(window), bucket_end - lo),
+            )
+            candles.append({
+                "start": datetime.fromtimestamp(bucket_start / _MICROS),
+                "open": Rate(open_, RATE_SCALE),
+                "high": Rate(high, RATE_SCALE),
+                "low": Rate(low, RATE_SCALE),
+                "close": Rate(rates[bucket_end - 1], RATE_SCALE),
+                "count": count,
+            })
+            lo = bucket_end
+        return candles
+
+    def summary(
+        self,
+        pair: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> Optional[Dict]:
+        """
+        Агрегаты курса за период: точки, первый, последний, min, max, среднее.
+        min/max и число котировок учитывают свечи сжатого журнала;
+        среднее считается по точкам (у свечи — по курсу закрытия)
+        и округляется половиной вверх до RATE_SCALE знаков.
+        """
+        series = self._get_series(pair)
+        lo, hi = self._bounds(series, start, end)
+        if lo >= hi:
+            return None
+
+        window = series.rates[lo:hi]
+        first, high, low, count = self._with_candles(
+            pair, series.times, lo, hi,
+            (window[0], max(window), min(window), hi - lo),
+        )
+        points = hi - lo
+        return {
+            "count": count,
+            "first": Rate(first, RATE_SCALE),
+            "last": Rate(window[-1], RATE_SCALE),
+            "min": Rate(low, RATE_SCALE),
+            "max": Rate(high, RATE_SCALE),
+            "mean": Rate((2 * sum(window) + points) // (2 * points), RATE_SCALE),
+        }
+
+    def _with_candles(
+        self, pair: str, times, lo: int, hi: int, stats: tuple
+    ) -> tuple:
+        """
+        Уточняет (open, high, low, count) точек [lo, hi) свечами пары:
+        точка закрытия свечи заменяется ее open/high/low и числом котировок.
+        """
+        candles = self._candles.get(pair.upper())
+        if candles is None:
+            return stats
+
+        cl, ch = candles.span(times[lo], times[hi - 1] + 1)
+        if cl >= ch:
+            return stats
+
+        open_, high, low, count = stats
+        _, opens, highs, lows, counts = candles.columns
+        if candles.times[cl] == times[lo]:
+            open_ = opens[cl]
+        return (
+            open_,
+            max(high, max(highs[cl:ch])),
+            min(low, min(lows[cl:ch])),
+            count + sum(counts[cl:ch]) - (ch - cl),
+        )
+
+    @staticmethod
+    def _append_records(path: Path, records: List[tuple], fields: int) -> None:
+        record_size = fields * 8
+        with open(path, "a+b") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                f.write(HEADER.pack(MAGIC, VERSION, fields, RATE_SCALE))
+                size = HEADER.size
+            else:
+                # Хвост недописанной записи отрезается
+                tail = (size - HEADER.size) % record_size
+                if tail:
+                    f.truncate(size - tail)
+                    size -= tail
+
+            last = None
+            if size > HEADER.size:
+                data = os.pread(f.fileno(), 8, size - record_size)
+                last = struct.unpack("<q", data)[0]
+
+            if last is None or records[0][0] >= last:
+                f.write(_pack(records))
+                f.flush()
+                return
+
+        # Запись старше последней в файле: файл пересобирается
+        with open(path, "rb") as f:
+            _check_header(f.read(HEADER.size), path, fields)
+            stored = array("q", f.read())
+        merged = [tuple(stored[i:i + fields]) for i in range(0, len(stored), fields)]
+        merged.extend(records)
+        merged.sort(key=lambda record: record[0])
+
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, fields, RATE_SCALE))
+            f.write(_pack(merged))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _source_id(self, source: str) -> int:
+        source_id = self._source_ids.get(source)
+        if source_id is None:
+            source_id = self._source_ids[source] = len(self._sources)
+            self._sources.append(source)
+
+            path = self._dir / self.SOURCES_FILE
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._sources, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        return source_id
+
+    def _load_sources(self) -> None:
+        path = self._dir / self.SOURCES_FILE
+        if not path.exists():
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            self._sources = json.load(f)
+        self._source_ids = {source: i for i, source in enumerate(self._sources)}
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Дозапись из нескольких процессов идет по очереди (flock)."""
+        if fcntl is None:
+            yield
+            return
+
+        fd = os.open(self._dir / self.LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _get_series(self, pair: str) -> _PairColumns:
+        series = self._series.get(pair.upper())
+        if series is None:
+            raise ValueError(f"История курсов для {pair.upper()} не найдена.")
+        return series
+
+    @staticmethod
+    def _bounds(
+        series: _PairColumns, start: datetime | None, end: datetime | None
+    ) -> tuple[int, int]:
+        times = series.times
+        lo = bisect_left(times, _to_micros(start)) if start else 0
+        hi = bisect_right(times, _to_micros(end)) if end else len(times)
+        return lo, hi
+
+    def _point(self, series: _PairColumns, pos: int) -> Dict:
+        return {
+            "timestamp": datetime.fromtimestamp(series.times[pos] / _MICROS),
+            "rate": Rate(series.rates[pos], RATE_SCALE),
+            "source": self._sources[series.sources[pos]],
+        }
+
+
+def convert_journal(
+    journal: RateJournal, history: BinaryRateHistory, chunk_size: int = 100_000
+) -> int:
+    """Переносит журнал курсов в пустую бинарную историю пачками по chunk_size."""
+    if history.pairs():
+        raise ValueError(f"Каталог {history.path} уже содержит историю.")
+
+    entries = journal.iter_entries()
+    total = 0
+    while chunk := list(islice(entries, chunk_size)):
+        total += history.append(chunk)
+    return total
+
+
+def _pack(records: List[tuple]) -> bytes:
+    return array("q", [value for record in records for value in record]).tobytes()
+
+
+def _to_micros(moment: datetime) -> int:
+    return round(moment.timestamp() * _MICROS)
+
+
+def _bucket_start(micros: int, step: int) -> int:
+    """
+    Начало свечи с шагом step, выровненное по местному времени: свечи
+    выводятся в местном времени, и суточная начинается в полночь, а не
+    в полночь UTC. Время и шаг — в микросекундах.
+    """
+    local = datetime.fromtimestamp(micros / _MICROS).astimezone()
+    offset = local.utcoffset() // timedelta(microseconds=1)
+    return micros - (micros + offset) % step
+
+
+def _rate_units(pair: str, rate) -> int:
+    """Курс в единицах 10**-8; курс, округлившийся до нуля, не хранится."""
+    units = to_units(rate, RATE_SCALE)
+    if not 0 < units <= INT64_MAX:
+        raise ValueError(
+            f"Курс {pair} не представим с {RATE_SCALE} знаками: {rate}"
+        )
+    return units
+
+
+def _check_header(data: bytes, path: Path, expected_fields: int = FIELDS) -> None:
+    magic, version, fields, scale = HEADER.unpack(data)
+    if (
+        magic != MAGIC
+        or version != VERSION
+        or fields != expected_fields
+        or scale != RATE_SCALE
+    ):
+        raise ValueError(f"Неизвестный формат файла истории: {path.name}")
@@ -0,0 +1,230 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, TextIO
+
+from ..core.money import Rate
+from .config import ParserConfig
+from .journal import RateJournal, journal_entry
+
+
+class CompactionPolicy:
+    """
+    Политика сжатия журнала курсов по возрасту записей.
+    Моложе raw_window — котировки как есть, до minute_window — минутные
+    свечи OHLC, до hour_window — часовые, дальше — дневные.
+    Записи старше retention (если он задан) удаляются.
+    """
+
+    def __init__(
+        self,
+        raw_window: int,
+        minute_window: int,
+        hour_window: int,
+        retention: int | None = None,
+    ) -> None:
+        if not raw_window <= minute_window <= hour_window:
+            raise ValueError("Окна сжатия должны расти: raw <= minute <= hour.")
+        self.raw_window = raw_window
+        self.minute_window = minute_window
+        self.hour_window = hour_window
+        self.retention = retention
+
+    @classmethod
+    def from_config(
+        cls, raw_window: int | None = None, retention: int | None = None
+    ) -> "CompactionPolicy":
+        """Политика из ParserConfig; raw_window и retention можно переопределить."""
+        raw_window = raw_window or ParserConfig.JOURNAL_RAW_WINDOW
+        return cls(
+            raw_window,
+            max(raw_window, ParserConfig.JOURNAL_MINUTE_WINDOW),
+            max(raw_window, ParserConfig.JOURNAL_HOUR_WINDOW),
+            retention or ParserConfig.JOURNAL_RETENTION,
+        )
+
+    def interval(self, age: float) -> Optional[int]:
+        """Шаг свечи для записи возраста age: 0 — оставить как есть, None — удалить."""
+        if self.retention is not None and age > self.retention:
+            return None
+        if age < self.raw_window:
+            return 0
+        if age < self.minute_window:
+            return 60
+        if age < self.hour_window:
+            return 60 * 60
+        return 24 * 60 * 60
+
+
+class _Candle:
+    """Незакрытая свеча одной пары."""
+
+    __slots__ = (
+        "interval", "start", "open", "high", "low", "close", "count",
+        "timestamp", "source", "from_currency", "to_currency", "line",
+    )
+
+    def __init__(self, entry: Dict, interval: int, start: float, line: str) -> None:
+        self.interval = interval
+        self.start = start
+        meta = _candle_meta(entry)
+        self.open, self.high, self.low = meta["open"], meta["high"], meta["low"]
+        self.count = 0
+        self.from_currency = entry["from_currency"]
+        self.to_currency = entry["to_currency"]
+        self.merge(entry)
+        # Свеча из одной записи пишется этой записью без изменений
+        self.line = line
+
+    def merge(self, entry: Dict) -> None:
+        self.line = None
+        meta = _candle_meta(entry)
+        self.high = max(self.high, meta["high"])
+        self.low = min(self.low, meta["low"])
+        self.close = Rate.of(entry["rate"])
+        self.count += meta["count"]
+        # Время свечи — время последней котировки в ней: так запрос
+        # курса на момент времени не заглядывает в будущее
+        self.timestamp = entry["timestamp"]
+        self.source = entry.get("source") or ""
+
+    def to_line(self) -> str:
+        if self.line is not None:
+            return self.line
+        entry = journal_entry(
+            from_currency=self.from_currency,
+            to_currency=self.to_currency,
+            rate=self.close,
+            source=self.source,
+            meta={
+                "interval": self.interval,
+                "open": str(self.open),
+                "high": str(self.high),
+                "low": str(self.low),
+                "count": self.count,
+            },
+            timestamp=datetime.fromisoformat(self.timestamp),
+        )
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+
+def _candle_meta(entry: Dict) -> Dict:
+    """OHLC записи (Rate): у свечи — из meta, у котировки — сам курс."""
+    meta = entry.get("meta") or {}
+    if "interval" in meta:
+        return {
+            "open": Rate.of(meta["open"]),
+            "high": Rate.of(meta["high"]),
+            "low": Rate.of(meta["low"]),
+            "count": meta["count"],
+        }
+    rate = Rate.of(entry["rate"])
+    return {"open": rate, "high": rate, "low": rate, "count": 1}
+
+
+class JournalCompactor:
+    """
+    Сжатие закрытых сегментов журнала курсов в один сегмент.
+    Записи читаются потоком; в памяти только незакрытая свеча и
+    последняя котировка каждой пары, поэтому память не зависит
+    от размера журнала. Активный (последний) сегмент не трогается.
+    """
+
+    def __init__(self, journal: RateJournal, policy: CompactionPolicy) -> None:
+        self._journal = journal
+        self._policy = policy
+
+    def run(self, now: datetime | None = None, dry_run: bool = False) -> Dict:
+        """
+        Сжимает журнал и возвращает отчет: сегменты, записи и байты
+        до и после. С dry_run результат считается, но не применяется.
+        """
+        with self._journal.compaction_lock() as acquired:
+            if not acquired:
+                raise ValueError("Сжатие журнала уже выполняется.")
+
+            segments = self._journal.segments()[:-1]
+            report = {
+                "segments_before": len(segments),
+                "segments_after": len(segments),
+                "entries_before": 0,
+                "entries_after": 0,
+                "bytes_before": sum(s.stat().st_size for s in segments),
+                "bytes_after": 0,
+            }
+            if not segments:
+                return report
+
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self._journal.path, prefix=".compact-", suffix=".tmp"
+            )
+            tmp = Path(tmp_path)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as out:
+                    self._compact(segments, out, report, now or datetime.now())
+                    out.flush()
+                    os.fsync(out.fileno())
+                report["bytes_after"] = tmp.stat().st_size
+
+                if dry_run:
+                    tmp.unlink()
+                else:
+                    self._journal.replace_segments(segments, tmp)
+                    report["segments_after"] = 1
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+
+        report["bytes_reclaimed"] = report["bytes_before"] - report["bytes_after"]
+        return report
+
+    def _compact(
+        self, segments: list, out: TextIO, report: Dict, now: datetime
+    ) -> None:
+        now = now.timestamp()
+        candles: Dict[str, _Candle] = {}
+        last_quotes: Dict[str, tuple] = {}
+        written = 0
+
+        def write(line: str) -> None:
+            nonlocal written
+            out.write(line)
+            written += 1
+
+        for segment in segments:
+            for line in self._journal.read_lines(segment):
+                entry = json.loads(line)
+                report["entries_before"] += 1
+                timestamp = datetime.fromisoformat(entry["timestamp"]).timestamp()
+                interval = self._policy.interval(now - timestamp)
+                if interval is None:
+                    continue
+
+                pair = f"{entry['from_currency']}_{entry['to_currency']}"
+                candle = candles.get(pair)
+                start = timestamp - timestamp % interval if interval else None
+                if candle is not None and (
+                    candle.interval != interval or candle.start != start
+                ):
+                    write(candles.pop(pair).to_line())
+                    candle = None
+
+                if interval:
+                    if candle is None:
+                        candles[pair] = _Candle(entry, interval, start, line)
+                    else:
+                        candle.merge(entry)
+                    continue
+
+                # Повтор предыдущей котировки пары (тот же курс и источник)
+                quote = (Rate.of(entry["rate"]), entry.get("source"))
+                if last_quotes.get(pair) == quote:
+                    continue
+                last_quotes[pair] = quote
+                write(line)
+
+        for candle in candles.values():
+            write(candle.to_line())
+        report["entries_after"] = written
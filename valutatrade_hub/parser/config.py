@@ -21,7 +21,22 @@ class ParserConfig:
 
     # Пути
     EXCHANGE_FILE_PATH: str = "data/exchange_rates.json"
+    JOURNAL_DIR: str = "data/exchange_rates"
+    JOURNAL_SEGMENT_MAX_BYTES: int = 16 * 1024 * 1024
+    JOURNAL_SEGMENT_MAX_AGE: int = 24 * 60 * 60
+    # Сжатие журнала: моложе RAW — как есть, до MINUTE — минутные свечи,
+    # до HOUR — часовые, дальше дневные; старше RETENTION — удаляются
+    JOURNAL_RAW_WINDOW: int = 7 * 24 * 60 * 60
+    JOURNAL_MINUTE_WINDOW: int = 30 * 24 * 60 * 60
+    JOURNAL_HOUR_WINDOW: int = 365 * 24 * 60 * 60
+    JOURNAL_RETENTION: int | None = None
+    JOURNAL_AUTO_COMPACT: bool = False  # сжимать после закрытия сегмента
+    HTTP_CACHE_DIR: str = "data/http_cache"
+    HISTORY_BIN_DIR: str = "data/exchange_rates_bin"
+    HISTORY_BIN_APPEND: bool = False  # дописывать курсы и в бинарную историю
     RATES_TTL_SECONDS: int = 300
 
     # Сетевые параметры
-    REQUEST_TIMEOUT: int = 10
\ No newline at end of file
+    REQUEST_TIMEOUT: int = 10
+    UPDATE_DEADLINE: int = 15  # общий дедлайн опроса всех источников
+    HTTP_POOL_SIZE: int = 4    # размер пула keep-alive соединений клиента
\ No newline at end of file
@@ -0,0 +1,206 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from ..core.money import Rate
+from .binary_history import (
+    _MICROS,
+    RATE_SCALE,
+    _bucket_start,
+    _rate_units,
+    _to_micros,
+)
+from .journal import JournalPosition, RateJournal
+
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def parse_interval(value: str) -> int:
+    """Переводит интервал вида 30s, 5m, 1h, 1d (или число секунд) в секунды."""
+    value = value.strip().lower()
+    if value[-1:] in INTERVAL_UNITS:
+        seconds = int(value[:-1]) * INTERVAL_UNITS[value[-1]]
+    else:
+        seconds = int(value)
+
+    if seconds <= 0:
+        raise ValueError("Интервал должен быть больше 0.")
+    return seconds
+
+
+class _PairSeries:
+    """
+    Временной ряд одной пары: параллельные массивы, отсортированные по времени.
+    Время — в микросекундах, курс — в единицах 10**-RATE_SCALE (int64,
+    как в BinaryRateHistory): без float курсы не теряют точность.
+    """
+
+    def __init__(self) -> None:
+        self.times = array("q")
+        self.rates = array("q")
+        self.sources = array("H")
+        # Свечи сжатого журнала по времени точки закрытия: (open, high, low, count)
+        self.candles: Dict[int, tuple] = {}
+
+    def add(self, timestamp: int, rate: int, source_id: int) -> None:
+        # Журнал пишется по времени, поэтому почти всегда это дозапись в конец
+        if not self.times or timestamp >= self.times[-1]:
+            self.times.append(timestamp)
+            self.rates.append(rate)
+            self.sources.append(source_id)
+            return
+
+        pos = bisect_right(self.times, timestamp)
+        self.times.insert(pos, timestamp)
+        self.rates.insert(pos, rate)
+        self.sources.insert(pos, source_id)
+
+
+class RateHistory:
+    """
+    Индекс истории курсов поверх журнала.
+    Для каждой пары хранит отсортированные массивы времени и курсов,
+    поиск на момент времени и по диапазону — бинарный. Курсы отдаются
+    как Rate с RATE_SCALE знаками.
+    Новые записи журнала дочитываются инкрементально.
+    """
+
+    def __init__(self, journal: RateJournal) -> None:
+        self._journal = journal
+        self._reset()
+        self.refresh()
+
+    def _reset(self) -> None:
+        self._series: Dict[str, _PairSeries] = {}
+        self._sources: List[str] = []
+        self._source_ids: Dict[str, int] = {}
+        self._position: JournalPosition | None = None
+
+    def refresh(self) -> int:
+        """Дочитывает записи, появившиеся в журнале с прошлого раза."""
+        if self._position and not (self._journal.path / self._position[0]).exists():
+            # Сегмент позиции заменен при сжатии — индекс строится заново
+            self._reset()
+
+        entries, self._position = self._journal.read_from(self._position)
+        self.add(entries)
+        return len(entries)
+
+    def add(self, entries: Iterable[Dict]) -> None:
+        """Добавляет записи журнала в индекс."""
+        for entry in entries:
+            pair = f"{entry['from_currency']}_{entry['to_currency']}"
+            series = self._series.get(pair)
+            if series is None:
+                series = self._series[pair] = _PairSeries()
+
+            source = entry.get("source") or ""
+            source_id = self._source_ids.get(source)
+            if source_id is None:
+                source_id = self._source_ids[source] = len(self._sources)
+                self._sources.append(source)
+
+            timestamp = _to_micros(datetime.fromisoformat(entry["timestamp"]))
+            series.add(timestamp, _rate_units(pair, entry["rate"]), source_id)
+
+            meta = entry.get("meta") or {}
+            if "interval" in meta:
+                series.candles[timestamp] = (
+                    _rate_units(pair, meta["open"]),
+                    _rate_units(pair, meta["high"]),
+                    _rate_units(pair, meta["low"]),
+                    meta["count"],
+                )
+
+    def pairs(self) -> List[str]:
+        return sorted(self._series)
+
+    def rate_at(self, pair: str, at: datetime) -> Optional[Dict]:
+        """Последняя котировка пары не позже момента at."""
+        series = self._get_series(pair)
+        pos = bisect_right(series.times, _to_micros(at)) - 1
+        if pos < 0:
+            return None
+        return self._point(series, pos)
+
+    def range(
+        self,
+        pair: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> List[Dict]:
+        """Котировки пары в интервале [start, end]."""
+        series = self._get_series(pair)
+        lo, hi = self._bounds(series, start, end)
+        return [self._point(series, i) for i in range(lo, hi)]
+
+    def ohlc(
+        self,
+        pair: str,
+        interval: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> List[Dict]:
+        """
+        Свечи open/high/low/close пары с шагом interval секунд, выровненные
+        по местному времени (как и выводимое начало свечи).
+        Точка свечи сжатого журнала входит своими open/high/low и числом котировок.
+        """
+        series = self._get_series(pair)
+        lo, hi = self._bounds(series, start, end)
+        step = interval * _MICROS
+
+        candles: List[Dict] = []
+        bucket = None
+        bucket_end = None
+        for i in range(lo, hi):
+            timestamp, rate = series.times[i], series.rates[i]
+            open_, high, low, count = series.candles.get(
+                timestamp, (rate, rate, rate, 1)
+            )
+            if bucket is None or timestamp >= bucket_end:
+                bucket_start = _bucket_start(timestamp, step)
+                bucket_end = bucket_start + step
+                bucket = {
+                    "start": bucket_start,
+                    "open": open_,
+                    "high": high,
+                    "low": low,
+                    "close": rate,
+                    "count": 0,
+                }
+                candles.append(bucket)
+
+            bucket["high"] = max(bucket["high"], high)
+            bucket["low"] = min(bucket["low"], low)
+            bucket["close"] = rate
+            bucket["count"] += count
+
+        for candle in candles:
+            candle["start"] = datetime.fromtimestamp(candle["start"] / _MICROS)
+            for key in ("open", "high", "low", "close"):
+                candle[key] = Rate(candle[key], RATE_SCALE)
+        return candles
+
+    def _get_series(self, pair: str) -> _PairSeries:
+        series = self._series.get(pair.upper())
+        if series is None:
+            raise ValueError(f"История курсов для {pair.upper()} не найдена.")
+        return series
+
+    @staticmethod
+    def _bounds(
+        series: _PairSeries, start: datetime | None, end: datetime | None
+    ) -> tuple[int, int]:
+        times = series.times
+        lo = bisect_left(times, _to_micros(start)) if start else 0
+        hi = bisect_right(times, _to_micros(end)) if end else len(times)
+        return lo, hi
+
+    def _point(self, series: _PairSeries, pos: int) -> Dict:
+        return {
+            "timestamp": datetime.fromtimestamp(series.times[pos] / _MICROS),
+            "rate": Rate(series.rates[pos], RATE_SCALE),
+            "source": self._sources[series.sources[pos]],
+        }
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+
+class HttpCache:
+    """
+    Дисковый кэш ответов API.
+    Для каждого URL хранит тело ответа, валидаторы (ETag, Last-Modified)
+    и момент, до которого ответ считается свежим.
+    """
+
+    def __init__(self, dir_path: str) -> None:
+        self._dir = dir_path
+        os.makedirs(dir_path, exist_ok=True)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Возвращает запись кэша для URL или None."""
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, url: str, body: Any, headers: Mapping[str, str]) -> None:
+        """Сохраняет ответ, если заголовки разрешают кэширование."""
+        cache_control = self._cache_control(headers)
+        if "no-store" in cache_control:
+            return
+
+        entry = {
+            "url": url,
+            "body": body,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "expires_at": self.expires_at(body, headers),
+        }
+        self._write(url, entry)
+
+    def refresh(self, url: str, entry: Dict[str, Any], headers: Mapping[str, str]):
+        """Продлевает запись после ответа 304 Not Modified."""
+        entry["etag"] = headers.get("ETag") or entry.get("etag")
+        entry["last_modified"] = (
+            headers.get("Last-Modified") or entry.get("last_modified")
+        )
+        entry["expires_at"] = self.expires_at(entry["body"], headers)
+        self._write(url, entry)
+
+    @staticmethod
+    def is_fresh(entry: Dict[str, Any]) -> bool:
+        return time.time() < (entry.get("expires_at") or 0)
+
+    @staticmethod
+    def conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Заголовки условного запроса по сохраненным валидаторам."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def expires_at(self, body: Any, headers: Mapping[str, str]) -> float:
+        """
+        Момент устаревания ответа: Cache-Control max-age, Expires
+        или поле time_next_update_unix из ответа open.er-api.
+        """
+        now = time.time()
+        cache_control = self._cache_control(headers)
+        if "no-cache" in cache_control:
+            return now
+
+        candidates = []
+        if "max-age" in cache_control:
+            try:
+                candidates.append(now + int(cache_control["max-age"]))
+            except ValueError:
+                pass
+        elif headers.get("Expires"):
+            try:
+                candidates.append(parsedate_to_datetime(headers["Expires"]).timestamp())
+            except (TypeError, ValueError):
+                pass
+
+        if isinstance(body, dict) and body.get("time_next_update_unix"):
+            candidates.append(float(body["time_next_update_unix"]))
+
+        return max(candidates, default=now)
+
+    @staticmethod
+    def _cache_control(headers: Mapping[str, str]) -> Dict[str, str]:
+        directives = {}
+        for part in (headers.get("Cache-Control") or "").split(","):
+            name, _, value = part.strip().partition("=")
+            if name:
+                directives[name.lower()] = value.strip('"')
+        return directives
+
+    def _path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self._dir, f"{digest}.json")
+
+    def _write(self, url: str, entry: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(url))
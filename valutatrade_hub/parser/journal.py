@@ -0,0 +1,280 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from ..core.money import Rate
+from .config import ParserConfig
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - нет flock (Windows)
+    fcntl = None
+
+# Позиция чтения журнала: (имя сегмента, смещение в байтах)
+JournalPosition = Tuple[str, int]
+
+
+def journal_entry(
+    from_currency: str,
+    to_currency: str,
+    rate: Any,
+    source: str,
+    meta: dict | None = None,
+    timestamp: datetime | None = None,
+) -> dict:
+    """
+    Формирует запись журнала курсов (id — пара и момент котировки).
+    Курс пишется строкой с фиксированной точкой (как Rate), без float.
+    """
+    timestamp = (timestamp or datetime.now()).isoformat()
+    entry_id = f"{from_currency}_{to_currency}_{timestamp}"
+
+    return {
+        "id": entry_id,
+        "from_currency": from_currency,
+        "to_currency": to_currency,
+        "rate": str(Rate.of(rate)),
+        "timestamp": timestamp,
+        "source": source,
+        "meta": meta or {},
+    }
+
+
+class RateJournal:
+    """
+    Журнал курсов валют.
+    Записи хранятся в append-only сегментах формата JSON lines,
+    сегмент закрывается по размеру или по возрасту.
+
+    Закрытые сегменты можно заменить одним сжатым (replace_segments):
+    план замены пишется в compact.pending, и прерванная замена
+    доводится до конца или откатывается при следующем открытии журнала.
+    """
+
+    SEGMENT_PREFIX = "segment-"
+    SEGMENT_SUFFIX = ".jsonl"
+    LOCK_FILE = "compact.lock"
+    PENDING_FILE = "compact.pending"
+
+    def __init__(
+        self,
+        dir_path: str,
+        max_segment_bytes: int = 16 * 1024 * 1024,
+        max_segment_age: int = 24 * 60 * 60,
+        legacy_file: str | None = None,
+    ) -> None:
+        self._dir = Path(dir_path)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._max_segment_bytes = max_segment_bytes
+        self._max_segment_age = max_segment_age
+
+        with self.compaction_lock() as acquired:
+            if acquired:
+                self._finish_replace()
+
+        if legacy_file:
+            self.migrate_legacy(legacy_file)
+
+    @classmethod
+    def from_config(cls, legacy_file: str | None = None) -> "RateJournal":
+        """Журнал в каталоге и с размерами сегментов из ParserConfig."""
+        return cls(
+            ParserConfig.JOURNAL_DIR,
+            max_segment_bytes=ParserConfig.JOURNAL_SEGMENT_MAX_BYTES,
+            max_segment_age=ParserConfig.JOURNAL_SEGMENT_MAX_AGE,
+            legacy_file=legacy_file,
+        )
+
+    @property
+    def path(self) -> Path:
+        return self._dir
+
+    def segments(self) -> List[Path]:
+        """Возвращает сегменты журнала в порядке записи."""
+        return sorted(
+            self._dir.glob(f"{self.SEGMENT_PREFIX}*{self.SEGMENT_SUFFIX}")
+        )
+
+    def append_batch(self, entries: Iterable[Dict]) -> int:
+        """Дописывает пачку записей одной операцией записи."""
+        lines = [json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries]
+        if not lines:
+            return 0
+
+        segment = self._active_segment()
+        with open(segment, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+        return len(lines)
+
+    def iter_entries(self) -> Iterator[Dict]:
+        """Построчно читает записи всех сегментов, не загружая их целиком."""
+        for segment in self.segments():
+            yield from self.read_segment(segment)
+
+    def read_from(
+        self, position: JournalPosition | None = None
+    ) -> Tuple[List[Dict], JournalPosition | None]:
+        """
+        Читает записи, добавленные после position, и возвращает их
+        вместе с новой позицией — для инкрементального чтения хвоста.
+        """
+        entries: List[Dict] = []
+        segment_name, offset = position or ("", 0)
+
+        for segment in self.segments():
+            if segment.name < segment_name:
+                continue
+            start = offset if segment.name == segment_name else 0
+
+            with open(segment, "rb") as f:
+                f.seek(start)
+                for line in f:
+                    # Недописанная строка будет прочитана в следующий раз
+                    if not line.endswith(b"\n"):
+                        break
+                    start += len(line)
+                    if line.strip():
+                        entries.append(json.loads(line))
+
+            segment_name, offset = segment.name, start
+
+        return entries, (segment_name, offset) if segment_name else position
+
+    def migrate_legacy(self, legacy_file: str) -> int:
+        """
+        Однократно переносит записи из старого exchange_rates.json
+        (JSON-массив) в сегменты журнала.
+        """
+        legacy = Path(legacy_file)
+        if not legacy.exists() or self.segments():
+            return 0
+
+        with open(legacy, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+
+        count = self.append_batch(entries)
+        legacy.rename(legacy.with_name(legacy.name + ".migrated"))
+        return count
+
+    @contextmanager
+    def compaction_lock(self) -> Iterator[bool]:
+        """Блокировка сжатия между процессами; отдает False, если она занята."""
+        if fcntl is None:
+            yield True
+            return
+
+        fd = os.open(self._dir / self.LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+            except BlockingIOError:
+                acquired = False
+            yield acquired
+        finally:
+            # Закрытие дескриптора снимает flock
+            os.close(fd)
+
+    def replace_segments(self, old: List[Path], compacted: Path) -> Path:
+        """
+        Заменяет сегменты old (закрытые, подряд) файлом compacted.
+        Вызывается под compaction_lock. Новый сегмент получает номер
+        последнего из old и новое время, поэтому читатели по имени
+        позиции видят, что журнал переписан.
+        """
+        seq, _ = self._parse_name(old[-1])
+        target = self._dir / (
+            f"{self.SEGMENT_PREFIX}{seq:06d}-{int(time.time())}{self.SEGMENT_SUFFIX}"
+        )
+        plan = {
+            "compacted": compacted.name,
+            "remove": [segment.name for segment in old if segment != target],
+        }
+
+        pending = self._dir / self.PENDING_FILE
+        tmp = pending.with_name(pending.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(plan, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, pending)
+
+        # Точка фиксации: после переименования сжатый сегмент действителен
+        os.replace(compacted, target)
+        self._fsync_dir()
+        self._finish_replace()
+        return target
+
+    def _finish_replace(self) -> None:
+        """Доводит до конца или откатывает прерванную замену сегментов."""
+        pending = self._dir / self.PENDING_FILE
+        if pending.exists():
+            with open(pending, "r", encoding="utf-8") as f:
+                plan = json.load(f)
+
+            compacted = self._dir / plan["compacted"]
+            if compacted.exists():
+                # Замена не зафиксирована — старые сегменты остаются в силе
+                compacted.unlink()
+            else:
+                for name in plan["remove"]:
+                    (self._dir / name).unlink(missing_ok=True)
+            pending.unlink()
+
+        # Временные файлы сжатия, прерванного до записи плана
+        for stale in self._dir.glob(".compact-*.tmp"):
+            stale.unlink(missing_ok=True)
+
+    def _fsync_dir(self) -> None:
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(self._dir, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _active_segment(self) -> Path:
+        """Возвращает текущий сегмент или открывает новый при переполнении."""
+        segments = self.segments()
+        if segments:
+            last = segments[-1]
+            seq, created = self._parse_name(last)
+            if (
+                last.stat().st_size < self._max_segment_bytes
+                and time.time() - created < self._max_segment_age
+            ):
+                return last
+            seq += 1
+        else:
+            seq = 1
+
+        return self._dir / (
+            f"{self.SEGMENT_PREFIX}{seq:06d}-{int(time.time())}{self.SEGMENT_SUFFIX}"
+        )
+
+    def _parse_name(self, segment: Path) -> tuple[int, int]:
+        """Разбирает имя сегмента: порядковый номер и время создания."""
+        stem = segment.name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]
+        seq, created = stem.split("-")
+        return int(seq), int(created)
+
+    @classmethod
+    def read_segment(cls, segment: Path) -> Iterator[Dict]:
+        """Построчно читает записи одного сегмента."""
+        for line in cls.read_lines(segment):
+            yield json.loads(line)
+
+    @staticmethod
+    def read_lines(segment: Path) -> Iterator[str]:
+        """Целые непустые строки сегмента (вместе с переводом строки)."""
+        with open(segment, "r", encoding="utf-8") as f:
+            for line in f:
+                # Недописанная последняя строка (сбой при записи) пропускается
+                if not line.endswith("\n"):
+                    break
+                if line.strip():
+                    yield line
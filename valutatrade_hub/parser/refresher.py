@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher(threading.Thread):
+    """
+    Фоновое обновление курсов.
+    Запускает RateUpdater заранее — по прошествии доли TTL с последнего
+    обновления — и подменяет снимок в RateManager. Читатели продолжают
+    работать со старым снимком, пока идет обновление.
+    """
+
+    def __init__(
+        self,
+        updater,
+        rate_manager,
+        refresh_after: float,
+        retry_after: float = 30,
+    ) -> None:
+        super().__init__(name="rates-refresher", daemon=True)
+        self._updater = updater
+        self._rate_manager = rate_manager
+        self._refresh_after = refresh_after
+        self._retry_after = retry_after
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._refreshing = threading.Event()
+        self._failed_at: float | None = None
+
+    @property
+    def refreshing(self) -> bool:
+        return self._refreshing.is_set()
+
+    def trigger(self) -> None:
+        """Просит обновить курсы, не дожидаясь расписания (не блокирует)."""
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=self._seconds_until_due())
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            if self._seconds_until_due() > 0:
+                continue
+            self._refresh()
+
+    def _seconds_until_due(self) -> float:
+        if self._failed_at is not None:
+            return max(self._failed_at + self._retry_after - time.time(), 0)
+
+        last_refresh = self._rate_manager.last_refresh
+        if last_refresh is None:
+            return 0
+        elapsed = (datetime.now() - last_refresh).total_seconds()
+        return max(self._refresh_after - elapsed, 0)
+
+    def _refresh(self) -> None:
+        self._refreshing.set()
+        try:
+            rates = self._updater.run_update(verbose=False)
+            self._rate_manager.update(rates=rates, source="")
+            self._failed_at = None
+        except Exception as exc:
+            self._failed_at = time.time()
+            logger.warning("Фоновое обновление курсов не удалось: %s", exc)
+        finally:
+            self._refreshing.clear()
@@ -1,78 +1,172 @@
-from datetime import datetime
-from decimal import Decimal
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, List
 
-from ..cli.storage import FileStorageManager
 from ..core.exceptions import ApiRequestError
+from ..core.money import Rate
+from ..infra.metrics import MetricsRegistry
 from .api_clients import CoinGeckoClient, ExchangeRateApiClient
 from .config import ParserConfig
+from .http_cache import HttpCache
+from .journal import RateJournal, journal_entry
+
+# mmap-история и сжатие журнала нужны не каждому обновлению
+if TYPE_CHECKING:
+    from .binary_history import BinaryRateHistory
+
+metrics = MetricsRegistry()
 
 
 class RateUpdater:
-    def __init__(self, file_path: str):
-        self._storage = FileStorageManager(file_path)
+    def __init__(
+        self,
+        journal_dir: str | None = None,
+        legacy_file: str | None = None,
+        journal: RateJournal | None = None,
+    ):
+        # Готовый журнал можно передать снаружи, чтобы его разделяли
+        # обновление курсов и команды истории
+        if journal is None:
+            journal = RateJournal(
+                journal_dir or ParserConfig.JOURNAL_DIR,
+                max_segment_bytes=ParserConfig.JOURNAL_SEGMENT_MAX_BYTES,
+                max_segment_age=ParserConfig.JOURNAL_SEGMENT_MAX_AGE,
+                legacy_file=legacy_file,
+            )
+        self._journal = journal
+        cache = HttpCache(ParserConfig.HTTP_CACHE_DIR)
         self._clients = {
-            "CoinGecko": CoinGeckoClient(ParserConfig.BASE_CURRENCY),
-            "ExchangeRate-API": ExchangeRateApiClient(ParserConfig.BASE_CURRENCY)
+            "CoinGecko": CoinGeckoClient(
+                ParserConfig.BASE_CURRENCY,
+                timeout=ParserConfig.REQUEST_TIMEOUT,
+                cache=cache,
+            ),
+            "ExchangeRate-API": ExchangeRateApiClient(
+                ParserConfig.BASE_CURRENCY,
+                timeout=ParserConfig.REQUEST_TIMEOUT,
+                cache=cache,
+            ),
         }
+        # Источники, пропущенные при последнем обновлении: {имя: причина}
+        self.last_skipped: Dict[str, str] = {}
+        self._binary_history: "BinaryRateHistory | None" = None
+        if ParserConfig.HISTORY_BIN_APPEND:
+            from .binary_history import BinaryRateHistory
+
+            self._binary_history = BinaryRateHistory(ParserConfig.HISTORY_BIN_DIR)
+
+    @property
+    def journal(self) -> RateJournal:
+        return self._journal
+
+    def run_update(
+        self, source: str | None = None, verbose: bool = True
+    ) -> Dict[str, Rate]:
+        """
+        Обновляет курсы. Если source указан — обновляет только его.
+        Источники опрашиваются параллельно; недоступные пропускаются,
+        ошибка возникает, только если не ответил ни один.
+        """
+        collected: Dict[str, Rate] = {}
+        entries: List[dict] = []
 
-    def run_update(self, source: str | None = None) -> int:
-        """Обновляет курсы. Если source указан — обновляет только его."""
-        collected: Dict[str, Decimal] = {}
-        
         if source and source not in self._clients.keys():
             raise ValueError(f"Неизвестный источник '{source}'")
 
-        for name, client in self._clients.items():
-            if source and name != source:
-                continue
+        clients = {
+            name: client
+            for name, client in self._clients.items()
+            if not source or name == source
+        }
+        results = self._fetch_all(clients)
+        self.last_skipped = {
+            name: str(result)
+            for name, result in results.items()
+            if isinstance(result, Exception)
+        }
 
-            try:
-                rates = client.fetch_rates()
-            except Exception as exc:
-                raise ApiRequestError(str(exc))
+        if len(self.last_skipped) == len(clients):
+            raise ApiRequestError("; ".join(
+                f"{name}: {reason}" for name, reason in self.last_skipped.items()
+            ))
+
+        # Результаты сливаются в порядке регистрации источников
+        for name, rates in results.items():
+            if isinstance(rates, Exception):
+                continue
 
             for pair, rate in rates.items():
                 from_currency, to_currency = pair.split("_")
 
-                rate_decimal = str(rate)
-                self._append_journal(
+                rate = Rate.of(rate)
+                entries.append(journal_entry(
                     from_currency=from_currency,
                     to_currency=to_currency,
-                    rate=rate_decimal,
+                    rate=rate,
                     source=name,
-                )
+                ))
 
-                collected[pair] = rate_decimal
-            print(f"Обновлены курсы из {name}: {len(rates)}")
+                collected[pair] = rate
+            if verbose:
+                print(f"Обновлены курсы из {name}: {len(rates)}")
 
+        # Все полученные курсы пишутся в журнал одной пачкой
+        self._journal.append_batch(entries)
+        if self._binary_history is not None:
+            self._binary_history.append(entries)
+        if ParserConfig.JOURNAL_AUTO_COMPACT:
+            self.maybe_compact()
         return collected
 
-    def _append_journal(self,
-        from_currency: str,
-        to_currency: str,
-        rate: str,
-        source: str,
-        meta: dict | None = None
-    ) -> None:
-        """Добавляет новую запись в exchange-rate.json."""
-        timestamp = datetime.now().isoformat()
-        entry_id = f"{from_currency}_{to_currency}_{timestamp}"
-
-        entry = {
-            "id": entry_id,
-            "from_currency": from_currency,
-            "to_currency": to_currency,
-            "rate": float(rate),
-            "timestamp": timestamp,
-            "source": source,
-            "meta": meta or {},
-        }
+    def maybe_compact(self) -> Dict | None:
+        """Сжимает журнал, если с прошлого сжатия закрылся новый сегмент."""
+        # После сжатия в журнале остаются сжатый сегмент и активный
+        if len(self._journal.segments()) <= 2:
+            return None
+
+        from .compaction import CompactionPolicy, JournalCompactor
 
         try:
-            journal = self._storage.load()
-        except FileNotFoundError:
-            journal = []
+            return JournalCompactor(
+                self._journal, CompactionPolicy.from_config()
+            ).run()
+        except ValueError:
+            # Журнал уже сжимает другой процесс
+            return None
+
+    @staticmethod
+    def _fetch_all(clients: dict) -> Dict[str, dict | Exception]:
+        """
+        Опрашивает клиентов параллельно с общим дедлайном.
+        Для каждого источника возвращает курсы или исключение.
+        """
+        executor = ThreadPoolExecutor(max_workers=max(len(clients), 1))
+        try:
+            futures = {
+                name: executor.submit(_timed_fetch, name, client)
+                for name, client in clients.items()
+            }
+            wait(futures.values(), timeout=ParserConfig.UPDATE_DEADLINE)
+        finally:
+            # Не дожидаемся зависших запросов после дедлайна
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        results: Dict[str, dict | Exception] = {}
+        for name, future in futures.items():
+            if not future.done():
+                results[name] = TimeoutError("превышено время ожидания")
+                metrics.inc("api_fetch_timeouts_total", provider=name)
+            elif future.exception() is not None:
+                results[name] = future.exception()
+            else:
+                results[name] = future.result()
+        return results
+
 
-        journal.append(entry)
-        self._storage.save(journal)
+def _timed_fetch(name: str, client) -> dict:
+    """Запрашивает курсы у клиента, учитывая время и ошибки в метриках."""
+    try:
+        with metrics.timer("api_fetch_seconds", provider=name):
+            return client.fetch_rates()
+    except Exception:
+        metrics.inc("api_fetch_errors_total", provider=name)
+        raise